@@ -4,11 +4,18 @@ from __future__ import annotations
 
 from typing import Any
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 
 from .ring import RingEmptyError
-from .schemas import AddNodeRequest, LookupRequest, NodeFailureRequest, SimulationRequest
+from .schemas import (
+    AddNodeRequest,
+    BoundedLoadRequest,
+    LookupBatchRequest,
+    LookupRequest,
+    NodeFailureRequest,
+    SimulationRequest,
+)
 from .service import RingService
 
 _LANDING_HTML = """<!DOCTYPE html>
@@ -34,9 +41,13 @@ _LANDING_HTML = """<!DOCTYPE html>
   <ol>
     <li><code>POST /v1/nodes</code> — add nodes with vnodes (128 each)</li>
     <li><code>GET /v1/lookup/user:42</code> — resolve key → owning node</li>
+    <li><code>POST /v1/lookup/batch</code> — resolve many keys in one call</li>
+    <li><code>GET /v1/replicas/user:42?n=3</code> — preference list of N distinct nodes</li>
+    <li><code>POST /v1/acquire</code> — bounded-load placement (spills past full nodes)</li>
     <li><code>POST /v1/simulate/balance</code> — load distribution across nodes</li>
     <li><code>POST /v1/simulate/churn</code> — consistent vs modulo hashing</li>
     <li><code>POST /v1/simulate/node-failure</code> — keys redistributed on remove</li>
+    <li><code>POST /v1/simulate/bounded-load</code> — hot tenant max/mean load</li>
   </ol>
   <p><a href="/docs">Swagger UI</a> · <a href="/health">Health / stats</a></p>
   <pre>./scripts/demo_ring.sh</pre>
@@ -64,9 +75,15 @@ def create_app(service: RingService) -> FastAPI:
                 "health": "GET /health",
                 "nodes": "GET/POST /v1/nodes",
                 "lookup": "GET /v1/lookup/{key}",
+                "lookup_batch": "POST /v1/lookup/batch",
+                "replicas": "GET /v1/replicas/{key}?n=3",
+                "acquire": "POST /v1/acquire",
+                "release": "POST /v1/release/{node_id}",
+                "load": "GET /v1/load",
                 "balance": "POST /v1/simulate/balance",
                 "churn": "POST /v1/simulate/churn",
                 "node_failure": "POST /v1/simulate/node-failure",
+                "bounded_load": "POST /v1/simulate/bounded-load",
             },
         }
 
@@ -90,11 +107,13 @@ def create_app(service: RingService) -> FastAPI:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
 
     @app.get("/v1/lookup/{key}")
-    def lookup_key(key: str) -> dict[str, Any]:
+    def lookup_key(key: str, ring_version: int | None = None) -> dict[str, Any]:
         try:
-            return service.lookup(key)
+            return service.lookup(key, ring_version)
         except RingEmptyError as exc:
             raise HTTPException(status_code=503, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
 
     @app.post("/v1/lookup")
     def lookup_body(body: LookupRequest) -> dict[str, Any]:
@@ -103,6 +122,38 @@ def create_app(service: RingService) -> FastAPI:
         except RingEmptyError as exc:
             raise HTTPException(status_code=503, detail=str(exc)) from exc
 
+    @app.post("/v1/lookup/batch")
+    def lookup_batch(body: LookupBatchRequest) -> dict[str, Any]:
+        try:
+            return service.lookup_many(body.keys)
+        except RingEmptyError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    @app.get("/v1/replicas/{key}")
+    def replicas(key: str, n: int = Query(default=3, ge=1, le=16)) -> dict[str, Any]:
+        try:
+            return service.replicas(key, n)
+        except RingEmptyError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    @app.post("/v1/acquire")
+    def acquire(body: LookupRequest) -> dict[str, Any]:
+        try:
+            return service.acquire(body.key)
+        except RingEmptyError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    @app.post("/v1/release/{node_id}")
+    def release(node_id: str) -> dict[str, Any]:
+        try:
+            return service.release(node_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    @app.get("/v1/load")
+    def load() -> dict[str, Any]:
+        return service.load_stats()
+
     @app.post("/v1/simulate/balance")
     def simulate_balance(body: SimulationRequest) -> dict[str, Any]:
         try:
@@ -124,4 +175,13 @@ def create_app(service: RingService) -> FastAPI:
         except ValueError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
 
+    @app.post("/v1/simulate/bounded-load")
+    def simulate_bounded_load(body: BoundedLoadRequest) -> dict[str, Any]:
+        try:
+            return service.bounded_load_simulation(
+                body.request_count, body.epsilon, body.hot_share
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
     return app
@@ -0,0 +1,96 @@
+"""Micro-benchmark — lookups/sec and churn per ring backend and hash function."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from .ring import HASH_FUNCTIONS, RING_BACKENDS, HashRing, Ring, redistribution_ratio
+
+
+def _build(backend: str, hash_name: str, node_count: int, vnode_count: int) -> Ring:
+    ring = RING_BACKENDS[backend](hash_fn=HASH_FUNCTIONS[hash_name])
+    for n in range(node_count):
+        ring.add_node(f"node-{n}", vnode_count)
+    return ring
+
+
+def benchmark_ring(
+    backend: str,
+    hash_name: str,
+    key_count: int = 100_000,
+    node_count: int = 10,
+    vnode_count: int = 128,
+) -> dict[str, Any]:
+    """Time single and batch lookups, and measure churn when one node joins."""
+    keys = [f"bench:{i}" for i in range(key_count)]
+
+    started = time.perf_counter()
+    ring = _build(backend, hash_name, node_count, vnode_count)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for key in keys:
+        ring.get_node(key)
+    lookup_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ring.get_nodes(keys)
+    batch_s = time.perf_counter() - started
+
+    grown = _build(backend, hash_name, node_count + 1, vnode_count)
+    return {
+        "backend": backend,
+        "hash_function": hash_name,
+        "keys": key_count,
+        "nodes": node_count,
+        "build_ms": round(build_s * 1000, 2),
+        "lookups_per_sec": round(key_count / lookup_s) if lookup_s else None,
+        "batch_lookups_per_sec": round(key_count / batch_s) if batch_s else None,
+        "churn_on_add": round(redistribution_ratio(keys, ring, grown), 4),
+        "ideal_churn": round(1 / (node_count + 1), 4),
+    }
+
+
+def run_benchmark(key_count: int = 100_000, node_count: int = 10) -> list[dict[str, Any]]:
+    """Benchmark every backend × hash function combination."""
+    return [
+        benchmark_ring(backend, hash_name, key_count, node_count)
+        for backend in RING_BACKENDS
+        for hash_name in HASH_FUNCTIONS
+    ]
+
+
+def benchmark_membership(
+    node_count: int = 1_000, vnode_count: int = 256, hash_name: str = "fnv1a", changes: int = 10
+) -> dict[str, Any]:
+    """Time join, leave and snapshot on a large vnode ring (mean over ``changes``)."""
+    ring = HashRing(hash_fn=HASH_FUNCTIONS[hash_name])
+    started = time.perf_counter()
+    for n in range(node_count):
+        ring.add_node(f"node-{n}", vnode_count)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    snapshot = ring.snapshot()
+    snapshot_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for n in range(changes):
+        ring.add_node(f"joining-{n}", vnode_count)
+    add_s = (time.perf_counter() - started) / changes
+
+    started = time.perf_counter()
+    for n in range(changes):
+        ring.remove_node(f"node-{n}")
+    remove_s = (time.perf_counter() - started) / changes
+    return {
+        "nodes": node_count,
+        "vnodes_per_node": vnode_count,
+        "total_vnodes": ring.vnode_count(),
+        "build_ms": round(build_s * 1000, 2),
+        "snapshot_us": round(snapshot_s * 1e6, 2),
+        "add_node_ms": round(add_s * 1000, 3),
+        "remove_node_ms": round(remove_s * 1000, 3),
+        "snapshot_unchanged": snapshot.vnode_count() == node_count * vnode_count,
+    }
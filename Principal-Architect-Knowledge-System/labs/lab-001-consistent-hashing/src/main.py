@@ -7,6 +7,8 @@ import argparse
 import json
 
 from .api import create_app
+from .bench import benchmark_membership, run_benchmark
+from .ring import HASH_FUNCTIONS, RING_BACKENDS
 from .service import RingService
 
 
@@ -25,11 +27,19 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Lab 001: Consistent Hashing Ring")
     parser.add_argument("--serve", action="store_true", help="Start API on :8096")
     parser.add_argument("--demo", action="store_true", help="Run CLI demo")
+    parser.add_argument("--bench", action="store_true", help="Benchmark ring backends")
     parser.add_argument("--inject", choices=["hot-key", "node-failure"])
+    parser.add_argument("--backend", choices=sorted(RING_BACKENDS), default="vnode")
+    parser.add_argument("--hash", choices=sorted(HASH_FUNCTIONS), default="sha256")
     parser.add_argument("--port", type=int, default=8096)
     args = parser.parse_args()
 
-    service = RingService()
+    if args.bench:
+        report = {"lookups": run_benchmark(), "membership": benchmark_membership()}
+        print(json.dumps(report, indent=2))
+        return 0
+
+    service = RingService(backend=args.backend, hash_name=args.hash)
 
     if args.inject == "hot-key":
         service.seed_demo_cluster()
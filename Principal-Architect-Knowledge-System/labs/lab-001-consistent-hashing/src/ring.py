@@ -3,8 +3,25 @@
 from __future__ import annotations
 
 import hashlib
+import math
+import zlib
 from bisect import bisect_left
-from dataclasses import dataclass, field
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field, replace
+from itertools import chain, islice
+from typing import Protocol
+
+import numpy as np
+
+HashFn = Callable[[str], int]
+BatchHashFn = Callable[[Sequence[str]], np.ndarray]
+
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_FMIX_C1 = 0xFF51AFD7ED558CCD
+_FMIX_C2 = 0xC4CEB9FE1A85EC53
+_MASK64 = (1 << 64) - 1
+_CHUNK_SIZE = 128
 
 
 class RingEmptyError(LookupError):
@@ -17,59 +34,534 @@ def hash_position(value: str) -> int:
     return int.from_bytes(digest[:8], byteorder="big", signed=False)
 
 
+def fast_position(value: str) -> int:
+    """Non-cryptographic 64-bit ring position from two CRC32 passes (~2x faster)."""
+    data = value.encode("utf-8")
+    return (zlib.crc32(data) << 32) | zlib.crc32(data[::-1])
+
+
+def fnv1a_position(value: str) -> int:
+    """64-bit FNV-1a + fmix64 ring position — scalar twin of ``fnv1a_positions``."""
+    h = _FNV_OFFSET
+    for byte in value.encode("utf-8"):
+        h = ((h ^ byte) * _FNV_PRIME) & _MASK64
+    # murmur3 fmix64 finalizer: raw FNV clusters similar keys like "node-a:0..127".
+    h ^= h >> 33
+    h = (h * _FMIX_C1) & _MASK64
+    h ^= h >> 33
+    h = (h * _FMIX_C2) & _MASK64
+    return h ^ (h >> 33)
+
+
+def fnv1a_positions(keys: Sequence[str]) -> np.ndarray:
+    """Vectorized ``fnv1a_position``: one NumPy pass per byte column, not per key."""
+    text = "".join(keys)
+    blob = text.encode("utf-8")
+    if len(blob) == len(text):  # pure ASCII: char lengths are byte lengths
+        lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+    else:
+        encoded = [k.encode("utf-8") for k in keys]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(keys))
+        blob = b"".join(encoded)
+    flat = np.frombuffer(blob, dtype=np.uint8)
+    starts = np.zeros(len(keys), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    h = np.full(len(keys), _FNV_OFFSET, dtype=np.uint64)
+    if len(keys) == 0:
+        return h
+    prime = np.uint64(_FNV_PRIME)
+    min_len = int(lengths.min())
+    for col in range(int(lengths.max())):
+        if col < min_len:
+            h = (h ^ flat[starts + col]) * prime
+        else:
+            live = np.flatnonzero(lengths > col)
+            h[live] = (h[live] ^ flat[starts[live] + col]) * prime
+    return _fmix64(h)
+
+
+def fnv1a_numbered_positions(prefix: str, count: int) -> np.ndarray:
+    """``fnv1a_positions([f"{prefix}{i}" for i in range(count)])`` without the strings.
+
+    The prefix is hashed once. Numbers with the same digit count form one contiguous
+    slice, hashed with one NumPy pass per digit, most significant first. Building a
+    million key strings costs more than hashing them, so synthetic-key simulations
+    use this.
+    """
+    h = _FNV_OFFSET
+    for byte in prefix.encode("utf-8"):
+        h = ((h ^ byte) * _FNV_PRIME) & _MASK64
+    hashes = np.full(count, h, dtype=np.uint64)
+    prime = np.uint64(_FNV_PRIME)
+    zero = np.uint64(ord("0"))
+    low, width = 0, 1
+    while low < count:
+        high = min(count, 10**width)
+        numbers = np.arange(low, high, dtype=np.uint64)
+        h = hashes[low:high]
+        for place in range(width - 1, -1, -1):
+            h = (h ^ (numbers // np.uint64(10**place) % np.uint64(10) + zero)) * prime
+        hashes[low:high] = h
+        low, width = high, width + 1
+    return _fmix64(hashes)
+
+
+def _fmix64(h: np.ndarray) -> np.ndarray:
+    """murmur3 fmix64 finalizer, vectorized."""
+    shift = np.uint64(33)
+    h ^= h >> shift
+    h *= np.uint64(_FMIX_C1)
+    h ^= h >> shift
+    h *= np.uint64(_FMIX_C2)
+    return h ^ (h >> shift)
+
+
+HASH_FUNCTIONS: dict[str, HashFn] = {
+    "sha256": hash_position,
+    "crc": fast_position,
+    "fnv1a": fnv1a_position,
+}
+
+_BATCH_HASH_FUNCTIONS: dict[HashFn, BatchHashFn] = {
+    fnv1a_position: fnv1a_positions,
+}
+
+
+def hash_batch(keys: Sequence[str], hash_fn: HashFn = hash_position) -> np.ndarray:
+    """Ring positions for many keys as a uint64 array (vectorized when available)."""
+    batch_fn = _BATCH_HASH_FUNCTIONS.get(hash_fn)
+    if batch_fn is not None:
+        return batch_fn(keys)
+    return np.fromiter(map(hash_fn, keys), dtype=np.uint64, count=len(keys))
+
+
+class Ring(Protocol):
+    """Interface shared by ring backends."""
+
+    ring_version: int
+
+    def add_node(self, node_id: str, vnode_count: int = 128) -> None: ...
+
+    def remove_node(self, node_id: str) -> None: ...
+
+    def get_node(self, key: str) -> str: ...
+
+    def get_nodes(self, keys: Sequence[str]) -> list[str]: ...
+
+    def owners_at(self, positions: np.ndarray) -> list[str]: ...
+
+    def owner_counts(self, positions: np.ndarray) -> dict[str, int]: ...
+
+    def walk(self, key: str) -> Iterator[str]: ...
+
+    def get_replicas(self, key: str, n: int) -> list[str]: ...
+
+    def snapshot(self) -> Ring: ...
+
+    def nodes(self) -> list[str]: ...
+
+    def vnode_count(self) -> int: ...
+
+
 @dataclass
 class HashRing:
-    """Consistent hash ring with virtual nodes."""
+    """Consistent hash ring with virtual nodes.
+
+    Positions live in small sorted chunks (``_chunks`` with parallel ``_owners``)
+    indexed by each chunk's last position (``_maxes``), so a membership change
+    rewrites only the chunks it touches. Chunks are immutable tuples, which makes
+    ``snapshot()`` O(1): the copy shares every chunk, and whichever ring mutates
+    first copies the chunk index lists (copy-on-write).
+    """
 
-    _ring: dict[int, str] = field(default_factory=dict)
-    _sorted_positions: list[int] = field(default_factory=list)
     ring_version: int = 0
+    hash_fn: HashFn = hash_position
+    _chunks: list[tuple[int, ...]] = field(default_factory=list, repr=False)
+    _owners: list[tuple[str, ...]] = field(default_factory=list, repr=False)
+    _maxes: list[int] = field(default_factory=list, repr=False)
+    _node_positions: dict[str, tuple[int, ...]] = field(default_factory=dict, repr=False)
+    _size: int = 0
+    _shared: bool = field(default=False, repr=False)
+    _lookup_arrays: tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False)
 
     def add_node(self, node_id: str, vnode_count: int = 128) -> None:
         """Add a physical node with virtual node positions on the ring."""
-        if node_id in set(self._ring.values()):
+        if node_id in self._node_positions:
             return
-        for i in range(vnode_count):
-            pos = hash_position(f"{node_id}:{i}")
-            self._ring[pos] = node_id
-        self._rebuild_index()
+        candidates = {self.hash_fn(f"{node_id}:{i}") for i in range(vnode_count)}
+        positions = sorted(p for p in candidates if not self._contains(p))
+        self._unshare()
+        self._node_positions[node_id] = tuple(positions)
+        for ci, group in reversed(self._group_by_chunk(positions)):
+            chunk = list(self._chunks[ci]) if self._chunks else []
+            owners = list(self._owners[ci]) if self._owners else []
+            for pos in group:
+                i = bisect_left(chunk, pos)
+                chunk.insert(i, pos)
+                owners.insert(i, node_id)
+            self._replace_chunk(ci, chunk, owners)
+        self._size += len(positions)
+        self._bump()
 
     def remove_node(self, node_id: str) -> None:
         """Remove all virtual nodes belonging to a physical node."""
-        to_remove = [pos for pos, nid in self._ring.items() if nid == node_id]
-        for pos in to_remove:
-            del self._ring[pos]
-        self._rebuild_index()
+        if node_id not in self._node_positions:
+            return
+        self._unshare()
+        positions = self._node_positions.pop(node_id)
+        for ci, group in reversed(self._group_by_chunk(list(positions))):
+            chunk = list(self._chunks[ci])
+            owners = list(self._owners[ci])
+            for pos in group:
+                i = bisect_left(chunk, pos)
+                del chunk[i]
+                del owners[i]
+            span = 1
+            if len(chunk) < _CHUNK_SIZE // 4 and ci + 1 < len(self._chunks):
+                chunk.extend(self._chunks[ci + 1])  # fold underfull chunk into its successor
+                owners.extend(self._owners[ci + 1])
+                span = 2
+            self._replace_chunk(ci, chunk, owners, span)
+        self._size -= len(positions)
+        self._bump()
 
     def get_node(self, key: str) -> str:
         """Return the physical node responsible for key."""
-        if not self._sorted_positions:
+        if not self._chunks:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        pos = self.hash_fn(key)
+        ci = bisect_left(self._maxes, pos)
+        if ci == len(self._maxes):
+            return self._owners[0][0]
+        return self._owners[ci][bisect_left(self._chunks[ci], pos)]
+
+    def get_nodes(self, keys: Sequence[str]) -> list[str]:
+        """Resolve many keys at once: batch hash, then one ``searchsorted``."""
+        if not self._chunks:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        return self.owners_at(hash_batch(keys, self.hash_fn))
+
+    def owners_at(self, positions: np.ndarray) -> list[str]:
+        """Owners of already-hashed uint64 ring positions."""
+        _, owners = self._lookup()
+        return owners[self._vnode_index(positions)].tolist()
+
+    def owner_counts(self, positions: np.ndarray) -> dict[str, int]:
+        """Positions owned by each node, counted per vnode without a per-key owner list."""
+        vnodes, owners = self._lookup()
+        per_vnode = np.bincount(self._vnode_index(positions), minlength=len(vnodes))
+        counts = dict.fromkeys(self.nodes(), 0)
+        for owner, n in zip(owners.tolist(), per_vnode.tolist()):
+            counts[owner] += n
+        return counts
+
+    def _lookup(self) -> tuple[np.ndarray, np.ndarray]:
+        if not self._chunks:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        if self._lookup_arrays is None:
+            vnodes = np.fromiter(chain.from_iterable(self._chunks), np.uint64, self._size)
+            owners = np.array(list(chain.from_iterable(self._owners)), dtype=object)
+            self._lookup_arrays = (vnodes, owners)
+        return self._lookup_arrays
+
+    def _vnode_index(self, positions: np.ndarray) -> np.ndarray:
+        vnodes, _ = self._lookup()
+        idx = np.searchsorted(vnodes, positions, side="left")
+        idx[idx == len(vnodes)] = 0
+        return idx
+
+    def walk(self, key: str) -> Iterator[str]:
+        """Distinct physical nodes in clockwise order from the key's position."""
+        if not self._chunks:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        pos = self.hash_fn(key)
+        ci = bisect_left(self._maxes, pos)
+        idx = 0
+        if ci == len(self._maxes):
+            ci = 0
+        else:
+            idx = bisect_left(self._chunks[ci], pos)
+        return self._walk_from(ci, idx)
+
+    def get_replicas(self, key: str, n: int) -> list[str]:
+        """Preference list: the first ``n`` distinct physical nodes clockwise."""
+        if n < 1:
+            raise ValueError("replica count must be >= 1")
+        return list(islice(self.walk(key), n))
+
+    def snapshot(self) -> HashRing:
+        """O(1) frozen-in-time copy; both rings copy-on-write from here on."""
+        self._shared = True
+        return replace(self)
+
+    def nodes(self) -> list[str]:
+        return sorted(self._node_positions)
+
+    def vnode_count(self) -> int:
+        return self._size
+
+    def _walk_from(self, ci: int, idx: int) -> Iterator[str]:
+        seen: set[str] = set()
+        chunk_count = len(self._owners)
+        # One extra step revisits the starting chunk's positions before ``idx``.
+        for step in range(chunk_count + 1):
+            owners = self._owners[(ci + step) % chunk_count]
+            for owner in owners[idx:] if step == 0 else owners:
+                if owner not in seen:
+                    seen.add(owner)
+                    yield owner
+                    if len(seen) == len(self._node_positions):
+                        return
+
+    def _contains(self, pos: int) -> bool:
+        ci = bisect_left(self._maxes, pos)
+        if ci == len(self._maxes):
+            return False
+        chunk = self._chunks[ci]
+        return chunk[bisect_left(chunk, pos)] == pos
+
+    def _group_by_chunk(self, positions: list[int]) -> list[tuple[int, list[int]]]:
+        """Bucket sorted positions by the chunk that owns (or will own) them."""
+        last = max(len(self._maxes) - 1, 0)
+        groups: dict[int, list[int]] = {}
+        for pos in positions:
+            groups.setdefault(min(bisect_left(self._maxes, pos), last), []).append(pos)
+        return sorted(groups.items())
+
+    def _replace_chunk(
+        self, ci: int, chunk: list[int], owners: list[str], span: int = 1
+    ) -> None:
+        """Swap ``span`` chunks at ``ci`` for new contents, splitting oversized ones."""
+        count = len(chunk) // _CHUNK_SIZE if len(chunk) > 2 * _CHUNK_SIZE else 1
+        step = max(-(-len(chunk) // count), 1)
+        starts = range(0, len(chunk), step)
+        end = min(ci + span, len(self._chunks))
+        self._chunks[ci:end] = [tuple(chunk[i : i + step]) for i in starts]
+        self._owners[ci:end] = [tuple(owners[i : i + step]) for i in starts]
+        self._maxes[ci:end] = [chunk[min(i + step, len(chunk)) - 1] for i in starts]
+
+    def _unshare(self) -> None:
+        if self._shared:
+            self._chunks = list(self._chunks)
+            self._owners = list(self._owners)
+            self._maxes = list(self._maxes)
+            self._node_positions = dict(self._node_positions)
+            self._shared = False
+
+    def _bump(self) -> None:
+        self._lookup_arrays = None
+        self.ring_version += 1
+
+
+@dataclass
+class MaglevRing:
+    """Maglev lookup-table ring: O(1) lookup via a precomputed slot table.
+
+    Each node walks its own permutation of the ``table_size`` slots (derived from
+    an offset and skip hash); nodes take turns claiming their next free slot until
+    the table is full. ``vnode_count`` is kept for interface parity and acts as a
+    relative weight — a node with twice the count claims twice the slots.
+    """
+
+    table_size: int = 65_537
+    hash_fn: HashFn = fast_position
+    ring_version: int = 0
+    _weights: dict[str, int] = field(default_factory=dict)
+    _table: list[str] = field(default_factory=list)
+    _table_array: np.ndarray | None = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.table_size < 2 or any(
+            self.table_size % d == 0 for d in range(2, int(self.table_size**0.5) + 1)
+        ):
+            raise ValueError("table_size must be prime")
+
+    def add_node(self, node_id: str, vnode_count: int = 128) -> None:
+        if node_id in self._weights:
+            return
+        self._weights[node_id] = vnode_count
+        self._populate()
+
+    def remove_node(self, node_id: str) -> None:
+        if self._weights.pop(node_id, None) is None:
+            return
+        self._populate()
+
+    def get_node(self, key: str) -> str:
+        if not self._table:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        return self._table[self.hash_fn(key) % self.table_size]
+
+    def get_nodes(self, keys: Sequence[str]) -> list[str]:
+        if not self._table:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        return self.owners_at(hash_batch(keys, self.hash_fn))
+
+    def owners_at(self, positions: np.ndarray) -> list[str]:
+        """Owners of already-hashed uint64 positions (one table gather)."""
+        if not self._table:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        if self._table_array is None:
+            self._table_array = np.array(self._table, dtype=object)
+        return self._table_array[positions % np.uint64(self.table_size)].tolist()
+
+    def owner_counts(self, positions: np.ndarray) -> dict[str, int]:
+        """Positions owned by each node, counted per slot without a per-key owner list."""
+        if not self._table:
+            raise RingEmptyError("cannot resolve key on empty ring")
+        slots = (positions % np.uint64(self.table_size)).astype(np.intp)
+        counts = dict.fromkeys(self.nodes(), 0)
+        for owner, n in zip(self._table, np.bincount(slots, minlength=self.table_size).tolist()):
+            counts[owner] += n
+        return counts
+
+    def walk(self, key: str) -> Iterator[str]:
+        """Distinct nodes in table order from the key's slot (the table is a permutation)."""
+        if not self._table:
             raise RingEmptyError("cannot resolve key on empty ring")
-        pos = hash_position(key)
-        idx = bisect_left(self._sorted_positions, pos)
-        if idx == len(self._sorted_positions):
-            idx = 0
-        return self._ring[self._sorted_positions[idx]]
+        return self._walk_from(self.hash_fn(key) % self.table_size)
+
+    def get_replicas(self, key: str, n: int) -> list[str]:
+        if n < 1:
+            raise ValueError("replica count must be >= 1")
+        return list(islice(self.walk(key), n))
+
+    def snapshot(self) -> MaglevRing:
+        """Cheap copy: the slot table is replaced, never mutated, so it is shared."""
+        return replace(self, _weights=dict(self._weights))
 
     def nodes(self) -> list[str]:
-        return sorted(set(self._ring.values()))
+        return sorted(self._weights)
 
     def vnode_count(self) -> int:
-        return len(self._ring)
+        return len(self._table)
 
-    def _rebuild_index(self) -> None:
-        self._sorted_positions = sorted(self._ring.keys())
+    def _walk_from(self, slot: int) -> Iterator[str]:
+        seen: set[str] = set()
+        for step in range(self.table_size):
+            owner = self._table[(slot + step) % self.table_size]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+                if len(seen) == len(self._weights):
+                    return
+
+    def _populate(self) -> None:
         self.ring_version += 1
+        self._table_array = None
+        if not self._weights:
+            self._table = []
+            return
+        m = self.table_size
+        names = sorted(self._weights)
+        top = max(self._weights.values())
+        offsets = [self.hash_fn(f"{n}#offset") % m for n in names]
+        skips = [self.hash_fn(f"{n}#skip") % (m - 1) + 1 for n in names]
+        shares = [self._weights[n] / top for n in names]
+        credit = [0.0] * len(names)
+        turns = [0] * len(names)
+        table: list[str | None] = [None] * m
+        filled = 0
+        while True:
+            for i, name in enumerate(names):
+                credit[i] += shares[i]
+                while credit[i] >= 1.0:
+                    credit[i] -= 1.0
+                    slot = (offsets[i] + turns[i] * skips[i]) % m
+                    while table[slot] is not None:
+                        turns[i] += 1
+                        slot = (offsets[i] + turns[i] * skips[i]) % m
+                    table[slot] = name
+                    turns[i] += 1
+                    filled += 1
+                    if filled == m:
+                        self._table = table  # type: ignore[assignment]
+                        return
+
+
+@dataclass
+class BoundedLoadRing:
+    """Consistent hashing with bounded loads (Mirrokni, Thorup & Zadimoghaddam, 2018).
+
+    Each ``acquire`` places one unit of load (an in-flight request, a session) on
+    the first node clockwise whose load is below ``ceil((1 + epsilon) * mean)``,
+    spilling past full nodes, so no node ever exceeds the bound. Callers hand
+    the node back to ``release`` when the work finishes.
+    """
+
+    ring: Ring
+    epsilon: float = 0.25
+    _loads: dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.epsilon <= 0:
+            raise ValueError("epsilon must be > 0")
+
+    def capacity(self, extra: int = 0) -> int:
+        """Per-node load bound with ``extra`` units about to be placed."""
+        nodes = self.ring.nodes()
+        if not nodes:
+            return 0
+        total = sum(self._loads.get(n, 0) for n in nodes) + extra
+        return math.ceil((1 + self.epsilon) * total / len(nodes))
+
+    def acquire(self, key: str) -> str:
+        bound = self.capacity(extra=1)
+        for node in self.ring.walk(key):
+            if self._loads.get(node, 0) < bound:
+                self._loads[node] = self._loads.get(node, 0) + 1
+                return node
+        raise RingEmptyError("no node below load bound")  # unreachable: bound >= mean + 1
+
+    def release(self, node_id: str) -> None:
+        if self._loads.get(node_id, 0) > 0:
+            self._loads[node_id] -= 1
+
+    def loads(self) -> dict[str, int]:
+        return {n: self._loads.get(n, 0) for n in self.ring.nodes()}
 
+    def reset(self) -> None:
+        self._loads.clear()
 
-def redistribution_ratio(keys: list[str], before: HashRing, after: HashRing) -> float:
+
+def load_ratio(loads: dict[str, int]) -> float:
+    """Max/mean load across nodes (1.0 is perfect balance)."""
+    if not loads or not sum(loads.values()):
+        return 0.0
+    return max(loads.values()) / (sum(loads.values()) / len(loads))
+
+
+RING_BACKENDS: dict[str, Callable[..., Ring]] = {
+    "vnode": HashRing,
+    "maglev": MaglevRing,
+}
+
+
+def redistribution_ratio(keys: list[str], before: Ring, after: Ring) -> float:
     """Fraction of keys that changed owner between two ring states."""
     if not keys:
         return 0.0
-    moved = sum(1 for k in keys if before.get_node(k) != after.get_node(k))
+    moved = sum(map(str.__ne__, before.get_nodes(keys), after.get_nodes(keys)))
     return moved / len(keys)
 
 
 def modulo_node(key: str, n: int) -> int:
     """Naive modulo partition for comparison."""
     return hash_position(key) % n
+
+
+def modulo_churn(
+    keys: Sequence[str], n_before: int, n_after: int, hash_fn: HashFn = hash_position
+) -> float:
+    """Fraction of keys whose modulo partition changes when N changes (hashes once)."""
+    if not keys:
+        return 0.0
+    return modulo_churn_at(hash_batch(keys, hash_fn), n_before, n_after)
+
+
+def modulo_churn_at(positions: np.ndarray, n_before: int, n_after: int) -> float:
+    """``modulo_churn`` for already-hashed uint64 positions."""
+    if not len(positions):
+        return 0.0
+    moved = np.count_nonzero(positions % np.uint64(n_before) != positions % np.uint64(n_after))
+    return int(moved) / len(positions)
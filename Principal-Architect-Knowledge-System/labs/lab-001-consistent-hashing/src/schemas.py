@@ -14,10 +14,20 @@ class LookupRequest(BaseModel):
     key: str = Field(..., examples=["user:42"])
 
 
+class LookupBatchRequest(BaseModel):
+    keys: list[str] = Field(..., min_length=1, max_length=100_000, examples=[["user:1", "user:2"]])
+
+
 class SimulationRequest(BaseModel):
-    key_count: int = Field(default=10_000, ge=100, le=500_000)
+    key_count: int = Field(default=10_000, ge=100, le=1_000_000)
 
 
 class NodeFailureRequest(BaseModel):
     node_id: str = Field(..., examples=["node-b"])
-    key_count: int = Field(default=10_000, ge=100, le=500_000)
+    key_count: int = Field(default=10_000, ge=100, le=1_000_000)
+
+
+class BoundedLoadRequest(BaseModel):
+    request_count: int = Field(default=10_000, ge=100, le=200_000)
+    epsilon: float = Field(default=0.25, gt=0, le=4.0)
+    hot_share: float = Field(default=0.3, ge=0, le=1.0)
@@ -2,21 +2,78 @@
 
 from __future__ import annotations
 
-import copy
+import random
+from collections import Counter, OrderedDict
 from typing import Any
 
-from .ring import HashRing, hash_position, modulo_node, redistribution_ratio
+import numpy as np
+
+from .ring import (
+    HASH_FUNCTIONS,
+    RING_BACKENDS,
+    BoundedLoadRing,
+    Ring,
+    fnv1a_numbered_positions,
+    load_ratio,
+    modulo_churn_at,
+)
+
+_RETAINED_VERSIONS = 16
+
+
+def _synthetic_positions(prefix: str, count: int) -> np.ndarray:
+    """Sorted FNV-1a positions of ``prefix0 .. prefix{count-1}``.
+
+    Simulations only count owners, so key order does not matter; sorted positions
+    make the owner ``searchsorted`` walk the vnode array in order (~5x faster).
+    """
+    positions = fnv1a_numbered_positions(prefix, count)
+    positions.sort()
+    return positions
 
 
 class RingService:
-    """Manages a hash ring with demo simulations."""
+    """Manages a hash ring with demo simulations.
 
-    def __init__(self) -> None:
-        self.ring = HashRing()
+    The simulations place synthetic keys (``item:0``, ``item:1``, ...) with the
+    vectorized FNV-1a hash whatever ``hash_name`` is: they only need uniformly spread
+    key positions, and sha256 hashes one key at a time (~4 s per million keys). Node
+    positions and real lookups still use the ring's own hash.
+    """
+
+    def __init__(
+        self, backend: str = "vnode", hash_name: str = "sha256", load_epsilon: float = 0.25
+    ) -> None:
+        if backend not in RING_BACKENDS:
+            raise ValueError(f"unknown ring backend: {backend}")
+        if hash_name not in HASH_FUNCTIONS:
+            raise ValueError(f"unknown hash function: {hash_name}")
+        self.backend = backend
+        self.hash_name = hash_name
+        self.ring = self._new_ring()
+        self.bounded = BoundedLoadRing(self.ring, epsilon=load_epsilon)
+        self.versions: OrderedDict[int, Ring] = OrderedDict()
         self.lookups_total = 0
 
+    def _new_ring(self) -> Ring:
+        return RING_BACKENDS[self.backend](hash_fn=HASH_FUNCTIONS[self.hash_name])
+
+    def _record_version(self) -> None:
+        """Keep a copy-on-write snapshot of recent ring versions for lookups."""
+        self.versions[self.ring.ring_version] = self.ring.snapshot()
+        while len(self.versions) > _RETAINED_VERSIONS:
+            self.versions.popitem(last=False)
+
+    def _ring_at(self, ring_version: int | None) -> Ring:
+        if ring_version is None or ring_version == self.ring.ring_version:
+            return self.ring
+        if ring_version not in self.versions:
+            raise ValueError(f"ring version not retained: {ring_version}")
+        return self.versions[ring_version]
+
     def add_node(self, node_id: str, vnode_count: int = 128) -> dict[str, Any]:
         self.ring.add_node(node_id, vnode_count)
+        self._record_version()
         return {
             "node_id": node_id,
             "vnode_count": vnode_count,
@@ -29,6 +86,7 @@ class RingService:
         if node_id not in self.ring.nodes():
             raise ValueError(f"node not found: {node_id}")
         self.ring.remove_node(node_id)
+        self._record_version()
         return {
             "removed": node_id,
             "ring_version": self.ring.ring_version,
@@ -36,22 +94,93 @@ class RingService:
             "total_vnodes": self.ring.vnode_count(),
         }
 
-    def lookup(self, key: str) -> dict[str, Any]:
+    def lookup(self, key: str, ring_version: int | None = None) -> dict[str, Any]:
+        ring = self._ring_at(ring_version)
+        self.lookups_total += 1
+        return {
+            "key": key,
+            "hash": HASH_FUNCTIONS[self.hash_name](key),
+            "node": ring.get_node(key),
+            "ring_version": ring.ring_version,
+        }
+
+    def lookup_many(self, keys: list[str]) -> dict[str, Any]:
+        self.lookups_total += len(keys)
+        return {
+            "owners": dict(zip(keys, self.ring.get_nodes(keys))),
+            "ring_version": self.ring.ring_version,
+        }
+
+    def replicas(self, key: str, n: int = 3) -> dict[str, Any]:
         self.lookups_total += 1
         return {
             "key": key,
-            "hash": hash_position(key),
-            "node": self.ring.get_node(key),
+            "replicas": self.ring.get_replicas(key, n),
             "ring_version": self.ring.ring_version,
         }
 
+    def acquire(self, key: str) -> dict[str, Any]:
+        """Bounded-load placement of one unit of work for key."""
+        node = self.bounded.acquire(key)
+        self.lookups_total += 1
+        return {
+            "key": key,
+            "node": node,
+            "preferred": self.ring.get_node(key),
+            "load": self.bounded.loads()[node],
+            "capacity": self.bounded.capacity(),
+        }
+
+    def release(self, node_id: str) -> dict[str, Any]:
+        if node_id not in self.ring.nodes():
+            raise ValueError(f"node not found: {node_id}")
+        self.bounded.release(node_id)
+        return {"node": node_id, "load": self.bounded.loads()[node_id]}
+
+    def load_stats(self) -> dict[str, Any]:
+        loads = self.bounded.loads()
+        return {
+            "epsilon": self.bounded.epsilon,
+            "loads": loads,
+            "capacity": self.bounded.capacity(),
+            "max_mean_ratio": round(load_ratio(loads), 4),
+        }
+
+    def bounded_load_simulation(
+        self, request_count: int = 10_000, epsilon: float = 0.25, hot_share: float = 0.3
+    ) -> dict[str, Any]:
+        """Skewed workload (one hot tenant) placed with and without a load bound."""
+        if not self.ring.nodes():
+            raise ValueError("ring is empty")
+        rng = random.Random(42)
+        keys = [
+            "tenant:hot" if rng.random() < hot_share else f"tenant:{rng.randrange(10_000)}"
+            for _ in range(request_count)
+        ]
+        unbounded = {n: 0 for n in self.ring.nodes()}
+        unbounded.update(Counter(self.ring.get_nodes(keys)))
+        bounded = BoundedLoadRing(self.ring.snapshot(), epsilon=epsilon)
+        for key in keys:
+            bounded.acquire(key)
+        return {
+            "requests": request_count,
+            "hot_share": hot_share,
+            "epsilon": epsilon,
+            "unbounded": {
+                "distribution": unbounded,
+                "max_mean_ratio": round(load_ratio(unbounded), 4),
+            },
+            "bounded": {
+                "distribution": bounded.loads(),
+                "max_mean_ratio": round(load_ratio(bounded.loads()), 4),
+                "capacity": bounded.capacity(),
+            },
+        }
+
     def balance_stats(self, key_count: int = 100_000) -> dict[str, Any]:
         if not self.ring.nodes():
             raise ValueError("ring is empty")
-        counts: dict[str, int] = {n: 0 for n in self.ring.nodes()}
-        for i in range(key_count):
-            node = self.ring.get_node(f"item:{i}")
-            counts[node] += 1
+        counts = self.ring.owner_counts(_synthetic_positions("item:", key_count))
         mean = key_count / len(counts)
         variance = sum((c - mean) ** 2 for c in counts.values()) / len(counts)
         cv = (variance**0.5) / mean if mean else 0.0
@@ -63,18 +192,17 @@ class RingService:
         }
 
     def compare_churn(self, key_count: int = 5_000) -> dict[str, Any]:
-        keys = [f"k:{i}" for i in range(key_count)]
-        ring_before = copy.deepcopy(self.ring)
-        ring_after = HashRing()
+        positions = _synthetic_positions("k:", key_count)
+        ring_before = self.ring.snapshot()
+        ring_after = self._new_ring()
         for node in self.ring.nodes():
             ring_after.add_node(node, vnode_count=64)
         ring_after.add_node(f"n{len(self.ring.nodes())}", vnode_count=64)
         n_before = len(ring_before.nodes())
         n_after = len(ring_after.nodes())
-        consistent = redistribution_ratio(keys, ring_before, ring_after)
-        modulo_before = {k: modulo_node(k, n_before) for k in keys}
-        modulo_after = {k: modulo_node(k, n_after) for k in keys}
-        modulo = sum(1 for k in keys if modulo_before[k] != modulo_after[k]) / len(keys)
+        before, after = ring_before.owners_at(positions), ring_after.owners_at(positions)
+        consistent = sum(map(str.__ne__, before, after)) / key_count if key_count else 0.0
+        modulo = modulo_churn_at(positions, n_before, n_after)
         return {
             "keys": key_count,
             "nodes_before": n_before,
@@ -87,12 +215,10 @@ class RingService:
     def node_failure_simulation(self, node_id: str, key_count: int = 10_000) -> dict[str, Any]:
         if node_id not in self.ring.nodes():
             raise ValueError(f"node not found: {node_id}")
-        keys = [f"key:{i}" for i in range(key_count)]
-        before = {k: self.ring.get_node(k) for k in keys}
-        snapshot = copy.deepcopy(self.ring)
+        snapshot = self.ring.snapshot()
         snapshot.remove_node(node_id)
-        after = {k: snapshot.get_node(k) for k in keys}
-        moved = sum(1 for k in keys if before[k] != after[k])
+        positions = _synthetic_positions("key:", key_count)
+        moved = sum(map(str.__ne__, self.ring.owners_at(positions), snapshot.owners_at(positions)))
         return {
             "failed_node": node_id,
             "keys_sampled": key_count,
@@ -103,10 +229,14 @@ class RingService:
 
     def stats(self) -> dict[str, Any]:
         return {
+            "backend": self.backend,
+            "hash_function": self.hash_name,
             "nodes": self.ring.nodes(),
             "node_count": len(self.ring.nodes()),
             "total_vnodes": self.ring.vnode_count(),
             "ring_version": self.ring.ring_version,
+            "retained_versions": list(self.versions),
+            "load": self.load_stats(),
             "lookups_total": self.lookups_total,
         }
 
@@ -115,3 +245,4 @@ class RingService:
             return
         for node in ("node-a", "node-b", "node-c"):
             self.ring.add_node(node, vnode_count=128)
+        self._record_version()
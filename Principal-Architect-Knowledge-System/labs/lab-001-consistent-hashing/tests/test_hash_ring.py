@@ -1,6 +1,8 @@
 """Tests for Lab 001: Consistent Hashing Ring."""
 
 import sys
+import time
+from collections import Counter
 from pathlib import Path
 
 import pytest
@@ -9,7 +11,23 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
-from src.ring import HashRing, RingEmptyError, hash_position, modulo_node, redistribution_ratio
+from src.bench import benchmark_membership, benchmark_ring
+from src.ring import (
+    BoundedLoadRing,
+    HashRing,
+    MaglevRing,
+    RingEmptyError,
+    fast_position,
+    fnv1a_numbered_positions,
+    fnv1a_position,
+    fnv1a_positions,
+    hash_batch,
+    hash_position,
+    load_ratio,
+    modulo_churn,
+    modulo_node,
+    redistribution_ratio,
+)
 from src.service import RingService
 
 
@@ -35,9 +53,9 @@ def test_single_node_all_keys_same_owner():
 def test_add_remove_idempotent():
     ring = HashRing()
     ring.add_node("node-a", vnode_count=16)
-    size_after_first = len(ring._ring)
+    size_after_first = ring.vnode_count()
     ring.add_node("node-a", vnode_count=16)
-    assert len(ring._ring) == size_after_first
+    assert ring.vnode_count() == size_after_first
 
 
 def test_removal_redistributes_minimally():
@@ -81,6 +99,213 @@ def test_modulo_vs_consistent_churn():
     assert consistent_churn < modulo_churn
 
 
+def test_fast_position_stable_64_bit():
+    assert fast_position("user:42") == fast_position("user:42")
+    assert fast_position("a") != fast_position("b")
+    assert 0 <= fast_position("user:42") < 2**64
+
+
+def test_vnode_ring_pluggable_hash():
+    ring = HashRing(hash_fn=fast_position)
+    ring.add_node("only-node", vnode_count=8)
+    assert ring.get_node("k:1") == "only-node"
+
+
+def test_maglev_empty_and_prime_table():
+    with pytest.raises(RingEmptyError):
+        MaglevRing(table_size=101).get_node("any-key")
+    with pytest.raises(ValueError):
+        MaglevRing(table_size=100)
+
+
+def test_maglev_balance_and_minimal_churn():
+    before = MaglevRing(table_size=5003)
+    after = MaglevRing(table_size=5003)
+    for n in range(5):
+        before.add_node(f"n{n}")
+        after.add_node(f"n{n}")
+    after.add_node("n5")
+    assert before.vnode_count() == 5003
+    counts: dict[str, int] = {}
+    for i in range(20_000):
+        node = before.get_node(f"item:{i}")
+        counts[node] = counts.get(node, 0) + 1
+    assert max(counts.values()) / min(counts.values()) < 1.1
+    keys = [f"k:{i}" for i in range(5_000)]
+    assert redistribution_ratio(keys, before, after) < 0.25
+
+
+def test_maglev_weighted_and_remove():
+    ring = MaglevRing(table_size=3001)
+    ring.add_node("small", vnode_count=64)
+    ring.add_node("big", vnode_count=128)
+    share = sum(1 for owner in ring._table if owner == "big") / ring.vnode_count()
+    assert 0.6 < share < 0.72
+    ring.remove_node("big")
+    assert ring.nodes() == ["small"]
+    assert ring.get_node("k:1") == "small"
+
+
+def test_service_maglev_backend():
+    service = RingService(backend="maglev")
+    service.seed_demo_cluster()
+    assert service.stats()["backend"] == "maglev"
+    assert service.lookup("user:42")["node"] in service.ring.nodes()
+    assert service.compare_churn(2_000)["consistent_wins"] is True
+    with pytest.raises(ValueError):
+        RingService(backend="nope")
+
+
+def test_fnv1a_batch_matches_scalar():
+    keys = [f"user:{i}" for i in range(200)] + ["", "é", "a\x00", "日本:1"]
+    batch = fnv1a_positions(keys)
+    assert [int(h) for h in batch] == [fnv1a_position(k) for k in keys]
+    assert [int(h) for h in hash_batch(keys[:5])] == [hash_position(k) for k in keys[:5]]
+
+
+@pytest.mark.parametrize("ring_factory", [HashRing, lambda **kw: MaglevRing(table_size=5003, **kw)])
+@pytest.mark.parametrize("hash_fn", [hash_position, fnv1a_position])
+def test_get_nodes_matches_get_node(ring_factory, hash_fn):
+    ring = ring_factory(hash_fn=hash_fn)
+    for n in ("a", "b", "c"):
+        ring.add_node(n, vnode_count=32)
+    keys = [f"k:{i}" for i in range(500)]
+    assert ring.get_nodes(keys) == [ring.get_node(k) for k in keys]
+    ring.remove_node("b")
+    assert ring.get_nodes(keys) == [ring.get_node(k) for k in keys]
+
+
+def test_fnv1a_numbered_positions_match_key_strings():
+    for count in (0, 1, 10, 11, 1_234):
+        keys = [f"item:{i}" for i in range(count)]
+        assert fnv1a_numbered_positions("item:", count).tolist() == fnv1a_positions(keys).tolist()
+
+
+@pytest.mark.parametrize("ring_factory", [HashRing, lambda **kw: MaglevRing(table_size=5003, **kw)])
+def test_owner_counts_match_get_nodes(ring_factory):
+    ring = ring_factory(hash_fn=fnv1a_position)
+    for n in ("a", "b", "c"):
+        ring.add_node(n, vnode_count=32)
+    keys = [f"k:{i}" for i in range(2_000)]
+    positions = fnv1a_positions(keys)
+    assert ring.owners_at(positions) == ring.get_nodes(keys)
+    assert ring.owner_counts(positions) == {"a": 0, "b": 0, "c": 0, **Counter(ring.get_nodes(keys))}
+
+
+def test_million_key_balance_under_a_second():
+    service = RingService()  # sha256 lookups; simulations hash with vectorized FNV-1a
+    service.seed_demo_cluster()
+    started = time.perf_counter()
+    stats = service.balance_stats(1_000_000)
+    assert time.perf_counter() - started < 1.0
+    assert sum(stats["distribution"].values()) == 1_000_000
+    assert stats["coefficient_of_variation"] < 0.1
+
+
+def test_get_nodes_empty_ring_raises():
+    with pytest.raises(RingEmptyError):
+        HashRing().get_nodes(["k"])
+
+
+def test_modulo_churn_matches_scalar():
+    keys = [f"k:{i}" for i in range(1_000)]
+    expected = sum(1 for k in keys if modulo_node(k, 5) != modulo_node(k, 6)) / len(keys)
+    assert modulo_churn(keys, 5, 6) == expected
+
+
+def test_benchmark_reports_throughput_and_churn():
+    result = benchmark_ring("vnode", "crc", key_count=1_000, node_count=4, vnode_count=16)
+    assert result["lookups_per_sec"] > 0
+    assert result["batch_lookups_per_sec"] > 0
+    assert 0 < result["churn_on_add"] < 1
+
+
+def test_incremental_membership_matches_rebuilt_ring():
+    ring = HashRing(hash_fn=fnv1a_position)
+    for n in range(40):
+        ring.add_node(f"n{n}", vnode_count=64)
+    for n in range(0, 40, 3):
+        ring.remove_node(f"n{n}")
+    rebuilt = HashRing(hash_fn=fnv1a_position)
+    for n in ring.nodes():
+        rebuilt.add_node(n, vnode_count=64)
+    keys = [f"k:{i}" for i in range(2_000)]
+    assert ring.vnode_count() == rebuilt.vnode_count()
+    assert [ring.get_node(k) for k in keys] == rebuilt.get_nodes(keys)
+
+
+def test_snapshot_is_isolated_copy_on_write():
+    ring = HashRing()
+    for n in ("a", "b", "c"):
+        ring.add_node(n, vnode_count=64)
+    snap = ring.snapshot()
+    keys = [f"k:{i}" for i in range(500)]
+    owners = snap.get_nodes(keys)
+    ring.remove_node("b")
+    ring.add_node("d", vnode_count=64)
+    assert snap.nodes() == ["a", "b", "c"]
+    assert snap.get_nodes(keys) == owners
+    assert snap.ring_version == 3
+    snap.add_node("e", vnode_count=8)
+    assert ring.nodes() == ["a", "c", "d"]
+
+
+def test_service_retains_ring_versions():
+    service = RingService()
+    service.seed_demo_cluster()
+    seeded = service.ring.ring_version
+    before = service.lookup("user:42")["node"]
+    service.remove_node(before)
+    assert service.lookup("user:42", ring_version=seeded)["node"] == before
+    assert service.lookup("user:42")["node"] != before
+    with pytest.raises(ValueError):
+        service.lookup("user:42", ring_version=-1)
+
+
+def test_membership_benchmark():
+    result = benchmark_membership(node_count=50, vnode_count=32, changes=2)
+    assert result["total_vnodes"] == 50 * 32
+    assert result["snapshot_unchanged"] is True
+
+
+@pytest.mark.parametrize("ring_factory", [HashRing, lambda: MaglevRing(table_size=5003)])
+def test_get_replicas_distinct_and_primary_first(ring_factory):
+    ring = ring_factory()
+    for n in ("a", "b", "c", "d"):
+        ring.add_node(n, vnode_count=32)
+    replicas = ring.get_replicas("user:42", 3)
+    assert len(set(replicas)) == 3
+    assert replicas[0] == ring.get_node("user:42")
+    assert sorted(ring.get_replicas("user:42", 10)) == ["a", "b", "c", "d"]
+    with pytest.raises(ValueError):
+        ring.get_replicas("user:42", 0)
+
+
+def test_bounded_load_caps_hot_key():
+    ring = HashRing()
+    for n in range(5):
+        ring.add_node(f"n{n}", vnode_count=64)
+    bounded = BoundedLoadRing(ring, epsilon=0.25)
+    placed = [bounded.acquire("tenant:hot") for _ in range(1_000)]
+    loads = bounded.loads()
+    assert max(loads.values()) <= bounded.capacity() == 250
+    assert placed[0] == ring.get_node("tenant:hot")
+    assert load_ratio(loads) <= 1.25
+    bounded.release(placed[0])
+    assert sum(bounded.loads().values()) == 999
+
+
+def test_service_bounded_load_simulation_and_replicas():
+    service = RingService()
+    service.seed_demo_cluster()
+    result = service.bounded_load_simulation(5_000, epsilon=0.1, hot_share=0.5)
+    bounded = result["bounded"]
+    assert max(bounded["distribution"].values()) <= bounded["capacity"]
+    assert bounded["max_mean_ratio"] < 1.11
+    assert result["unbounded"]["max_mean_ratio"] > result["bounded"]["max_mean_ratio"]
+    assert len(service.replicas("user:42", 2)["replicas"]) == 2
+
+
 def test_http_lookup():
     service = RingService()
     service.seed_demo_cluster()
@@ -99,6 +324,34 @@ def test_http_churn_simulation():
     assert resp.json()["consistent_wins"] is True
 
 
+def test_http_batch_lookup_and_large_balance():
+    service = RingService()
+    service.seed_demo_cluster()
+    client = TestClient(create_app(service))
+    resp = client.post("/v1/lookup/batch", json={"keys": ["user:1", "user:2"]})
+    assert resp.status_code == 200
+    owners = resp.json()["owners"]
+    assert owners["user:1"] == service.lookup("user:1")["node"]
+    resp = client.post("/v1/simulate/balance", json={"key_count": 1_000_000})
+    assert resp.status_code == 200
+    assert sum(resp.json()["distribution"].values()) == 1_000_000
+
+
+def test_http_replicas_acquire_release():
+    service = RingService()
+    service.seed_demo_cluster()
+    client = TestClient(create_app(service))
+    resp = client.get("/v1/replicas/user:42", params={"n": 2})
+    assert resp.status_code == 200
+    assert len(resp.json()["replicas"]) == 2
+    node = client.post("/v1/acquire", json={"key": "user:42"}).json()["node"]
+    assert client.get("/v1/load").json()["loads"][node] == 1
+    assert client.post(f"/v1/release/{node}").json()["load"] == 0
+    assert client.post("/v1/release/ghost").status_code == 404
+    resp = client.post("/v1/simulate/bounded-load", json={"request_count": 1000})
+    assert resp.status_code == 200
+
+
 def test_swagger_docs():
     service = RingService()
     client = TestClient(create_app(service))
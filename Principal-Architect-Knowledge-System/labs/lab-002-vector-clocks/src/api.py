@@ -7,7 +7,8 @@ from typing import Any
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 
-from .schemas import CompareRequest, LocalEventRequest, SendMessageRequest
+from .clocks import ClockDecodeError
+from .schemas import CompareRequest, LocalEventRequest, PutObjectRequest, SendMessageRequest
 from .service import ClockService, ProcessNotFoundError
 
 _LANDING_HTML = """<!DOCTYPE html>
@@ -66,6 +67,9 @@ def create_app(service: ClockService) -> FastAPI:
                 "send": "POST /v1/messages/send",
                 "delivered": "GET /v1/mailbox/delivered",
                 "compare": "POST /v1/clocks/compare",
+                "object_get": "GET /v1/objects/{key}",
+                "object_put": "PUT /v1/objects/{key}",
+                "retire_replica": "POST /v1/replicas/{replica_id}/retire",
             },
         }
 
@@ -103,4 +107,21 @@ def create_app(service: ClockService) -> FastAPI:
     def compare_clocks(body: CompareRequest) -> dict[str, Any]:
         return service.compare_clocks(body.clock_a, body.clock_b)
 
+    @app.get("/v1/objects/{key}")
+    def get_object(key: str) -> dict[str, Any]:
+        return service.get_object(key)
+
+    @app.put("/v1/objects/{key}")
+    def put_object(key: str, body: PutObjectRequest) -> dict[str, Any]:
+        try:
+            return service.put_object(key, body.replica_id, body.value, body.context)
+        except ClockDecodeError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+    @app.post("/v1/replicas/{replica_id}/retire")
+    def retire_replica(replica_id: str) -> dict[str, Any]:
+        return service.retire_replica(replica_id)
+
     return app
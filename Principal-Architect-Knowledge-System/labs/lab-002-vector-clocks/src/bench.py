@@ -0,0 +1,70 @@
+"""Benchmark — causal delivery of a reordered burst, list vs array clocks."""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Any
+
+from .clocks import ArrayVectorClock, CausalMailbox, Message, VectorClock, compare
+
+CLOCK_TYPES: dict[str, type[VectorClock] | type[ArrayVectorClock]] = {
+    "list": VectorClock,
+    "array": ArrayVectorClock,
+}
+
+
+def causal_workload(
+    message_count: int = 10_000, processes: int = 64, seed: int = 7
+) -> list[tuple[str, int, list[int]]]:
+    """Messages with cross-process dependencies, then shuffled (out of order)."""
+    rng = random.Random(seed)
+    clocks = [[0] * processes for _ in range(processes)]
+    sent: list[tuple[str, int, list[int]]] = []
+    for k in range(message_count):
+        sender = rng.randrange(processes)
+        if sent and rng.random() < 0.5:
+            seen = rng.choice(sent)[2]
+            clocks[sender] = [max(a, b) for a, b in zip(clocks[sender], seen)]
+        clocks[sender][sender] += 1
+        sent.append((f"m{k}", sender, list(clocks[sender])))
+    rng.shuffle(sent)
+    return sent
+
+
+def benchmark_mailbox(
+    clock_type: str, message_count: int = 10_000, processes: int = 64, seed: int = 7
+) -> dict[str, Any]:
+    """Submit a shuffled workload to one mailbox and time end-to-end delivery."""
+    clock_cls = CLOCK_TYPES[clock_type]
+    messages = [
+        Message(msg_id, sender, None, clock_cls(processes, values))
+        for msg_id, sender, values in causal_workload(message_count, processes, seed)
+    ]
+    mailbox = CausalMailbox()
+    started = time.perf_counter()
+    for message in messages:
+        mailbox.submit(message)
+    elapsed = time.perf_counter() - started
+
+    a, b = messages[0].clock, messages[-1].clock
+    ops = 10_000
+    started = time.perf_counter()
+    for _ in range(ops):
+        a.copy().merge(b)
+        compare(a, b)
+    clock_s = time.perf_counter() - started
+    return {
+        "clock_type": clock_type,
+        "messages": message_count,
+        "processes": processes,
+        "delivered": len(mailbox.delivered),
+        "still_pending": len(mailbox.pending),
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "messages_per_sec": round(message_count / elapsed) if elapsed else None,
+        "merge_compare_per_sec": round(ops / clock_s) if clock_s else None,
+    }
+
+
+def run_benchmark(message_count: int = 10_000, processes: int = 64) -> list[dict[str, Any]]:
+    return [benchmark_mailbox(name, message_count, processes) for name in CLOCK_TYPES]
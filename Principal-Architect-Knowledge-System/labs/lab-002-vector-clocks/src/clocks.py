@@ -3,9 +3,13 @@
 from __future__ import annotations
 
 import enum
+import heapq
+from collections import defaultdict
 from dataclasses import dataclass, field
 from typing import Any
 
+import numpy as np
+
 
 class Relation(enum.Enum):
     BEFORE = "before"
@@ -36,8 +40,36 @@ class VectorClock:
         return VectorClock(self.size, self.values.copy())
 
 
-def compare(a: VectorClock, b: VectorClock) -> Relation:
+@dataclass
+class ArrayVectorClock:
+    """Vector clock backed by a contiguous uint64 array (vectorized merge/compare)."""
+
+    size: int
+    values: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint64))
+
+    def __post_init__(self) -> None:
+        if len(self.values) == 0:
+            self.values = np.zeros(self.size, dtype=np.uint64)
+        else:
+            self.values = np.asarray(self.values, dtype=np.uint64)
+
+    def increment(self, process_id: int) -> None:
+        self.values[process_id] += 1
+
+    def merge(self, other: VectorClock | ArrayVectorClock) -> None:
+        np.maximum(self.values, np.asarray(other.values, dtype=np.uint64), out=self.values)
+
+    def copy(self) -> ArrayVectorClock:
+        return ArrayVectorClock(self.size, self.values.copy())
+
+    def to_list(self) -> list[int]:
+        return self.values.tolist()
+
+
+def compare(a: VectorClock | ArrayVectorClock, b: VectorClock | ArrayVectorClock) -> Relation:
     """Compare two vector clocks."""
+    if isinstance(a, ArrayVectorClock) or isinstance(b, ArrayVectorClock):
+        return _compare_arrays(np.asarray(a.values), np.asarray(b.values))
     if a.values == b.values:
         return Relation.EQUAL
     a_le_b = all(x <= y for x, y in zip(a.values, b.values))
@@ -49,12 +81,24 @@ def compare(a: VectorClock, b: VectorClock) -> Relation:
     return Relation.CONCURRENT
 
 
+def _compare_arrays(a: np.ndarray, b: np.ndarray) -> Relation:
+    a_le_b = bool(np.all(a <= b))
+    b_le_a = bool(np.all(b <= a))
+    if a_le_b and b_le_a:
+        return Relation.EQUAL
+    if a_le_b:
+        return Relation.BEFORE
+    if b_le_a:
+        return Relation.AFTER
+    return Relation.CONCURRENT
+
+
 @dataclass
 class Message:
     msg_id: str
     sender: int
     payload: Any
-    clock: VectorClock
+    clock: VectorClock | ArrayVectorClock
     recipient: int | None = None
 
 
@@ -84,38 +128,80 @@ class Process:
 
 @dataclass
 class CausalMailbox:
-    """Buffers messages until causal dependencies are satisfied."""
+    """Buffers messages until causal dependencies are satisfied.
+
+    A message from ``s`` with clock ``v`` is deliverable once ``v[s]`` is the
+    next expected value from ``s`` and no other component runs more than one
+    ahead of what has been delivered. Pending messages are indexed rather than
+    rescanned: by ``(sender, v[sender])`` while waiting for their turn, or by
+    the one blocking component ``j`` while waiting for ``delivered[j]`` to
+    catch up. Each delivery wakes only the entries keyed on components it
+    advanced; ready messages go out in arrival order.
+    """
 
     delivered: list[Message] = field(default_factory=list)
-    pending: list[Message] = field(default_factory=list)
-    _delivered_vec: list[int] = field(default_factory=list)
+    _delivered_vec: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    _pending: dict[int, Message] = field(default_factory=dict)
+    _arrivals: int = 0
+    _by_seq: defaultdict[tuple[int, int], list[tuple[int, np.ndarray]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    _waiting: defaultdict[int, list[tuple[int, int, np.ndarray]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    _ready: list[tuple[int, np.ndarray]] = field(default_factory=list)
+
+    @property
+    def pending(self) -> list[Message]:
+        """Buffered messages in arrival order."""
+        return list(self._pending.values())
 
     def submit(self, message: Message) -> list[Message]:
         """Submit message; return newly deliverable messages in order."""
-        if not self._delivered_vec:
-            self._delivered_vec = [0] * len(message.clock.values)
-        self.pending.append(message)
+        if not len(self._delivered_vec):
+            self._delivered_vec = np.zeros(len(message.clock.values), dtype=np.int64)
+        arrival = self._arrivals
+        self._arrivals += 1
+        self._pending[arrival] = message
+        self._route(arrival, np.asarray(message.clock.values, dtype=np.int64))
         return self._try_deliver()
 
+    def _route(self, arrival: int, v: np.ndarray) -> None:
+        """File a pending message under whatever it is currently waiting on."""
+        s = self._pending[arrival].sender
+        expected = self._delivered_vec[s] + 1
+        if v[s] != expected:
+            if v[s] > expected:
+                self._by_seq[(s, int(v[s]))].append((arrival, v))
+            return  # v[s] < expected: superseded, never deliverable — stays pending
+        ahead = np.flatnonzero(v > self._delivered_vec + 1)
+        ahead = ahead[ahead != s]
+        if len(ahead):
+            j = int(ahead[0])
+            heapq.heappush(self._waiting[j], (int(v[j]) - 1, arrival, v))
+            return
+        heapq.heappush(self._ready, (arrival, v))
+
     def _try_deliver(self) -> list[Message]:
         newly: list[Message] = []
-        changed = True
-        while changed:
-            changed = False
-            for i, msg in enumerate(list(self.pending)):
-                v = msg.clock.values
-                s = msg.sender
-                if v[s] != self._delivered_vec[s] + 1:
-                    continue
-                if any(v[j] > self._delivered_vec[j] + 1 for j in range(len(v)) if j != s):
-                    continue
-                self.pending.pop(i)
-                self.delivered.append(msg)
-                for j in range(len(v)):
-                    self._delivered_vec[j] = max(self._delivered_vec[j], v[j])
-                newly.append(msg)
-                changed = True
-                break
+        while self._ready:
+            arrival, v = heapq.heappop(self._ready)
+            msg = self._pending[arrival]
+            if v[msg.sender] != self._delivered_vec[msg.sender] + 1:
+                continue  # a same-sequence duplicate went first
+            del self._pending[arrival]
+            self.delivered.append(msg)
+            newly.append(msg)
+            advanced = np.flatnonzero(v > self._delivered_vec)
+            np.maximum(self._delivered_vec, v, out=self._delivered_vec)
+            for j in advanced.tolist():
+                floor = int(self._delivered_vec[j])
+                for woken in self._by_seq.pop((j, floor + 1), ()):
+                    self._route(*woken)
+                waiters = self._waiting.get(j)
+                while waiters and waiters[0][0] <= floor:
+                    _, woken_arrival, woken_v = heapq.heappop(waiters)
+                    self._route(woken_arrival, woken_v)
         return newly
 
 
@@ -127,3 +213,182 @@ class VersionVector:
 
     def increment(self, replica_id: str) -> None:
         self.values[replica_id] = self.values.get(replica_id, 0) + 1
+
+
+class ClockDecodeError(ValueError):
+    """Raised when a binary clock encoding is truncated or malformed."""
+
+
+@dataclass
+class ReplicaRegistry:
+    """Interns replica ids to small integers shared by encoder and decoder."""
+
+    names: list[str] = field(default_factory=list)
+    _ids: dict[str, int] = field(default_factory=dict)
+
+    def intern(self, replica_id: str) -> int:
+        if replica_id not in self._ids:
+            self._ids[replica_id] = len(self.names)
+            self.names.append(replica_id)
+        return self._ids[replica_id]
+
+    def name(self, index: int) -> str:
+        if not 0 <= index < len(self.names):
+            raise ClockDecodeError(f"unknown replica index: {index}")
+        return self.names[index]
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ClockDecodeError("truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+@dataclass
+class DottedVersionVector:
+    """Dotted version vector (Preguiça et al., 2012): one event dot plus its causal past.
+
+    ``context`` is sparse — replicas the version never saw have no entry — and
+    ``dot`` is the single write event this version represents. Unlike a plain
+    version vector, two concurrent writes coordinated by the same replica get
+    distinct dots, so siblings are never falsely collapsed.
+    """
+
+    dot: tuple[str, int] | None = None
+    context: dict[str, int] = field(default_factory=dict)
+
+    def covers(self, dot: tuple[str, int]) -> bool:
+        """True when ``dot`` is in this version's event set."""
+        return dot == self.dot or dot[1] <= self.context.get(dot[0], 0)
+
+    def join(self) -> dict[str, int]:
+        """Flatten to a plain version vector (context plus dot)."""
+        joined = dict(self.context)
+        if self.dot is not None:
+            replica, counter = self.dot
+            joined[replica] = max(joined.get(replica, 0), counter)
+        return joined
+
+    def descends(self, other: DottedVersionVector) -> bool:
+        if other.dot is not None and not self.covers(other.dot):
+            return False
+        return all(self.covers((r, n)) for r, n in other.context.items() if n)
+
+    def compare(self, other: DottedVersionVector) -> Relation:
+        ge, le = self.descends(other), other.descends(self)
+        if ge and le:
+            return Relation.EQUAL
+        if le:
+            return Relation.BEFORE
+        if ge:
+            return Relation.AFTER
+        return Relation.CONCURRENT
+
+    def prune(self, retired: set[str]) -> None:
+        """Drop context entries of retired replicas (safe once replicas have converged)."""
+        for replica in retired & self.context.keys():
+            del self.context[replica]
+
+    def encode(self, registry: ReplicaRegistry) -> bytes:
+        """Varint encoding: entries sorted by replica index, indexes delta-encoded."""
+        out = bytearray()
+        entries = sorted((registry.intern(r), n) for r, n in self.context.items() if n)
+        _put_varint(out, len(entries))
+        previous = 0
+        for index, counter in entries:
+            _put_varint(out, index - previous)
+            _put_varint(out, counter)
+            previous = index
+        if self.dot is None:
+            _put_varint(out, 0)
+        else:
+            _put_varint(out, registry.intern(self.dot[0]) + 1)
+            _put_varint(out, self.dot[1])
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data: bytes, registry: ReplicaRegistry) -> DottedVersionVector:
+        count, pos = _get_varint(data, 0)
+        context: dict[str, int] = {}
+        index = 0
+        for _ in range(count):
+            delta, pos = _get_varint(data, pos)
+            counter, pos = _get_varint(data, pos)
+            index += delta
+            context[registry.name(index)] = counter
+        dot_index, pos = _get_varint(data, pos)
+        dot = None
+        if dot_index:
+            counter, pos = _get_varint(data, pos)
+            dot = (registry.name(dot_index - 1), counter)
+        if pos != len(data):
+            raise ClockDecodeError("trailing bytes after clock")
+        return cls(dot, context)
+
+
+@dataclass
+class Sibling:
+    clock: DottedVersionVector
+    value: Any
+
+
+@dataclass
+class VersionedValues:
+    """Sibling set for one key, tracked with dotted version vectors."""
+
+    siblings: list[Sibling] = field(default_factory=list)
+
+    def context(self) -> dict[str, int]:
+        """Causal context a client reads and hands back on its next write."""
+        merged: dict[str, int] = {}
+        for sibling in self.siblings:
+            for replica, counter in sibling.clock.join().items():
+                merged[replica] = max(merged.get(replica, 0), counter)
+        return merged
+
+    def values(self) -> list[Any]:
+        return [s.value for s in self.siblings]
+
+    def put(self, replica_id: str, value: Any, context: dict[str, int] | None = None) -> Sibling:
+        """Coordinate a write at ``replica_id``: supersede what the client saw, keep the rest."""
+        seen = DottedVersionVector(None, dict(context or {}))
+        counter = max(self.context().get(replica_id, 0), seen.context.get(replica_id, 0)) + 1
+        self.siblings = [s for s in self.siblings if not seen.covers(s.clock.dot)]
+        sibling = Sibling(DottedVersionVector((replica_id, counter), seen.context), value)
+        self.siblings.append(sibling)
+        return sibling
+
+    def sync(self, other: VersionedValues) -> None:
+        """Anti-entropy merge: keep every sibling no other sibling descends from."""
+        candidates: dict[tuple[str, int] | None, Sibling] = {}
+        for sibling in [*self.siblings, *other.siblings]:
+            candidates.setdefault(sibling.clock.dot, sibling)
+        self.siblings = [
+            s
+            for s in candidates.values()
+            if not any(
+                o is not s and o.clock.covers(s.clock.dot) for o in candidates.values()
+            )
+        ]
+
+    def prune(self, retired: set[str]) -> None:
+        for sibling in self.siblings:
+            sibling.clock.prune(retired)
+
+    def encoded_size(self, registry: ReplicaRegistry) -> int:
+        """Bytes of causality metadata (values excluded)."""
+        return sum(len(s.clock.encode(registry)) for s in self.siblings)
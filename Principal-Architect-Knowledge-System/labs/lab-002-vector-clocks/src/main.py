@@ -7,6 +7,7 @@ import argparse
 import json
 
 from .api import create_app
+from .bench import run_benchmark
 from .service import ClockService
 
 
@@ -26,10 +27,15 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Lab 002: Vector Clocks")
     parser.add_argument("--serve", action="store_true", help="Start API on :8097")
     parser.add_argument("--demo", action="store_true", help="Run CLI demo")
+    parser.add_argument("--bench", action="store_true", help="Benchmark causal delivery")
     parser.add_argument("--inject", choices=["delayed-message", "duplicate-delivery"])
     parser.add_argument("--port", type=int, default=8097)
     args = parser.parse_args()
 
+    if args.bench:
+        print(json.dumps(run_benchmark(), indent=2))
+        return 0
+
     service = ClockService()
 
     if args.inject:
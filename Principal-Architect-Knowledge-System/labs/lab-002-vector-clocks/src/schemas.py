@@ -24,3 +24,9 @@ class SendMessageRequest(BaseModel):
 class CompareRequest(BaseModel):
     clock_a: list[int] = Field(..., examples=[[1, 0]])
     clock_b: list[int] = Field(..., examples=[[2, 1]])
+
+
+class PutObjectRequest(BaseModel):
+    replica_id: str = Field(..., examples=["R1"])
+    value: Any = Field(..., examples=["cart-v1"])
+    context: str | None = Field(default=None, description="Opaque token from the last GET")
@@ -2,9 +2,21 @@
 
 from __future__ import annotations
 
+import base64
 from typing import Any
 
-from .clocks import CausalMailbox, Message, Process, Relation, VectorClock, compare
+from .clocks import (
+    CausalMailbox,
+    ClockDecodeError,
+    DottedVersionVector,
+    Message,
+    Process,
+    Relation,
+    ReplicaRegistry,
+    VectorClock,
+    VersionedValues,
+    compare,
+)
 
 
 class ProcessNotFoundError(ValueError):
@@ -20,6 +32,9 @@ class ClockService:
         self.processes: dict[int, Process] = {}
         self.events_total = 0
         self.messages_sent = 0
+        self.registry = ReplicaRegistry()
+        self.objects: dict[str, VersionedValues] = {}
+        self.retired_replicas: set[str] = set()
 
     def seed_demo_processes(self, num_processes: int = 2) -> None:
         if self.processes:
@@ -93,6 +108,9 @@ class ClockService:
                 for m in self.mailbox.delivered
             ],
             "pending_count": len(self.mailbox.pending),
+            "objects": len(self.objects),
+            "replicas": len(self.registry.names),
+            "retired_replicas": sorted(self.retired_replicas),
         }
 
     def compare_clocks(self, clock_a: list[int], clock_b: list[int]) -> dict[str, Any]:
@@ -118,6 +136,51 @@ class ClockService:
             ],
         }
 
+    def _encode_context(self, context: dict[str, int]) -> str:
+        raw = DottedVersionVector(None, context).encode(self.registry)
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def _decode_context(self, token: str | None) -> dict[str, int]:
+        if not token:
+            return {}
+        try:
+            raw = base64.urlsafe_b64decode(token.encode("ascii"))
+        except ValueError as exc:
+            raise ClockDecodeError(f"invalid context token: {exc}") from exc
+        return DottedVersionVector.decode(raw, self.registry).context
+
+    def get_object(self, key: str) -> dict[str, Any]:
+        obj = self.objects.get(key, VersionedValues())
+        return {
+            "key": key,
+            "values": obj.values(),
+            "siblings": len(obj.siblings),
+            "context": self._encode_context(obj.context()),
+            "metadata_bytes": obj.encoded_size(self.registry),
+        }
+
+    def put_object(
+        self, key: str, replica_id: str, value: Any, context: str | None = None
+    ) -> dict[str, Any]:
+        if replica_id in self.retired_replicas:
+            raise ValueError(f"replica retired: {replica_id}")
+        obj = self.objects.setdefault(key, VersionedValues())
+        sibling = obj.put(replica_id, value, self._decode_context(context))
+        return {"dot": list(sibling.clock.dot or ()), **self.get_object(key)}
+
+    def retire_replica(self, replica_id: str) -> dict[str, Any]:
+        """Prune a decommissioned replica's entries from every object's metadata."""
+        self.retired_replicas.add(replica_id)
+        before = sum(o.encoded_size(self.registry) for o in self.objects.values())
+        for obj in self.objects.values():
+            obj.prune({replica_id})
+        after = sum(o.encoded_size(self.registry) for o in self.objects.values())
+        return {
+            "retired": replica_id,
+            "metadata_bytes_before": before,
+            "metadata_bytes_after": after,
+        }
+
     def stats(self) -> dict[str, Any]:
         return {
             "num_processes": self.num_processes,
@@ -125,4 +188,7 @@ class ClockService:
             "messages_sent": self.messages_sent,
             "delivered_count": len(self.mailbox.delivered),
             "pending_count": len(self.mailbox.pending),
+            "objects": len(self.objects),
+            "replicas": len(self.registry.names),
+            "retired_replicas": sorted(self.retired_replicas),
         }
@@ -9,12 +9,18 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
+from src.bench import benchmark_mailbox
 from src.clocks import (
+    ArrayVectorClock,
     CausalMailbox,
+    ClockDecodeError,
+    DottedVersionVector,
     Message,
     Process,
     Relation,
+    ReplicaRegistry,
     VectorClock,
+    VersionedValues,
     VersionVector,
     compare,
 )
@@ -61,6 +67,43 @@ def test_causal_delivery():
     assert [m.msg_id for m in delivered] == ["m1", "m2"]
 
 
+def test_array_clock_merge_and_compare():
+    vc = ArrayVectorClock(size=3, values=[2, 1, 0])
+    vc.merge(ArrayVectorClock(size=3, values=[1, 3, 0]))
+    vc.increment(2)
+    assert vc.to_list() == [2, 3, 1]
+    assert compare(vc, ArrayVectorClock(size=3, values=[2, 3, 2])) == Relation.BEFORE
+    assert compare(vc, VectorClock(size=3, values=[2, 3, 1])) == Relation.EQUAL
+    assert compare(vc, ArrayVectorClock(size=3, values=[3, 0, 0])) == Relation.CONCURRENT
+    assert vc.copy().values is not vc.values
+
+
+def test_causal_delivery_reordered_burst():
+    mailbox = CausalMailbox()
+    msgs = [Message(f"p0-{i}", 0, None, ArrayVectorClock(2, [i, 0])) for i in range(1, 7)]
+    for msg in reversed(msgs[1:]):
+        assert mailbox.submit(msg) == []
+    assert len(mailbox.pending) == 5
+    released = mailbox.submit(msgs[0])
+    assert [m.msg_id for m in released] == [m.msg_id for m in msgs]
+    assert mailbox.pending == []
+
+
+def test_causal_delivery_holds_gapped_sender():
+    mailbox = CausalMailbox()
+    mailbox.submit(Message("a2", 0, None, VectorClock(2, [2, 0])))
+    mailbox.submit(Message("b1", 1, None, VectorClock(2, [0, 1])))
+    assert [m.msg_id for m in mailbox.delivered] == ["b1"]
+    assert [m.msg_id for m in mailbox.pending] == ["a2"]
+
+
+def test_mailbox_benchmark_delivers_shuffled_burst():
+    result = benchmark_mailbox("array", message_count=500, processes=8)
+    assert result["delivered"] + result["still_pending"] == 500
+    assert result["delivered"] > 400
+    assert result["messages_per_sec"] > 0
+
+
 def test_sibling_detection():
     VersionVector({"R1": 1})
     VersionVector({"R2": 1})
@@ -69,6 +112,67 @@ def test_sibling_detection():
     assert compare(a, b) == Relation.CONCURRENT
 
 
+def test_dvv_keeps_concurrent_writes_on_same_replica():
+    obj = VersionedValues()
+    obj.put("R1", "v1")
+    ctx = obj.context()
+    obj.put("R1", "v2", ctx)
+    obj.put("R1", "v3", ctx)
+    assert obj.values() == ["v2", "v3"]
+    a, b = (s.clock for s in obj.siblings)
+    assert a.compare(b) == Relation.CONCURRENT
+    obj.put("R2", "merged", obj.context())
+    assert obj.values() == ["merged"]
+    assert obj.context() == {"R1": 3, "R2": 1}
+
+
+def test_dvv_compare_and_sync():
+    older = DottedVersionVector(("R1", 1), {})
+    newer = DottedVersionVector(("R2", 1), {"R1": 1})
+    assert older.compare(newer) == Relation.BEFORE
+    assert newer.compare(older) == Relation.AFTER
+    left, right = VersionedValues(), VersionedValues()
+    left.put("R1", "a")
+    right.sync(left)
+    right.put("R2", "b", right.context())
+    left.put("R1", "c", left.context())
+    left.sync(right)
+    assert sorted(left.values()) == ["b", "c"]
+
+
+def test_dvv_binary_round_trip_and_prune():
+    registry = ReplicaRegistry()
+    clock = DottedVersionVector(("R3", 7), {"R1": 300, "R2": 1, "R9": 0})
+    raw = clock.encode(registry)
+    decoded = DottedVersionVector.decode(raw, registry)
+    assert decoded.dot == ("R3", 7)
+    assert decoded.context == {"R1": 300, "R2": 1}
+    assert len(raw) <= 8
+    clock.prune({"R1"})
+    assert len(clock.encode(registry)) < len(raw)
+    with pytest.raises(ClockDecodeError):
+        DottedVersionVector.decode(raw[:-1], registry)
+
+
+def test_http_objects_siblings_and_retire():
+    service = ClockService()
+    client = TestClient(create_app(service))
+    first = client.put("/v1/objects/cart", json={"replica_id": "R1", "value": "a"}).json()
+    ctx = first["context"]
+    client.put("/v1/objects/cart", json={"replica_id": "R1", "value": "b", "context": ctx})
+    resp = client.put("/v1/objects/cart", json={"replica_id": "R2", "value": "c", "context": ctx})
+    assert sorted(resp.json()["values"]) == ["b", "c"]
+    assert resp.json()["siblings"] == 2
+    retired = client.post("/v1/replicas/R1/retire").json()
+    assert retired["metadata_bytes_after"] < retired["metadata_bytes_before"]
+    resp = client.put("/v1/objects/cart", json={"replica_id": "R1", "value": "d"})
+    assert resp.status_code == 409
+    resp = client.put(
+        "/v1/objects/cart", json={"replica_id": "R2", "value": "d", "context": "!!"}
+    )
+    assert resp.status_code == 400
+
+
 def test_service_send_and_deliver():
     service = ClockService()
     service.seed_demo_processes(2)
@@ -7,7 +7,8 @@ from typing import Any
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 
-from .schemas import PartitionRequest, PutKeyRequest
+from .quorum import READ_MODES
+from .schemas import PartitionRequest, PutKeyRequest, QuorumPutRequest
 from .service import ConsistencyService
 
 _LANDING_HTML = """<!DOCTYPE html>
@@ -60,8 +61,14 @@ def create_app(service: ConsistencyService) -> FastAPI:
                 "put": "POST /v1/keys/{key}",
                 "get": "GET /v1/keys/{key}?replica=r1",
                 "replicate": "POST /v1/replicate/run",
+                "replication_rounds": "GET /v1/replicate/rounds",
+                "anti_entropy": "POST /v1/anti-entropy/run",
                 "partition": "POST /v1/chaos/partition",
                 "read_repair": "POST /v1/keys/{key}/repair",
+                "quorum_put": "POST /v1/quorum/keys/{key}",
+                "quorum_get": "GET /v1/quorum/keys/{key}?mode=hedged",
+                "deliver_hints": "POST /v1/quorum/hints/deliver",
+                "quorum_latency": "GET /v1/quorum/latency?requests=5000",
             },
         }
 
@@ -91,6 +98,14 @@ def create_app(service: ConsistencyService) -> FastAPI:
     def run_replication() -> dict[str, Any]:
         return service.run_replication()
 
+    @app.get("/v1/replicate/rounds")
+    def replication_rounds() -> dict[str, Any]:
+        return service.replication_rounds()
+
+    @app.post("/v1/anti-entropy/run")
+    def run_anti_entropy() -> dict[str, Any]:
+        return service.run_anti_entropy()
+
     @app.post("/v1/chaos/partition")
     def chaos_partition(body: PartitionRequest) -> dict[str, Any]:
         try:
@@ -102,4 +117,25 @@ def create_app(service: ConsistencyService) -> FastAPI:
     def repair_key(key: str) -> dict[str, Any]:
         return service.read_repair_key(key)
 
+    @app.post("/v1/quorum/keys/{key}", status_code=201)
+    def quorum_put(key: str, body: QuorumPutRequest) -> dict[str, Any]:
+        return service.quorum_put(key, body.value)
+
+    @app.get("/v1/quorum/keys/{key}")
+    def quorum_get(
+        key: str, mode: str = Query(default="hedged", examples=list(READ_MODES))
+    ) -> dict[str, Any]:
+        try:
+            return service.quorum_get(key, mode)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @app.post("/v1/quorum/hints/deliver")
+    def deliver_hints() -> dict[str, Any]:
+        return service.deliver_hints()
+
+    @app.get("/v1/quorum/latency")
+    def quorum_latency(requests: int = Query(default=5_000, ge=100, le=50_000)) -> dict[str, Any]:
+        return service.quorum_latency_report(requests)
+
     return app
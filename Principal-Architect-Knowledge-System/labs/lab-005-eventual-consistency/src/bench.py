@@ -0,0 +1,194 @@
+"""Simulations — Merkle anti-entropy cost, gossip vs all-to-all, quorum read tail latency."""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from typing import Any
+
+from .gossip import Gossiper
+from .merkle import HASH_BYTES, MerkleTree, record_digest
+from .models import Cluster, Record, Replica, VersionVector
+from .quorum import (
+    LATENCY_PROFILES,
+    READ_MODES,
+    QuorumCoordinator,
+    latency_profile,
+    percentile,
+)
+
+
+def simulate_anti_entropy(
+    keys: int = 1_000_000,
+    replicas: int = 3,
+    divergence: float = 0.01,
+    loss_rate: float = 0.5,
+    depth: int = 16,
+    seed: int = 5,
+) -> dict[str, Any]:
+    """Load ``keys`` identical keys, diverge ~``divergence`` of them, then repair.
+
+    Divergence comes from writes on random replicas replicated over a lossy network
+    with retries disabled, so only anti-entropy can heal it. Replicas share the loaded
+    ``Record`` objects (they are never mutated in place) to keep 1M keys in memory.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    base = {f"key:{i:07d}": Record(value=i, version=VersionVector({"r1": 1})) for i in range(keys)}
+    tree = MerkleTree.build(((k, record_digest(k, rec)) for k, rec in base.items()), depth)
+    ids = [f"r{i}" for i in range(1, replicas + 1)]
+    cluster = Cluster(
+        replicas={rid: Replica(rid, store=dict(base), merkle=tree.copy()) for rid in ids},
+        loss_rate=loss_rate,
+        retry_lost=False,
+    )
+    load_sec = time.perf_counter() - started
+
+    key_list = list(base)
+    written = set()
+    for j in range(int(keys * divergence)):
+        key = rng.choice(key_list)
+        cluster.replicas[rng.choice(ids)].put(key, f"v{j}")
+        written.add(key)
+    cluster.replicate_pending()
+    divergent = sum(
+        len({record_digest(k, r.store[k]) for r in cluster.replicas.values()}) > 1
+        for k in written
+    )
+
+    started = time.perf_counter()
+    rounds, stats = cluster.repair(max_rounds=20, rng=rng)
+    repair_sec = time.perf_counter() - started
+    # Baseline: every sync ships one side's whole (key, digest) list instead of a tree walk.
+    full_list_bytes = sum(len(k) + HASH_BYTES for k in cluster.replicas[ids[0]].store)
+    full_exchange_bytes = rounds * replicas * full_list_bytes
+    return {
+        "keys": keys,
+        "replicas": replicas,
+        "tree_depth": depth,
+        "keys_written": len(written),
+        "divergent_keys": divergent,
+        "rounds": rounds,
+        "converged": cluster.in_sync(),
+        **stats.to_dict(),
+        "full_exchange_bytes": full_exchange_bytes,
+        "bytes_saved_ratio": round(full_exchange_bytes / stats.bytes_exchanged, 1)
+        if stats.bytes_exchanged
+        else None,
+        "load_sec": round(load_sec, 2),
+        "repair_sec": round(repair_sec, 2),
+    }
+
+
+def simulate_gossip(
+    replicas: int = 50,
+    writes: int = 1_000,
+    keys: int = 200,
+    fanout: int = 2,
+    seed: int = 7,
+) -> dict[str, Any]:
+    """Same write burst replicated all-to-all vs by push-pull gossip.
+
+    ``writes`` hit ``keys`` distinct keys, each owned by one replica (single writer per
+    key), so hot keys are overwritten repeatedly: gossip coalesces them into one delta
+    per contact while all-to-all ships every event to every replica.
+    """
+    rng = random.Random(seed)
+    ids = [f"r{i}" for i in range(1, replicas + 1)]
+    plan = []
+    for j in range(writes):
+        k = rng.randrange(keys)
+        plan.append((ids[k % replicas], f"key:{k}", j))
+
+    def burst() -> Cluster:
+        cluster = Cluster(replicas={rid: Replica(rid, merkle=MerkleTree(8)) for rid in ids})
+        for rid, key, value in plan:
+            cluster.replicas[rid].put(key, value)
+        return cluster
+
+    fanout_cluster = burst()
+    fanout_rounds = 0
+    while any(r.pending_out for r in fanout_cluster.replicas.values()):
+        fanout_cluster.replicate_pending()
+        fanout_rounds += 1
+
+    gossip_cluster = burst()
+    gossiper = Gossiper(gossip_cluster, fanout=fanout, rng=rng)
+    rounds_to_sync = None
+    while not gossiper.idle():
+        gossiper.round()
+        if rounds_to_sync is None and gossip_cluster.in_sync():
+            rounds_to_sync = gossiper.rounds_run
+    repair_rounds, _ = gossip_cluster.repair(rng=rng)
+    return {
+        "replicas": replicas,
+        "writes": writes,
+        "distinct_keys": keys,
+        "all_to_all": {
+            "rounds": fanout_rounds,
+            "messages": fanout_cluster.messages_sent,
+            "in_sync": fanout_cluster.in_sync(),
+        },
+        "gossip": {
+            "fanout": fanout,
+            "rounds_to_sync": rounds_to_sync,
+            "rounds_until_idle": gossiper.rounds_run,
+            "log2_replicas": round(math.log2(replicas), 1),
+            "messages": gossiper.messages_total,
+            "deltas_sent": gossiper.deltas_total,
+            "messages_per_round": [r.messages for r in gossiper.history],
+            "anti_entropy_rounds_needed": repair_rounds,
+            "in_sync": gossip_cluster.in_sync(),
+        },
+    }
+
+
+def quorum_latency_report(
+    requests: int = 20_000,
+    replicas: int = 5,
+    n: int = 3,
+    r: int = 2,
+    profiles: tuple[str, ...] = LATENCY_PROFILES,
+    seed: int = 3,
+) -> list[dict[str, Any]]:
+    """Read tail latency per replica-latency profile and read mode.
+
+    ``quorum`` waits on exactly ``r`` owners; ``hedged`` asks the remaining owners only
+    once the first ``r`` are slower than the running p95; ``speculative`` asks all ``n``
+    up front; ``all`` waits for every owner (what reading all replicas costs).
+    """
+    ids = [f"r{i}" for i in range(1, replicas + 1)]
+    rows = []
+    for profile in profiles:
+        for mode in READ_MODES:
+            cluster = Cluster(replicas={rid: Replica(rid, merkle=MerkleTree(4)) for rid in ids})
+            coordinator = QuorumCoordinator(
+                cluster,
+                n=n,
+                r=r,
+                w=r,
+                latencies=latency_profile(profile, ids),
+                rng=random.Random(seed),
+            )
+            for i in range(100):
+                coordinator.write(f"key:{i}", i)
+            latencies = []
+            contacted = 0
+            for i in range(requests):
+                result = coordinator.read(f"key:{i % 100}", mode)
+                latencies.append(result.latency_ms)
+                contacted += len(result.contacted)
+            latencies.sort()
+            rows.append(
+                {
+                    "profile": profile,
+                    "mode": mode,
+                    "p50_ms": round(percentile(latencies, 0.50), 2),
+                    "p95_ms": round(percentile(latencies, 0.95), 2),
+                    "p99_ms": round(percentile(latencies, 0.99), 2),
+                    "p999_ms": round(percentile(latencies, 0.999), 2),
+                    "replicas_per_read": round(contacted / requests, 2),
+                }
+            )
+    return rows
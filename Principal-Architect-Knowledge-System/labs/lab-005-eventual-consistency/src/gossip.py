@@ -0,0 +1,179 @@
+"""Gossip (epidemic) replication — push-pull rounds with batched, per-key-coalesced deltas."""
+
+from __future__ import annotations
+
+import math
+import random
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from .merkle import record_size
+from .models import Cluster, Record, ReplicationEvent
+
+
+@dataclass
+class GossipRound:
+    round: int
+    active_replicas: int
+    messages: int
+    deltas_sent: int
+    bytes_sent: int
+    applied: int
+    buffered_after: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Gossiper:
+    """Rumor-mongering replication over a ``Cluster``.
+
+    Each replica keeps a delta buffer ``key -> (record, strikes_left)``: new local writes
+    (drained from ``pending_out``) and records that changed its state on receipt. Per
+    round, every replica with a non-empty buffer contacts ``fanout`` random reachable
+    peers, pushes its buffer in batches of ``max_batch`` deltas and pulls the peer's
+    buffer back. Several writes to one key coalesce into the latest record, so a hot
+    key costs one delta per contact. A delta loses a strike each time it reaches a peer
+    that already had it and is retired after ``rumor_strikes`` (Demers et al.'s
+    feedback/counter rumor mongering), so it dies out once the cluster is saturated.
+    The rare replica a rumor misses is left to Merkle anti-entropy.
+    """
+
+    def __init__(
+        self,
+        cluster: Cluster,
+        fanout: int = 2,
+        rumor_strikes: int = 4,
+        max_batch: int = 256,
+        rng: random.Random | None = None,
+        history: int = 50,
+    ) -> None:
+        if fanout < 1 or max_batch < 1 or rumor_strikes < 1:
+            raise ValueError("fanout, max_batch and rumor_strikes must be >= 1")
+        self.cluster = cluster
+        self.fanout = fanout
+        self.rumor_strikes = rumor_strikes
+        self.max_batch = max_batch
+        self.rng = rng or random.Random()
+        self.buffers: dict[str, dict[str, tuple[Record, int]]] = {
+            rid: {} for rid in cluster.replicas
+        }
+        self.rounds_run = 0
+        self.messages_total = 0
+        self.deltas_total = 0
+        self.history: deque[GossipRound] = deque(maxlen=history)
+
+    def _drain_writes(self, live: list[str]) -> None:
+        ttl = self.rumor_strikes
+        for rid in live:
+            replica = self.cluster.replicas[rid]
+            buffer = self.buffers[rid]
+            for event in replica.pending_out:
+                buffer[event.key] = (replica.store[event.key], ttl)  # coalesce per key
+            replica.pending_out.clear()
+
+    def _send(
+        self, sender: str, deltas: dict[str, Record], target: str
+    ) -> tuple[int, int, int, list[str]]:
+        """Ship ``deltas`` to ``target``.
+
+        Returns (messages, bytes, applied, diverged): ``diverged`` are keys where the
+        target ended up with a different version (it merged a conflict or already had
+        something newer) — the pull reply carries those back so both sides agree.
+        """
+        if not deltas:
+            return 0, 0, 0, []
+        replica = self.cluster.replicas[target]
+        buffer = self.buffers[target]
+        rumors = self.buffers[sender]
+        applied = 0
+        size = 0
+        diverged = []
+        for key, record in deltas.items():
+            size += record_size(key, record)
+            if replica.apply_replication(ReplicationEvent(key, record, sender)):
+                applied += 1
+                buffer[key] = (replica.store[key], self.rumor_strikes)
+            elif replica.store[key].version.values == record.version.values:
+                self._strike(rumors, key, record)  # peer already knew it
+            if replica.store[key].version.values != record.version.values:
+                diverged.append(key)
+        return math.ceil(len(deltas) / self.max_batch), size, applied, diverged
+
+    @staticmethod
+    def _strike(rumors: dict[str, tuple[Record, int]], key: str, record: Record) -> None:
+        entry = rumors.get(key)
+        if entry is None or entry[0] is not record:
+            return  # already retired, or superseded by a newer delta
+        if entry[1] <= 1:
+            del rumors[key]
+        else:
+            rumors[key] = (record, entry[1] - 1)
+
+    def round(self) -> GossipRound:
+        live = [rid for rid in self.cluster.replicas if rid not in self.cluster.partitioned]
+        self._drain_writes(live)
+        # Synchronous round: everyone gossips what it knew at the start of the round.
+        snapshot = {
+            rid: {key: rec for key, (rec, _) in self.buffers[rid].items()} for rid in live
+        }
+        active = [rid for rid in live if snapshot[rid]]
+        messages = deltas = size = applied = 0
+        for rid in active:
+            peers = [p for p in live if p != rid]
+            for peer in self.rng.sample(peers, min(self.fanout, len(peers))):
+                m, b, a, diverged = self._send(rid, snapshot[rid], peer)
+                reply = dict(snapshot[peer])
+                peer_store = self.cluster.replicas[peer].store
+                reply.update((key, peer_store[key]) for key in diverged)
+                m2, b2, a2, _ = self._send(peer, reply, rid)
+                messages += m + m2
+                deltas += len(snapshot[rid]) + len(reply)
+                size += b + b2
+                applied += a + a2
+        self.rounds_run += 1
+        self.messages_total += messages
+        self.deltas_total += deltas
+        result = GossipRound(
+            round=self.rounds_run,
+            active_replicas=len(active),
+            messages=messages,
+            deltas_sent=deltas,
+            bytes_sent=size,
+            applied=applied,
+            buffered_after=self.buffered(),
+        )
+        self.history.append(result)
+        return result
+
+    def buffered(self) -> int:
+        return sum(len(b) for b in self.buffers.values())
+
+    def idle(self) -> bool:
+        """No reachable replica has an unsent write or a live rumor."""
+        return not any(
+            self.buffers[rid] or replica.pending_out
+            for rid, replica in self.cluster.replicas.items()
+            if rid not in self.cluster.partitioned
+        )
+
+    def converge(self, max_rounds: int = 100) -> tuple[int, bool]:
+        """Gossip until every rumor has retired; returns (rounds, in_sync)."""
+        rounds = 0
+        while rounds < max_rounds and not self.idle():
+            self.round()
+            rounds += 1
+        return rounds, self.cluster.in_sync()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "fanout": self.fanout,
+            "rumor_strikes": self.rumor_strikes,
+            "max_batch": self.max_batch,
+            "rounds": self.rounds_run,
+            "messages_total": self.messages_total,
+            "deltas_total": self.deltas_total,
+            "buffered_deltas": self.buffered(),
+            "recent_rounds": [r.to_dict() for r in list(self.history)[-10:]],
+        }
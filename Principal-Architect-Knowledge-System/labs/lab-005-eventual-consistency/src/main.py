@@ -7,7 +7,9 @@ import argparse
 import json
 
 from .api import create_app
-from .service import ConsistencyService
+from .bench import quorum_latency_report, simulate_anti_entropy, simulate_gossip
+from .quorum import LATENCY_PROFILES
+from .service import REPLICATION_MODES, ConsistencyService
 
 
 def run_demo(service: ConsistencyService) -> None:
@@ -30,9 +32,49 @@ def main() -> int:
     parser.add_argument("--inject", choices=["partition", "replica-down", "delay"])
     parser.add_argument("--duration", type=int, default=30)
     parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument(
+        "--simulate-merkle", action="store_true", help="Run Merkle anti-entropy simulation"
+    )
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument(
+        "--replicas", type=int, help="Replica count (default 3; 50 for --simulate-gossip)"
+    )
+    parser.add_argument("--replication", choices=REPLICATION_MODES, default="fanout")
+    parser.add_argument("--fanout", type=int, default=2, help="Gossip peers per round")
+    parser.add_argument(
+        "--simulate-gossip", action="store_true", help="Compare gossip vs all-to-all replication"
+    )
+    parser.add_argument("--n", type=int, default=3, help="Quorum replication factor")
+    parser.add_argument("--r", type=int, default=2, help="Read quorum")
+    parser.add_argument("--w", type=int, default=2, help="Write quorum")
+    parser.add_argument("--latency", choices=LATENCY_PROFILES, default="uniform")
+    parser.add_argument(
+        "--quorum-report", action="store_true", help="Read tail latency per profile and mode"
+    )
     args = parser.parse_args()
 
-    service = ConsistencyService()
+    if args.quorum_report:
+        rows = quorum_latency_report(replicas=args.replicas or 5, n=args.n, r=args.r)
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.simulate_merkle:
+        print(json.dumps(simulate_anti_entropy(args.keys), indent=2))
+        return 0
+
+    if args.simulate_gossip:
+        print(json.dumps(simulate_gossip(args.replicas or 50, fanout=args.fanout), indent=2))
+        return 0
+
+    service = ConsistencyService(
+        args.replicas or 3,
+        args.replication,
+        args.fanout,
+        n=args.n,
+        r=args.r,
+        w=args.w,
+        latency=args.latency,
+    )
 
     if args.inject:
         if args.inject == "partition":
@@ -0,0 +1,129 @@
+"""Merkle-tree anti-entropy — replicas exchange only the key ranges that differ."""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .models import Record
+
+HASH_BYTES = 8
+NODE_ID_BYTES = 4
+
+
+def record_digest(key: str, record: Record) -> int:
+    """64-bit digest of one key's full state (value, version, tombstone)."""
+    version = ",".join(f"{rid}:{n}" for rid, n in sorted(record.version.values.items()))
+    payload = f"{key}\x00{version}\x00{record.tombstone}\x00{record.value!r}"
+    return int.from_bytes(hashlib.blake2b(payload.encode(), digest_size=8).digest(), "little")
+
+
+def record_size(key: str, record: Record) -> int:
+    """Approximate wire size of shipping ``record``."""
+    return len(key) + len(repr(record.value)) + 12 * len(record.version.values) + 1
+
+
+class MerkleTree:
+    """Fixed-shape Merkle tree over ``2**depth`` key-hash buckets.
+
+    Nodes live in a flat heap-ordered list (root at 1, children of ``i`` at ``2i``
+    and ``2i + 1``). A node's hash is the XOR of its children, and a leaf's is the
+    XOR of its keys' digests, so a write updates one root-to-leaf path in O(depth)
+    without rehashing anything else. ``leaf_keys`` lets a sync enumerate one range.
+    """
+
+    def __init__(self, depth: int = 12) -> None:
+        if not 1 <= depth <= 24:
+            raise ValueError("depth must be between 1 and 24")
+        self.depth = depth
+        self.leaf_count = 1 << depth
+        self.nodes = [0] * (2 * self.leaf_count)
+        self.leaf_keys: dict[int, set[str]] = {}
+
+    @classmethod
+    def build(cls, digests: Iterable[tuple[str, int]], depth: int = 12) -> MerkleTree:
+        """Bulk-load: fill the leaves, then hash each level once (no per-key path walks)."""
+        tree = cls(depth)
+        for key, digest in digests:
+            leaf = tree.leaf_for(key)
+            tree.leaf_keys.setdefault(leaf, set()).add(key)
+            tree.nodes[tree.leaf_count + leaf] ^= digest
+        for node in range(tree.leaf_count - 1, 0, -1):
+            tree.nodes[node] = tree.nodes[2 * node] ^ tree.nodes[2 * node + 1]
+        return tree
+
+    def copy(self) -> MerkleTree:
+        tree = MerkleTree(self.depth)
+        tree.nodes = self.nodes.copy()
+        tree.leaf_keys = {leaf: keys.copy() for leaf, keys in self.leaf_keys.items()}
+        return tree
+
+    def leaf_for(self, key: str) -> int:
+        return zlib.crc32(key.encode()) & (self.leaf_count - 1)
+
+    @property
+    def root(self) -> int:
+        return self.nodes[1]
+
+    def update(self, key: str, old_digest: int | None, new_digest: int) -> None:
+        leaf = self.leaf_for(key)
+        self.leaf_keys.setdefault(leaf, set()).add(key)
+        delta = (old_digest or 0) ^ new_digest
+        node = self.leaf_count + leaf
+        while node:
+            self.nodes[node] ^= delta
+            node >>= 1
+
+    def leaf_range(self, leaf: int) -> set[str]:
+        return self.leaf_keys.get(leaf, set())
+
+
+@dataclass
+class SyncStats:
+    """Cost of one or more anti-entropy exchanges."""
+
+    messages: int = 0
+    bytes_exchanged: int = 0
+    nodes_compared: int = 0
+    leaves_differing: int = 0
+    keys_shipped: int = 0
+
+    def add(self, other: SyncStats) -> None:
+        self.messages += other.messages
+        self.bytes_exchanged += other.bytes_exchanged
+        self.nodes_compared += other.nodes_compared
+        self.leaves_differing += other.leaves_differing
+        self.keys_shipped += other.keys_shipped
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "bytes_exchanged": self.bytes_exchanged,
+            "nodes_compared": self.nodes_compared,
+            "leaves_differing": self.leaves_differing,
+            "keys_shipped": self.keys_shipped,
+        }
+
+
+def differing_leaves(a: MerkleTree, b: MerkleTree, stats: SyncStats) -> list[int]:
+    """Walk both trees level by level, descending only into nodes whose hashes differ."""
+    if a.depth != b.depth:
+        raise ValueError("trees must have the same depth")
+    frontier = [1]
+    for _ in range(a.depth):
+        # One request/response: a asks for b's hashes of the current frontier.
+        stats.messages += 2
+        stats.nodes_compared += len(frontier)
+        stats.bytes_exchanged += len(frontier) * (NODE_ID_BYTES + HASH_BYTES)
+        differing = [n for n in frontier if a.nodes[n] != b.nodes[n]]
+        if not differing:
+            return []
+        frontier = [child for n in differing for child in (2 * n, 2 * n + 1)]
+    stats.messages += 2
+    stats.nodes_compared += len(frontier)
+    stats.bytes_exchanged += len(frontier) * (NODE_ID_BYTES + HASH_BYTES)
+    return [n - a.leaf_count for n in frontier if a.nodes[n] != b.nodes[n]]
@@ -6,6 +6,8 @@ import random
 from dataclasses import dataclass, field
 from typing import Any
 
+from .merkle import HASH_BYTES, MerkleTree, SyncStats, differing_leaves, record_digest, record_size
+
 
 @dataclass
 class VersionVector:
@@ -36,6 +38,33 @@ class Record:
     tombstone: bool = False
 
 
+def reconcile(records: list[Record]) -> Record | None:
+    """Pick the causally latest record; concurrent siblings are merged into one.
+
+    Dominated versions are discarded. If several concurrent versions remain, their values
+    are joined (``"a|b"``, as ``Replica.apply_replication`` does) under the join of their
+    version vectors, which dominates every sibling so read repair can install it anywhere.
+    """
+    latest: list[Record] = []
+    for record in records:
+        if any(o.version.dominates(record.version) for o in records):
+            continue
+        if all(o.version.values != record.version.values for o in latest):
+            latest.append(record)
+    if not latest:
+        return None
+    if len(latest) == 1:
+        return latest[0]
+    version = VersionVector()
+    for record in latest:
+        version.merge(record.version)
+    return Record(
+        value="|".join(str(r.value) for r in latest),
+        version=version,
+        tombstone=all(r.tombstone for r in latest),
+    )
+
+
 @dataclass
 class ReplicationEvent:
     key: str
@@ -48,6 +77,15 @@ class Replica:
     replica_id: str
     store: dict[str, Record] = field(default_factory=dict)
     pending_out: list[ReplicationEvent] = field(default_factory=list)
+    merkle: MerkleTree = field(default_factory=MerkleTree)
+
+    def _write(self, key: str, record: Record) -> None:
+        """Single write path for ``store`` so the Merkle tree never drifts from it."""
+        old = self.store.get(key)
+        self.store[key] = record
+        self.merkle.update(
+            key, record_digest(key, old) if old is not None else None, record_digest(key, record)
+        )
 
     def put(self, key: str, value: Any) -> VersionVector:
         version = VersionVector()
@@ -55,7 +93,7 @@ class Replica:
             version.merge(self.store[key].version)
         version.increment(self.replica_id)
         record = Record(value=value, version=version)
-        self.store[key] = record
+        self._write(key, record)
         self.pending_out.append(ReplicationEvent(key, record, self.replica_id))
         return version.copy()
 
@@ -67,10 +105,13 @@ class Replica:
         existing = self.store.get(event.key)
         incoming = event.record
         if existing is None:
-            self.store[event.key] = Record(
-                value=incoming.value,
-                version=VersionVector(incoming.version.values.copy()),
-                tombstone=incoming.tombstone,
+            self._write(
+                event.key,
+                Record(
+                    value=incoming.value,
+                    version=VersionVector(incoming.version.values.copy()),
+                    tombstone=incoming.tombstone,
+                ),
             )
             return True
         if existing.version.dominates(incoming.version):
@@ -79,21 +120,56 @@ class Replica:
             merged = VersionVector(existing.version.values.copy())
             merged.merge(incoming.version)
             merged.increment(self.replica_id)
-            self.store[event.key] = Record(
-                value=f"{existing.value}|{incoming.value}",
-                version=merged,
-                tombstone=incoming.tombstone,
+            self._write(
+                event.key,
+                Record(
+                    value=f"{existing.value}|{incoming.value}",
+                    version=merged,
+                    tombstone=incoming.tombstone,
+                ),
             )
             return True
         if incoming.version.dominates(existing.version):
-            self.store[event.key] = Record(
-                value=incoming.value,
-                version=VersionVector(incoming.version.values.copy()),
-                tombstone=incoming.tombstone,
+            self._write(
+                event.key,
+                Record(
+                    value=incoming.value,
+                    version=VersionVector(incoming.version.values.copy()),
+                    tombstone=incoming.tombstone,
+                ),
             )
             return True
         return False
 
+    def anti_entropy(self, peer: Replica) -> SyncStats:
+        """Push-pull Merkle sync with ``peer``; afterwards both hold the same state.
+
+        Only leaves whose hashes differ are enumerated. ``peer``'s differing records are
+        applied here first (resolving concurrent versions once), then the result is
+        pushed back, so both sides end with the same merged record.
+        """
+        stats = SyncStats()
+        leaves = differing_leaves(self.merkle, peer.merkle, stats)
+        stats.leaves_differing = len(leaves)
+        for leaf in leaves:
+            # peer lists (key, digest) for the range; we reply with the records it lacks.
+            theirs_keys = peer.merkle.leaf_range(leaf)
+            stats.messages += 2
+            stats.bytes_exchanged += sum(len(k) + HASH_BYTES for k in theirs_keys)
+            for key in self.merkle.leaf_range(leaf) | theirs_keys:
+                mine, theirs = self.store.get(key), peer.store.get(key)
+                if mine is not None and theirs is not None:
+                    if record_digest(key, mine) == record_digest(key, theirs):
+                        continue
+                if theirs is not None:
+                    stats.bytes_exchanged += record_size(key, theirs)
+                    self.apply_replication(ReplicationEvent(key, theirs, peer.replica_id))
+                merged = self.store[key]
+                stats.bytes_exchanged += record_size(key, merged)
+                peer.apply_replication(ReplicationEvent(key, merged, self.replica_id))
+                stats.keys_shipped += 1
+        return stats
+
 
 @dataclass
 class SessionState:
@@ -120,9 +196,15 @@ class Cluster:
     replication_delay_ms: float = 0.0
     loss_rate: float = 0.0
     partitioned: set[str] = field(default_factory=set)
+    retry_lost: bool = True
+    messages_sent: int = 0
 
     def replicate_pending(self) -> int:
-        """Deliver pending replication events with simulated network."""
+        """Deliver pending replication events with simulated network.
+
+        Lost events are re-queued unless ``retry_lost`` is off, in which case the
+        divergence they leave behind is only healed by ``anti_entropy_round``.
+        """
         delivered = 0
         for replica in self.replicas.values():
             if replica.replica_id in self.partitioned:
@@ -131,13 +213,15 @@ class Cluster:
             replica.pending_out.clear()
             for event in pending:
                 if random.random() < self.loss_rate:
-                    replica.pending_out.append(event)
+                    if self.retry_lost:
+                        replica.pending_out.append(event)
                     continue
                 for target in self.replicas.values():
                     if target.replica_id == replica.replica_id:
                         continue
                     if target.replica_id in self.partitioned:
                         continue
+                    self.messages_sent += 1  # one event per target per message
                     if target.apply_replication(event):
                         delivered += 1
         return delivered
@@ -149,11 +233,45 @@ class Cluster:
             self.replicate_pending()
         return not any(r.pending_out for r in self.replicas.values())
 
+    def _live(self) -> list[Replica]:
+        return [r for rid, r in self.replicas.items() if rid not in self.partitioned]
+
+    def in_sync(self) -> bool:
+        """True when every reachable replica has the same Merkle root."""
+        return len({r.merkle.root for r in self._live()}) <= 1
+
+    def anti_entropy_round(self, rng: random.Random | None = None) -> SyncStats:
+        """Each reachable replica syncs with one random reachable peer."""
+        rng = rng or random.Random()
+        live = self._live()
+        stats = SyncStats()
+        for replica in live:
+            peers = [p for p in live if p is not replica]
+            if peers:
+                stats.add(replica.anti_entropy(rng.choice(peers)))
+        return stats
+
+    def repair(
+        self, max_rounds: int = 10, rng: random.Random | None = None
+    ) -> tuple[int, SyncStats]:
+        """Run anti-entropy rounds until reachable replicas agree; returns (rounds, stats)."""
+        rng = rng or random.Random()
+        stats = SyncStats()
+        rounds = 0
+        while rounds < max_rounds and not self.in_sync():
+            stats.add(self.anti_entropy_round(rng))
+            rounds += 1
+        return rounds, stats
+
     def quorum_read(self, key: str, r: int) -> Record | None:
-        responses = [rep.get(key) for rep in self.replicas.values() if rep.get(key)]
+        """Read ``r`` reachable replicas (one ``get`` each) and reconcile by version vector.
+
+        Returns None when fewer than ``r`` replicas are reachable or none has the key.
+        """
+        responses = [rep.get(key) for rep in self._live()[:r]]
         if len(responses) < r:
             return None
-        return max(responses, key=lambda rec: sum(rec.version.values.values()))
+        return reconcile([rec for rec in responses if rec is not None])
 
 
 @dataclass
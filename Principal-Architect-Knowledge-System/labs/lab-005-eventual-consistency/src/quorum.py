@@ -0,0 +1,257 @@
+"""Quorum coordinator — N/R/W, sloppy quorum with hinted handoff, hedged reads."""
+
+from __future__ import annotations
+
+import math
+import random
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from .models import Cluster, Record, ReplicationEvent, reconcile
+
+READ_MODES = ("quorum", "hedged", "speculative", "all")
+
+
+@dataclass
+class ReplicaLatency:
+    """Per-request latency of one replica: lognormal body plus an optional slow tail."""
+
+    median_ms: float = 2.0
+    sigma: float = 0.5
+    slow_prob: float = 0.0
+    slow_ms: float = 50.0
+
+    def sample(self, rng: random.Random) -> float:
+        latency = self.median_ms * math.exp(rng.gauss(0.0, self.sigma))
+        if self.slow_prob and rng.random() < self.slow_prob:
+            latency += self.slow_ms * (0.5 + rng.random())
+        return latency
+
+
+def latency_profile(name: str, replica_ids: list[str]) -> dict[str, ReplicaLatency]:
+    """Named replica-latency distributions for the simulation."""
+    if name == "uniform":
+        return {rid: ReplicaLatency() for rid in replica_ids}
+    if name == "heavy-tail":  # GC pauses / noisy neighbours hit every replica now and then
+        return {rid: ReplicaLatency(slow_prob=0.05) for rid in replica_ids}
+    if name == "one-slow":  # one degraded replica (bad disk, cross-zone)
+        return {
+            rid: ReplicaLatency(median_ms=20.0 if i == 0 else 2.0)
+            for i, rid in enumerate(replica_ids)
+        }
+    raise ValueError(f"unknown latency profile: {name}")
+
+
+LATENCY_PROFILES = ("uniform", "heavy-tail", "one-slow")
+
+
+@dataclass
+class Hint:
+    owner: str
+    key: str
+    record: Record
+
+
+@dataclass
+class QuorumWrite:
+    key: str
+    acks: int
+    ok: bool
+    latency_ms: float
+    written: list[str]
+    hinted: dict[str, str]  # substitute -> intended owner
+    record: Record | None = None
+
+
+@dataclass
+class QuorumRead:
+    key: str
+    record: Record | None
+    ok: bool
+    latency_ms: float
+    contacted: list[str]
+    responded: list[str]
+    siblings: int
+    hedged: bool = False
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+@dataclass
+class QuorumCoordinator:
+    """Dynamo-style coordinator over a ``Cluster``.
+
+    Each key's preference list ranks replicas by rendezvous hash; its first ``n`` are
+    the key's owners. Writes go to every reachable owner and succeed once ``w`` ack —
+    a down owner is replaced by the next replica on the list (sloppy quorum) which
+    keeps a hint and hands the record off once the owner is back. Reads return as
+    soon as ``r`` replies arrive; ``hedged`` sends to ``r`` owners and only asks the
+    rest if they haven't answered within ``hedge_after_ms`` (default: running p95 of
+    single-replica latency). Latency is simulated per replica, not slept.
+    """
+
+    cluster: Cluster
+    n: int = 3
+    r: int = 2
+    w: int = 2
+    latencies: dict[str, ReplicaLatency] = field(default_factory=dict)
+    hedge_after_ms: float | None = None
+    sloppy: bool = True
+    rng: random.Random = field(default_factory=random.Random)
+    hints: dict[str, list[Hint]] = field(default_factory=dict, init=False)
+    hints_delivered: int = field(default=0, init=False)
+    reads: int = field(default=0, init=False)
+    writes: int = field(default=0, init=False)
+    failed: int = field(default=0, init=False)
+    hedges_sent: int = field(default=0, init=False)
+    _observed: deque[float] = field(
+        default_factory=lambda: deque(maxlen=1000), init=False, repr=False
+    )
+    _samples: int = field(default=0, init=False, repr=False)
+    _hedge_cache: tuple[int, float] = field(default=(0, 10.0), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.r <= self.n or not 1 <= self.w <= self.n:
+            raise ValueError("require 1 <= r, w <= n")
+        if self.n > len(self.cluster.replicas):
+            raise ValueError("n cannot exceed the replica count")
+
+    def preference_list(self, key: str) -> list[str]:
+        return sorted(
+            self.cluster.replicas,
+            key=lambda rid: zlib.crc32(f"{rid}/{key}".encode()),
+            reverse=True,
+        )
+
+    def _reachable(self, rid: str) -> bool:
+        return rid not in self.cluster.partitioned
+
+    def _latency(self, rid: str) -> float:
+        model = self.latencies.get(rid)
+        latency = model.sample(self.rng) if model else 0.0
+        self._observed.append(latency)
+        self._samples += 1
+        return latency
+
+    def _hedge_delay(self) -> float:
+        if self.hedge_after_ms is not None:
+            return self.hedge_after_ms
+        computed_at, delay = self._hedge_cache
+        # Re-derive the p95 every 64 samples rather than sorting on every read.
+        if len(self._observed) >= 20 and self._samples - computed_at >= 64:
+            delay = percentile(sorted(self._observed), 0.95)
+            self._hedge_cache = (self._samples, delay)
+        return delay
+
+    def _targets(self, key: str) -> tuple[list[str], dict[str, str]]:
+        """Reachable owners, plus (sloppy) ``{substitute: owner}`` for unreachable ones."""
+        prefs = self.preference_list(key)
+        owners, spares = prefs[: self.n], [p for p in prefs[self.n :] if self._reachable(p)]
+        live = [rid for rid in owners if self._reachable(rid)]
+        hinted: dict[str, str] = {}
+        if self.sloppy:
+            for owner in owners:
+                if not self._reachable(owner) and spares:
+                    hinted[spares.pop(0)] = owner
+        return live, hinted
+
+    def write(self, key: str, value: Any) -> QuorumWrite:
+        self.writes += 1
+        live, hinted = self._targets(key)
+        if not live and not hinted:
+            self.failed += 1
+            return QuorumWrite(key, 0, False, 0.0, [], {})
+        # The first reachable replica on the list coordinates and versions the write.
+        coordinator = self.cluster.replicas[live[0] if live else next(iter(hinted))]
+        coordinator.put(key, value)
+        coordinator.pending_out.pop()  # replicated synchronously below, not in background
+        record = coordinator.store[key]
+        event = ReplicationEvent(key, record, coordinator.replica_id)
+        for rid in live[1:]:
+            self.cluster.replicas[rid].apply_replication(event)
+        for holder, owner in hinted.items():
+            # A substitute stores the record (so its ack is real and sloppy reads see it)
+            # and keeps a hint to hand it to the owner later.
+            self.cluster.replicas[holder].apply_replication(event)
+            self.hints.setdefault(holder, []).append(Hint(owner, key, record))
+        targets = live + list(hinted)
+        arrivals = sorted(self._latency(rid) for rid in targets)
+        ok = len(arrivals) >= self.w
+        self.failed += not ok
+        latency = arrivals[self.w - 1] if ok else arrivals[-1]
+        return QuorumWrite(key, len(targets), ok, latency, live, hinted, record)
+
+    def read(self, key: str, mode: str = "hedged") -> QuorumRead:
+        if mode not in READ_MODES:
+            raise ValueError(f"unknown read mode: {mode}")
+        self.reads += 1
+        owners, substitutes = self._targets(key)
+        live = owners + list(substitutes)  # sloppy: read the same substitutes writes use
+        if len(live) < self.r:
+            self.failed += 1
+            return QuorumRead(key, None, False, 0.0, live, [], 0)
+        first = live if mode in ("speculative", "all") else live[: self.r]
+        arrivals = {rid: self._latency(rid) for rid in first}
+        needed = len(live) if mode == "all" else self.r
+        hedged = False
+        if mode == "hedged" and len(live) > self.r:
+            delay = self._hedge_delay()
+            if sorted(arrivals.values())[self.r - 1] > delay:
+                hedged = True
+                for rid in live[self.r :]:
+                    arrivals[rid] = delay + self._latency(rid)
+                    self.hedges_sent += 1
+        ordered = sorted(arrivals, key=arrivals.__getitem__)
+        responded = ordered[:needed]
+        records = [self.cluster.replicas[rid].get(key) for rid in responded]
+        found = [rec for rec in records if rec is not None]
+        siblings = len({tuple(sorted(rec.version.values.items())) for rec in found})
+        return QuorumRead(
+            key=key,
+            record=reconcile(found),
+            ok=True,
+            latency_ms=arrivals[responded[-1]],
+            contacted=list(arrivals),
+            responded=responded,
+            siblings=siblings,
+            hedged=hedged,
+        )
+
+    def deliver_hints(self) -> int:
+        """Hand hinted records to owners that are reachable again."""
+        delivered = 0
+        for holder, hints in self.hints.items():
+            if not self._reachable(holder):
+                continue
+            keep = []
+            for hint in hints:
+                if not self._reachable(hint.owner):
+                    keep.append(hint)
+                    continue
+                owner = self.cluster.replicas[hint.owner]
+                owner.apply_replication(ReplicationEvent(hint.key, hint.record, holder))
+                delivered += 1
+            hints[:] = keep
+        self.hints_delivered += delivered
+        return delivered
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "n": self.n,
+            "r": self.r,
+            "w": self.w,
+            "sloppy": self.sloppy,
+            "reads": self.reads,
+            "writes": self.writes,
+            "failed": self.failed,
+            "hedges_sent": self.hedges_sent,
+            "hedge_after_ms": round(self._hedge_delay(), 2),
+            "pending_hints": sum(len(h) for h in self.hints.values()),
+            "hints_delivered": self.hints_delivered,
+        }
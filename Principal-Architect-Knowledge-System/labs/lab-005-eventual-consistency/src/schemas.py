@@ -15,3 +15,7 @@ class PutKeyRequest(BaseModel):
 class PartitionRequest(BaseModel):
     replicas: list[str] = Field(..., examples=[["r3"]])
     enabled: bool = Field(default=True, examples=[True])
+
+
+class QuorumPutRequest(BaseModel):
+    value: Any = Field(..., examples=["alice"])
@@ -2,21 +2,59 @@
 
 from __future__ import annotations
 
+import random
+from collections import deque
 from typing import Any
 
+from .bench import quorum_latency_report
+from .gossip import Gossiper
+from .merkle import SyncStats
 from .models import Cluster, ReadRepair, Replica, SessionState
+from .quorum import QuorumCoordinator, latency_profile
+
+REPLICATION_MODES = ("fanout", "gossip")
 
 
 class ConsistencyService:
     """Manages multi-replica eventual consistency simulation."""
 
-    def __init__(self) -> None:
-        self.cluster = Cluster(replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, 4)})
+    def __init__(
+        self,
+        replicas: int = 3,
+        replication: str = "fanout",
+        fanout: int = 2,
+        n: int = 3,
+        r: int = 2,
+        w: int = 2,
+        latency: str = "uniform",
+    ) -> None:
+        if replication not in REPLICATION_MODES:
+            raise ValueError(f"unknown replication mode: {replication}")
+        if replicas < 1:
+            raise ValueError("replicas must be >= 1")
+        self.cluster = Cluster(
+            replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, replicas + 1)}
+        )
+        self.replication = replication
+        self.gossip = Gossiper(self.cluster, fanout=fanout) if replication == "gossip" else None
+        self.rounds: deque[dict[str, Any]] = deque(maxlen=50)
+        n = min(n, replicas)
+        self.coordinator = QuorumCoordinator(
+            self.cluster,
+            n=n,
+            r=min(r, n),
+            w=min(w, n),
+            latencies=latency_profile(latency, list(self.cluster.replicas)),
+        )
+        self.latency = latency
         self.session = SessionState(sticky_replica="r1")
         self.read_repair = ReadRepair()
         self.replication_runs = 0
         self.delivered_total = 0
         self.repair_total = 0
+        self.anti_entropy_runs = 0
+        self.anti_entropy_totals = SyncStats()
+        self._rng = random.Random()
 
     def put_key(self, key: str, value: Any, replica_id: str) -> dict[str, Any]:
         replica = self._replica(replica_id)
@@ -56,22 +94,56 @@ class ConsistencyService:
             "tombstone": record.tombstone,
         }
 
+    def _pending(self) -> int:
+        pending = sum(len(r.pending_out) for r in self.cluster.replicas.values())
+        return pending + (self.gossip.buffered() if self.gossip else 0)
+
     def run_replication(self) -> dict[str, Any]:
-        pending_before = sum(len(r.pending_out) for r in self.cluster.replicas.values())
-        delivered = self.cluster.replicate_pending()
+        """One replication round: all-to-all delivery, or one gossip round."""
+        pending_before = self._pending()
+        messages_before = self.cluster.messages_sent
+        if self.gossip is not None:
+            gossip_round = self.gossip.round()
+            delivered, messages = gossip_round.applied, gossip_round.messages
+        else:
+            delivered = self.cluster.replicate_pending()
+            messages = self.cluster.messages_sent - messages_before
         self.replication_runs += 1
         self.delivered_total += delivered
-        pending_after = sum(len(r.pending_out) for r in self.cluster.replicas.values())
-        return {
+        result = {
             "replication_run": self.replication_runs,
+            "mode": self.replication,
+            "messages": messages,
             "delivered": delivered,
             "pending_before": pending_before,
-            "pending_after": pending_after,
+            "pending_after": self._pending(),
+            "partitioned": sorted(self.cluster.partitioned),
+        }
+        self.rounds.append({k: v for k, v in result.items() if k != "partitioned"})
+        return result
+
+    def replication_rounds(self) -> dict[str, Any]:
+        return {"mode": self.replication, "rounds": list(self.rounds)}
+
+    def run_anti_entropy(self) -> dict[str, Any]:
+        """One Merkle anti-entropy round across the reachable replicas."""
+        stats = self.cluster.anti_entropy_round(self._rng)
+        self.anti_entropy_runs += 1
+        self.anti_entropy_totals.add(stats)
+        return {
+            "anti_entropy_run": self.anti_entropy_runs,
+            **stats.to_dict(),
+            "in_sync": self.cluster.in_sync(),
+            "merkle_roots": self._merkle_roots(),
             "partitioned": sorted(self.cluster.partitioned),
         }
 
     def converge(self) -> dict[str, Any]:
-        ok = self.cluster.converge()
+        if self.gossip is not None:
+            self.gossip.converge()
+            ok = self.gossip.idle()
+        else:
+            ok = self.cluster.converge()
         values = {}
         for rid, replica in self.cluster.replicas.items():
             rec = replica.get("user:1")
@@ -93,10 +165,58 @@ class ConsistencyService:
             "replicas": replicas,
         }
 
+    def quorum_put(self, key: str, value: Any) -> dict[str, Any]:
+        result = self.coordinator.write(key, value)
+        return {
+            "key": key,
+            "ok": result.ok,
+            "acks": result.acks,
+            "w": self.coordinator.w,
+            "written": result.written,
+            "hinted": result.hinted,
+            "latency_ms": round(result.latency_ms, 3),
+            "version": result.record.version.values if result.record else None,
+        }
+
+    def quorum_get(self, key: str, mode: str = "hedged") -> dict[str, Any]:
+        result = self.coordinator.read(key, mode)
+        record = result.record
+        return {
+            "key": key,
+            "ok": result.ok,
+            "found": record is not None,
+            "value": record.value if record else None,
+            "version": record.version.values if record else None,
+            "siblings": result.siblings,
+            "mode": mode,
+            "r": self.coordinator.r,
+            "contacted": result.contacted,
+            "responded": result.responded,
+            "hedged": result.hedged,
+            "latency_ms": round(result.latency_ms, 3),
+        }
+
+    def quorum_latency_report(self, requests: int = 5_000) -> dict[str, Any]:
+        rows = quorum_latency_report(
+            requests=requests,
+            replicas=len(self.cluster.replicas),
+            n=self.coordinator.n,
+            r=self.coordinator.r,
+        )
+        n, r = self.coordinator.n, self.coordinator.r
+        return {"requests": requests, "n": n, "r": r, "rows": rows}
+
+    def deliver_hints(self) -> dict[str, Any]:
+        delivered = self.coordinator.deliver_hints()
+        return {"delivered": delivered, **self.coordinator.stats()}
+
     def read_repair_key(self, key: str) -> dict[str, Any]:
-        latest = self.cluster.quorum_read(key, r=2)
-        if latest is None:
+        result = self.coordinator.read(key, mode="all")
+        latest = result.record
+        if not result.ok:
             return {"key": key, "repaired": 0, "reason": "insufficient quorum"}
+        if latest is None:
+            return {"key": key, "repaired": 0, "reason": "not found"}
         repairs = self.read_repair.repair(key, list(self.cluster.replicas.values()), latest)
         self.repair_total += repairs
         return {
@@ -111,6 +231,12 @@ class ConsistencyService:
         key_counts = {rid: len(r.store) for rid, r in self.cluster.replicas.items()}
         return {
             "replicas": list(self.cluster.replicas.keys()),
+            "replication": self.replication,
+            "messages_sent": self.cluster.messages_sent
+            if self.gossip is None
+            else self.gossip.messages_total,
+            "gossip": self.gossip.stats() if self.gossip else None,
+            "quorum": {**self.coordinator.stats(), "latency_profile": self.latency},
             "pending_events": pending,
             "key_counts": key_counts,
             "replication_runs": self.replication_runs,
@@ -118,8 +244,17 @@ class ConsistencyService:
             "repair_total": self.repair_total,
             "partitioned": sorted(self.cluster.partitioned),
             "loss_rate": self.cluster.loss_rate,
+            "anti_entropy": {
+                "runs": self.anti_entropy_runs,
+                **self.anti_entropy_totals.to_dict(),
+                "in_sync": self.cluster.in_sync(),
+                "merkle_roots": self._merkle_roots(),
+            },
         }
 
+    def _merkle_roots(self) -> dict[str, str]:
+        return {rid: f"{r.merkle.root:016x}" for rid, r in self.cluster.replicas.items()}
+
     def _replica(self, replica_id: str) -> Replica:
         replica = self.cluster.replicas.get(replica_id)
         if replica is None:
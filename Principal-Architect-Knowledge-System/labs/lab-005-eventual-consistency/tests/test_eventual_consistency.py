@@ -9,7 +9,11 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
-from src.models import Cluster, ReadRepair, Replica, SessionState, VersionVector
+from src.bench import simulate_anti_entropy, simulate_gossip
+from src.gossip import Gossiper
+from src.merkle import MerkleTree, record_digest
+from src.models import Cluster, ReadRepair, Record, Replica, SessionState, VersionVector
+from src.quorum import QuorumCoordinator, ReplicaLatency
 from src.service import ConsistencyService
 
 
@@ -70,6 +74,149 @@ def test_version_vector_increment():
     assert vv.values["r1"] == 1
 
 
+def test_merkle_tree_tracks_store_incrementally():
+    r = Replica("r1")
+    for i in range(50):
+        r.put(f"k{i}", i)
+    r.put("k7", "updated")
+    rebuilt = MerkleTree.build(((k, record_digest(k, rec)) for k, rec in r.store.items()))
+    assert r.merkle.root == rebuilt.root
+    assert r.merkle.nodes == rebuilt.nodes
+
+
+def test_anti_entropy_repairs_lost_events_and_conflicts():
+    cluster = Cluster(
+        replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, 4)},
+        loss_rate=1.0,
+        retry_lost=False,
+    )
+    for i in range(200):
+        cluster.replicas["r1"].put(f"k{i}", i)
+    cluster.replicas["r2"].put("k5", "conflict")
+    cluster.replicate_pending()
+    assert not any(r.pending_out for r in cluster.replicas.values())
+    assert cluster.replicas["r3"].get("k1") is None
+
+    rounds, stats = cluster.repair(max_rounds=10)
+    assert cluster.in_sync()
+    assert rounds <= 3
+    assert stats.keys_shipped >= 200
+    values = {r.get("k5").value for r in cluster.replicas.values()}
+    assert len(values) == 1 and "conflict" in values.pop()
+
+
+def test_anti_entropy_only_ships_differing_ranges():
+    a, b = Replica("a"), Replica("b")
+    for i in range(1000):
+        a.put(f"k{i}", i)
+        b.apply_replication(a.pending_out[-1])
+    a.put("k42", "new")
+    stats = a.anti_entropy(b)
+    assert stats.leaves_differing == 1
+    assert stats.keys_shipped == 1
+    assert b.get("k42").value == "new"
+    assert a.merkle.root == b.merkle.root
+    assert a.anti_entropy(b).keys_shipped == 0
+
+
+def test_anti_entropy_simulation_small():
+    result = simulate_anti_entropy(keys=5_000, depth=10)
+    assert result["converged"]
+    assert result["bytes_exchanged"] < result["full_exchange_bytes"]
+
+
+def test_gossip_coalesces_and_converges_in_log_rounds():
+    cluster = Cluster(replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, 51)})
+    for n in range(10):
+        cluster.replicas["r1"].put("hot", n)
+    gossiper = Gossiper(cluster, fanout=2)
+    first = gossiper.round()
+    assert first.deltas_sent == 2  # ten writes coalesce into one delta per contacted peer
+    assert first.messages == 2
+    rounds, in_sync = gossiper.converge()
+    assert in_sync or cluster.repair()[0] <= 2
+    assert gossiper.rounds_run <= 12
+    assert {r.get("hot").value for r in cluster.replicas.values()} == {9}
+
+
+def test_gossip_resolves_concurrent_writes():
+    cluster = Cluster(replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, 6)})
+    cluster.replicas["r1"].put("k", "a")
+    cluster.replicas["r2"].put("k", "b")
+    gossiper = Gossiper(cluster, fanout=2)
+    gossiper.converge()
+    cluster.repair()
+    assert cluster.in_sync()
+    assert len({r.get("k").value for r in cluster.replicas.values()}) == 1
+
+
+def test_gossip_simulation_uses_fewer_messages():
+    result = simulate_gossip(replicas=20, writes=200, keys=40)
+    assert result["gossip"]["in_sync"]
+    assert result["gossip"]["messages"] < result["all_to_all"]["messages"]
+
+
+def test_quorum_read_reconciles_concurrent_versions():
+    r1, r2, r3 = Replica("r1"), Replica("r2"), Replica("r3")
+    r1.store["k"] = Record("a", VersionVector({"r1": 5}))
+    r2.store["k"] = Record("b", VersionVector({"r1": 4, "r2": 2}))
+    r3.store["k"] = Record("newest", VersionVector({"r1": 9, "r2": 9}))
+    cluster = Cluster(replicas={"r1": r1, "r2": r2, "r3": r3})
+    latest = cluster.quorum_read("k", r=2)  # reads r1 and r2 only
+    assert latest.value == "a|b"
+    assert latest.version.dominates(r1.store["k"].version)
+    assert latest.version.dominates(r2.store["k"].version)
+    assert cluster.quorum_read("k", r=3).value == "newest"
+
+
+def _quorum_cluster(count: int = 5) -> Cluster:
+    return Cluster(replicas={f"r{i}": Replica(replica_id=f"r{i}") for i in range(1, count + 1)})
+
+
+def test_sloppy_quorum_hinted_handoff():
+    cluster = _quorum_cluster()
+    coordinator = QuorumCoordinator(cluster, n=3, r=2, w=2)
+    owners = coordinator.preference_list("k")[:3]
+    cluster.partitioned.add(owners[1])
+    result = coordinator.write("k", "v1")
+    assert result.ok and result.acks == 3
+    assert list(result.hinted.values()) == [owners[1]]
+    assert cluster.replicas[owners[1]].get("k") is None
+    assert coordinator.deliver_hints() == 0  # owner still unreachable
+    cluster.partitioned.clear()
+    assert coordinator.deliver_hints() == 1
+    assert cluster.replicas[owners[1]].get("k").value == "v1"
+    assert coordinator.read("k", "all").record.value == "v1"
+
+
+def test_sloppy_write_acks_are_readable_before_handoff():
+    cluster = _quorum_cluster()
+    coordinator = QuorumCoordinator(cluster, n=3, r=2, w=2)
+    owners = coordinator.preference_list("k")[:3]
+    cluster.partitioned.update(owners[1:])
+    result = coordinator.write("k", "v1")
+    assert result.ok and result.acks == 3
+    for holder in result.hinted:
+        assert cluster.replicas[holder].get("k").value == "v1"
+    read = coordinator.read("k", "quorum")
+    assert read.ok and read.record.value == "v1"
+
+
+def test_hedged_read_returns_after_first_r_responses():
+    cluster = _quorum_cluster(3)
+    coordinator = QuorumCoordinator(cluster, n=3, r=2, w=2, hedge_after_ms=5.0)
+    owners = coordinator.preference_list("k")
+    coordinator.latencies = {rid: ReplicaLatency(median_ms=1.0, sigma=0.0) for rid in owners}
+    coordinator.latencies[owners[0]] = ReplicaLatency(median_ms=100.0, sigma=0.0)
+    coordinator.write("k", "v")
+    assert coordinator.read("k", "quorum").latency_ms == 100.0
+    hedged = coordinator.read("k", "hedged")
+    assert hedged.hedged and hedged.latency_ms == 6.0
+    assert owners[0] not in hedged.responded and len(hedged.responded) == 2
+    assert hedged.record.value == "v"
+    assert coordinator.read("k", "speculative").latency_ms == 1.0
+
+
 def test_http_put_and_replicate():
     service = ConsistencyService()
     client = TestClient(create_app(service))
@@ -90,6 +237,50 @@ def test_http_partition():
     assert "r3" in resp.json()["partitioned"]
 
 
+def test_http_anti_entropy_after_partition():
+    service = ConsistencyService()
+    client = TestClient(create_app(service))
+    client.post("/v1/chaos/partition", json={"replicas": ["r3"], "enabled": True})
+    client.post("/v1/keys/user:1", json={"value": "alice", "replica_id": "r1"})
+    client.post("/v1/replicate/run")
+    client.post("/v1/chaos/partition", json={"replicas": ["r3"], "enabled": False})
+    assert client.get("/v1/keys/user:1?replica=r3").json()["found"] is False
+    resp = client.post("/v1/anti-entropy/run")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["in_sync"] is True
+    assert len(set(body["merkle_roots"].values())) == 1
+    assert client.get("/v1/keys/user:1?replica=r3").json()["value"] == "alice"
+    assert client.get("/health").json()["anti_entropy"]["runs"] == 1
+
+
+def test_http_gossip_rounds():
+    service = ConsistencyService(replicas=10, replication="gossip")
+    client = TestClient(create_app(service))
+    client.post("/v1/keys/user:1", json={"value": "alice", "replica_id": "r1"})
+    run = client.post("/v1/replicate/run").json()
+    assert run["mode"] == "gossip"
+    assert run["messages"] == 2
+    for _ in range(10):
+        client.post("/v1/replicate/run")
+    rounds = client.get("/v1/replicate/rounds").json()["rounds"]
+    assert rounds[0]["messages"] == 2
+    assert client.get("/health").json()["gossip"]["fanout"] == 2
+
+
+def test_http_quorum_endpoints():
+    service = ConsistencyService()
+    client = TestClient(create_app(service))
+    put = client.post("/v1/quorum/keys/user:9", json={"value": "zed"})
+    assert put.status_code == 201 and put.json()["ok"] is True
+    got = client.get("/v1/quorum/keys/user:9?mode=speculative").json()
+    assert got["value"] == "zed" and len(got["responded"]) == 2
+    assert client.get("/v1/quorum/keys/user:9?mode=bogus").status_code == 400
+    report = client.get("/v1/quorum/latency?requests=200").json()
+    assert {row["mode"] for row in report["rows"]} == {"quorum", "hedged", "speculative", "all"}
+    assert client.get("/health").json()["quorum"]["writes"] == 1
+
+
 def test_swagger_docs():
     service = ConsistencyService()
     client = TestClient(create_app(service))
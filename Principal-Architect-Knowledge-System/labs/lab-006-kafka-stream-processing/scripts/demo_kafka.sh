@@ -20,8 +20,8 @@ curl -sS "$BASE_URL/v1/topics/orders" | python3 -m json.tool
 echo "==> POST /v1/enricher/run"
 curl -sS -X POST "$BASE_URL/v1/enricher/run" | python3 -m json.tool
 
-echo "==> POST /v1/aggregator/run"
-curl -sS -X POST "$BASE_URL/v1/aggregator/run" | python3 -m json.tool
+echo "==> POST /v1/aggregator/run?flush=true"
+curl -sS -X POST "$BASE_URL/v1/aggregator/run?flush=true" | python3 -m json.tool
 
 echo "==> GET /v1/metrics"
 curl -sS "$BASE_URL/v1/metrics" | python3 -m json.tool
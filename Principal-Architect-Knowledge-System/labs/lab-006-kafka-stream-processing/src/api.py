@@ -8,7 +8,7 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 
 from .broker import InMemoryBroker
-from .schemas import CreateOrderRequest
+from .schemas import CreateOrderRequest, SeekRequest
 from .service import StreamStack
 
 _LANDING_HTML = """<!DOCTYPE html>
@@ -34,7 +34,8 @@ _LANDING_HTML = """<!DOCTYPE html>
   <ol>
     <li><code>POST /v1/orders</code> — produce to <code>orders</code> topic (partition by <code>customer_id</code>)</li>
     <li><code>POST /v1/enricher/run</code> — validate + enrich → <code>orders-enriched</code></li>
-    <li><code>POST /v1/aggregator/run</code> — 1-min tumbling windows → <code>order-metrics</code></li>
+    <li><code>POST /v1/aggregator/run?flush=true</code> — 1-min event-time windows,
+      one record per closed window → <code>order-metrics</code></li>
     <li><code>POST /v1/poison/inject</code> — bad message → DLT</li>
     <li><code>POST /v1/dlt/replay</code> — re-drive DLT messages</li>
   </ol>
@@ -60,8 +61,11 @@ def create_app(stack: StreamStack) -> FastAPI:
                 "health": "GET /health",
                 "produce": "POST /v1/orders",
                 "topics": "GET /v1/topics/{topic}",
+                "fetch": "GET /v1/topics/{topic}/partitions/{partition}?offset=&max_records=",
+                "group_offsets": "GET /v1/groups/{group}",
+                "seek": "POST /v1/groups/{group}/seek",
                 "enricher": "POST /v1/enricher/run",
-                "aggregator": "POST /v1/aggregator/run",
+                "aggregator": "POST /v1/aggregator/run?flush=false",
                 "metrics": "GET /v1/metrics",
                 "dlt": "GET /v1/dlt",
                 "replay": "POST /v1/dlt/replay",
@@ -88,17 +92,46 @@ def create_app(stack: StreamStack) -> FastAPI:
             raise HTTPException(status_code=404, detail=f"unknown topic: {topic}")
         return {"topic": topic, "partitions": stack.broker.peek(topic)}
 
+    @app.get("/v1/topics/{topic}/partitions/{partition}")
+    def fetch_partition(
+        topic: str, partition: int, offset: int = 0, max_records: int = 100
+    ) -> dict[str, Any]:
+        if topic not in InMemoryBroker.TOPICS:
+            raise HTTPException(status_code=404, detail=f"unknown topic: {topic}")
+        if not 0 <= partition < stack.broker.partition_count(topic):
+            raise HTTPException(status_code=404, detail=f"unknown partition: {partition}")
+        log = stack.broker.topics[topic][partition]
+        records = stack.broker.fetch(topic, partition, offset, min(max(max_records, 1), 1000))
+        return {
+            "topic": topic,
+            "partition": partition,
+            "start_offset": log.start_offset,
+            "end_offset": log.end_offset,
+            "records": [r.to_dict() for r in records],
+        }
+
+    @app.get("/v1/groups/{group}")
+    def group_offsets(group: str) -> dict[str, Any]:
+        return {"group": group, "topics": stack.broker.group_offsets(group)}
+
+    @app.post("/v1/groups/{group}/seek")
+    def seek_group(group: str, body: SeekRequest) -> dict[str, Any]:
+        if body.topic not in InMemoryBroker.TOPICS:
+            raise HTTPException(status_code=404, detail=f"unknown topic: {body.topic}")
+        stack.broker.seek(group, body.topic, body.offset)
+        return {"group": group, "topics": stack.broker.group_offsets(group)}
+
     @app.post("/v1/enricher/run")
     def run_enricher() -> dict[str, Any]:
         return stack.enricher.run_once()
 
     @app.post("/v1/aggregator/run")
-    def run_aggregator() -> dict[str, Any]:
-        return stack.aggregator.run_once()
+    def run_aggregator(flush: bool = False) -> dict[str, Any]:
+        return stack.aggregator.run_once(flush=flush)
 
     @app.get("/v1/metrics")
     def list_metrics() -> dict[str, Any]:
-        return {"metrics": stack.list_metrics()}
+        return {"metrics": stack.list_metrics(), "closed": stack.closed_metrics()}
 
     @app.get("/v1/dlt")
     def list_dlt() -> dict[str, Any]:
@@ -1,43 +1,368 @@
-"""In-memory Kafka stand-in with partitioned topics and DLT."""
+"""In-memory Kafka stand-in with partitioned logs, consumer-group offsets and DLT."""
 
 from __future__ import annotations
 
-from collections import defaultdict, deque
+import json
+import mmap
+import struct
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
+_MASK32 = 0xFFFFFFFF
+_FRAME = struct.Struct(">II")  # key length, value length
+
+
+def murmur2(data: bytes) -> int:
+    """32-bit murmur2 with Kafka's seed — same bytes give the same hash in every process."""
+    m, r = 0x5BD1E995, 24
+    length = len(data)
+    h = (0x9747B28C ^ length) & _MASK32
+    tail = length & ~3
+    for i in range(0, tail, 4):
+        k = int.from_bytes(data[i : i + 4], "little")
+        k = (k * m) & _MASK32
+        k ^= k >> r
+        k = (k * m) & _MASK32
+        h = ((h * m) & _MASK32) ^ k
+    extra = length & 3
+    if extra == 3:
+        h ^= data[tail + 2] << 16
+    if extra >= 2:
+        h ^= data[tail + 1] << 8
+    if extra >= 1:
+        h ^= data[tail]
+        h = (h * m) & _MASK32
+    h ^= h >> 13
+    h = (h * m) & _MASK32
+    h ^= h >> 15
+    return h
+
+
+@dataclass(frozen=True, slots=True)
+class Record:
+    offset: int
+    key: str
+    value: dict[str, Any]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"offset": self.offset, "key": self.key, "value": self.value}
+
+
+class PartitionLog:
+    """Append-only partition log split into fixed-size segments; offsets are never reused."""
+
+    def __init__(self, segment_records: int = 1024) -> None:
+        if segment_records < 1:
+            raise ValueError("segment_records must be >= 1")
+        self.segment_records = segment_records
+        self._segments: list[list[Record]] = [[]]
+        self._bases: list[int] = [0]
+        self.start_offset = 0
+        self.end_offset = 0
+
+    def __len__(self) -> int:
+        return self.end_offset - self.start_offset
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def append(self, key: str, value: dict[str, Any]) -> int:
+        if len(self._segments[-1]) >= self.segment_records:
+            self._segments.append([])
+            self._bases.append(self.end_offset)
+        offset = self.end_offset
+        self._segments[-1].append(Record(offset, key, value))
+        self.end_offset += 1
+        return offset
+
+    def fetch(self, offset: int, max_records: int = 500) -> list[Record]:
+        """Records in ``[offset, offset + max_records)`` — slices share the stored records."""
+        offset = max(offset, self.start_offset)
+        batch: list[Record] = []
+        index = bisect_right(self._bases, offset) - 1
+        while len(batch) < max_records and offset < self.end_offset:
+            start = offset - self._bases[index]
+            chunk = self._segments[index][start : start + max_records - len(batch)]
+            batch.extend(chunk)
+            offset += len(chunk)
+            index += 1
+        return batch
+
+    def truncate_before(self, offset: int) -> int:
+        """Drop whole segments below ``offset`` (retention); returns the new start offset."""
+        while len(self._segments) > 1 and self._bases[1] <= offset:
+            del self._segments[0]
+            del self._bases[0]
+        self.start_offset = self._bases[0]
+        return self.start_offset
+
+
+class _FileSegment:
+    """One on-disk segment: length-prefixed frames, read through a read-only mmap."""
+
+    def __init__(self, path: Path, base_offset: int) -> None:
+        self.path = path
+        self.base_offset = base_offset
+        self.positions: list[int] = []
+        self._file = open(path, "a+b")
+        self.size = 0
+        self._map: mmap.mmap | None = None
+        self._mapped = 0
+        self._recover()
+
+    def _recover(self) -> None:
+        data = self.path.read_bytes()
+        pos = 0
+        while pos + _FRAME.size <= len(data):
+            key_len, value_len = _FRAME.unpack_from(data, pos)
+            end = pos + _FRAME.size + key_len + value_len
+            if end > len(data):
+                break  # torn write at the tail
+            self.positions.append(pos)
+            pos = end
+        self.size = pos
+        if pos != len(data):
+            self._file.truncate(pos)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def append(self, key: bytes, value: bytes) -> None:
+        self._file.write(_FRAME.pack(len(key), len(value)) + key + value)
+        self._file.flush()
+        self.positions.append(self.size)
+        self.size += _FRAME.size + len(key) + len(value)
+
+    def view(self) -> memoryview:
+        if self._mapped < self.size:
+            # Old maps are dropped, not closed: consumers may still hold views into them.
+            self._map = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+            self._mapped = self.size
+        assert self._map is not None
+        return memoryview(self._map)
+
+    def frame(self, view: memoryview, index: int) -> tuple[memoryview, memoryview]:
+        pos = self.positions[index]
+        key_len, value_len = _FRAME.unpack_from(view, pos)
+        key_start = pos + _FRAME.size
+        value_start = key_start + key_len
+        return view[key_start:value_start], view[value_start : value_start + value_len]
+
+    def close(self) -> None:
+        self._file.close()
+        self._map = None
+
+
+class MmapPartitionLog:
+    """Disk-backed partition log; segments are files named by base offset and read via mmap."""
+
+    def __init__(self, directory: str | Path, segment_records: int = 1024) -> None:
+        if segment_records < 1:
+            raise ValueError("segment_records must be >= 1")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_records = segment_records
+        self._segments: list[_FileSegment] = [
+            _FileSegment(path, int(path.stem)) for path in sorted(self.directory.glob("*.log"))
+        ]
+        if not self._segments:
+            self._segments.append(self._new_segment(0))
+        self._bases = [s.base_offset for s in self._segments]
+        self.start_offset = self._bases[0]
+        self.end_offset = self._bases[-1] + len(self._segments[-1])
+
+    def _new_segment(self, base_offset: int) -> _FileSegment:
+        return _FileSegment(self.directory / f"{base_offset:020d}.log", base_offset)
+
+    def __len__(self) -> int:
+        return self.end_offset - self.start_offset
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def append(self, key: str, value: dict[str, Any]) -> int:
+        if len(self._segments[-1]) >= self.segment_records:
+            self._segments.append(self._new_segment(self.end_offset))
+            self._bases.append(self.end_offset)
+        offset = self.end_offset
+        self._segments[-1].append(key.encode(), json.dumps(value).encode())
+        self.end_offset += 1
+        return offset
+
+    def fetch_raw(
+        self, offset: int, max_records: int = 500
+    ) -> list[tuple[int, memoryview, memoryview]]:
+        """``(offset, key, value)`` memoryviews straight into the mapped segment files."""
+        offset = max(offset, self.start_offset)
+        batch: list[tuple[int, memoryview, memoryview]] = []
+        index = bisect_right(self._bases, offset) - 1
+        while len(batch) < max_records and offset < self.end_offset:
+            segment = self._segments[index]
+            view = segment.view()
+            start = offset - segment.base_offset
+            stop = min(len(segment), start + max_records - len(batch))
+            for i in range(start, stop):
+                key, value = segment.frame(view, i)
+                batch.append((segment.base_offset + i, key, value))
+            offset = segment.base_offset + stop
+            index += 1
+        return batch
+
+    def fetch(self, offset: int, max_records: int = 500) -> list[Record]:
+        return [
+            Record(off, str(key, "utf-8"), json.loads(bytes(value)))
+            for off, key, value in self.fetch_raw(offset, max_records)
+        ]
+
+    def truncate_before(self, offset: int) -> int:
+        while len(self._segments) > 1 and self._bases[1] <= offset:
+            segment = self._segments.pop(0)
+            del self._bases[0]
+            segment.close()
+            segment.path.unlink()
+        self.start_offset = self._bases[0]
+        return self.start_offset
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+
 
 class InMemoryBroker:
-    """Topic partition simulation keyed by customer_id hash."""
+    """Partitioned topic logs with per-consumer-group committed offsets."""
 
     PARTITIONS = 4
     TOPICS = ("orders", "orders-enriched", "order-metrics")
 
-    def __init__(self) -> None:
-        self.topics: dict[str, dict[int, deque[dict[str, Any]]]] = defaultdict(
-            lambda: defaultdict(deque)
-        )
+    def __init__(
+        self,
+        partitions: int = PARTITIONS,
+        *,
+        log_dir: str | Path | None = None,
+        segment_records: int = 1024,
+    ) -> None:
+        if partitions < 1:
+            raise ValueError("partitions must be >= 1")
+        self.partitions = partitions
+        self.log_dir = Path(log_dir) if log_dir is not None else None
+        self.segment_records = segment_records
+        self.topics: dict[str, list[PartitionLog | MmapPartitionLog]] = {}
+        # One append lock per partition: concurrent producers only contend on the same partition.
+        self._append_locks: dict[str, list[threading.Lock]] = {}
+        self._topic_lock = threading.Lock()
+        self.offsets: dict[tuple[str, str, int], int] = {}
         self.dlt: list[dict[str, Any]] = []
+        for topic in self.TOPICS:
+            self.create_topic(topic)
 
-    def partition_for(self, key: str) -> int:
-        return hash(key) % self.PARTITIONS
+    def create_topic(
+        self, topic: str, partitions: int | None = None
+    ) -> list[PartitionLog | MmapPartitionLog]:
+        if topic in self.topics:
+            return self.topics[topic]
+        with self._topic_lock:
+            if topic in self.topics:
+                return self.topics[topic]
+            count = partitions or self.partitions
+            if self.log_dir is None:
+                logs: list[PartitionLog | MmapPartitionLog] = [
+                    PartitionLog(self.segment_records) for _ in range(count)
+                ]
+            else:
+                logs = [
+                    MmapPartitionLog(self.log_dir / f"{topic}-{p}", self.segment_records)
+                    for p in range(count)
+                ]
+            self._append_locks[topic] = [threading.Lock() for _ in range(count)]
+            self.topics[topic] = logs
+            return logs
+
+    def partition_count(self, topic: str) -> int:
+        return len(self.create_topic(topic))
+
+    def partition_for(self, key: str, partitions: int | None = None) -> int:
+        """Kafka default partitioner: positive murmur2 of the key bytes, mod partition count."""
+        return (murmur2(key.encode()) & 0x7FFFFFFF) % (partitions or self.partitions)
 
     def produce(self, topic: str, key: str, value: dict[str, Any]) -> int:
-        partition = self.partition_for(key)
-        self.topics[topic][partition].append(value)
+        logs = self.create_topic(topic)
+        partition = self.partition_for(key, len(logs))
+        with self._append_locks[topic][partition]:
+            logs[partition].append(key, value)
         return partition
 
-    def consume(self, topic: str, partition: int, limit: int = 100) -> list[dict[str, Any]]:
-        queue = self.topics[topic][partition]
-        batch: list[dict[str, Any]] = []
-        while queue and len(batch) < limit:
-            batch.append(queue.popleft())
-        return batch
+    def fetch(
+        self, topic: str, partition: int, offset: int, max_records: int = 500
+    ) -> list[Record]:
+        return self.create_topic(topic)[partition].fetch(offset, max_records)
+
+    def committed(self, group: str, topic: str, partition: int) -> int:
+        """Next offset ``group`` will read; new groups start at the earliest retained record."""
+        log = self.create_topic(topic)[partition]
+        return max(self.offsets.get((group, topic, partition), 0), log.start_offset)
+
+    def commit(self, group: str, topic: str, partition: int, offset: int) -> None:
+        self.offsets[(group, topic, partition)] = offset
+
+    def seek(self, group: str, topic: str, offset: int = 0) -> None:
+        """Rewind (or skip) every partition of ``topic`` for ``group`` — replay from the log."""
+        for partition, log in enumerate(self.create_topic(topic)):
+            self.commit(group, topic, partition, min(max(offset, log.start_offset), log.end_offset))
 
-    def peek(self, topic: str) -> dict[str, list[dict[str, Any]]]:
-        return {str(p): list(self.topics[topic][p]) for p in range(self.PARTITIONS)}
+    def consume(
+        self, topic: str, partition: int, limit: int = 100, group: str = "default"
+    ) -> list[dict[str, Any]]:
+        """Fetch from the group's committed offset and auto-commit past the batch."""
+        batch = self.fetch(topic, partition, self.committed(group, topic, partition), limit)
+        if batch:
+            self.commit(group, topic, partition, batch[-1].offset + 1)
+        return [record.value for record in batch]
+
+    def partition_lag(self, group: str, topic: str) -> dict[int, int]:
+        return {
+            p: log.end_offset - self.committed(group, topic, p)
+            for p, log in enumerate(self.create_topic(topic))
+        }
+
+    def lag(self, group: str, topic: str) -> int:
+        return sum(self.partition_lag(group, topic).values())
+
+    def group_offsets(self, group: str) -> dict[str, dict[str, Any]]:
+        result: dict[str, dict[str, Any]] = {}
+        for g, topic, partition in sorted(self.offsets):
+            if g != group:
+                continue
+            log = self.topics[topic][partition]
+            committed = self.committed(group, topic, partition)
+            entry = result.setdefault(topic, {"partitions": {}, "lag": 0})
+            entry["partitions"][str(partition)] = {
+                "committed": committed,
+                "end_offset": log.end_offset,
+            }
+            entry["lag"] += log.end_offset - committed
+        return result
+
+    def peek(self, topic: str, limit: int = 100) -> dict[str, list[dict[str, Any]]]:
+        """Latest ``limit`` records per partition, with offsets."""
+        return {
+            str(p): [r.to_dict() for r in log.fetch(max(log.end_offset - limit, 0), limit)]
+            for p, log in enumerate(self.create_topic(topic))
+        }
 
     def topic_depth(self, topic: str) -> int:
-        return sum(len(self.topics[topic][p]) for p in range(self.PARTITIONS))
+        """Records retained across all partitions of ``topic``."""
+        return sum(len(log) for log in self.create_topic(topic))
 
     def send_dlt(self, raw: str, error: str) -> None:
         self.dlt.append({"raw": raw, "error": error})
+
+    def close(self) -> None:
+        for logs in self.topics.values():
+            for log in logs:
+                if isinstance(log, MmapPartitionLog):
+                    log.close()
@@ -0,0 +1,256 @@
+"""Bounded dedupe stores for idempotent producers and consumers."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Protocol
+
+
+class DedupeStore(Protocol):
+    def check_and_add(self, key: str) -> bool:
+        """Record ``key``; ``True`` if it was seen inside the window."""
+        ...
+
+    def discard(self, key: str) -> None:
+        """Forget ``key`` (its side effect failed), so a retry is not a duplicate."""
+        ...
+
+    def stats(self) -> dict[str, Any]: ...
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for ``capacity`` keys at ``fp_rate``."""
+
+    def __init__(self, capacity: int, fp_rate: float) -> None:
+        if capacity < 1 or not 0 < fp_rate < 1:
+            raise ValueError("capacity must be >= 1 and 0 < fp_rate < 1")
+        self.capacity = capacity
+        self.bit_count = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        # Kirsch–Mitzenmacher: k indexes from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(key))
+
+    def add(self, key: str) -> None:
+        for i in self._indexes(key):
+            self.bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def estimated_fp_rate(self) -> float:
+        """Current false-positive probability from the fraction of bits set."""
+        fill = int.from_bytes(self.bits, "little").bit_count() / self.bit_count
+        return fill**self.hash_count
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+class WindowedDedupeStore:
+    """Time-bounded dedupe: exact LRU of recent keys in front of rotating Bloom filters.
+
+    A key is remembered for ``window_sec`` after it was last seen, and forgotten after
+    at most two windows (two generations of filters, each covering one window). A
+    generation also rotates early once it holds ``capacity`` keys, so the false-positive
+    rate stays near ``fp_rate`` under bursts.
+
+    LRU hits are exact. A Bloom-only hit (the key fell out of the LRU) is only a
+    *probable* duplicate: about ``fp_rate`` of them are new keys. By default they are
+    let through and counted in ``probable_hits``, so a false positive never drops a new
+    record — duplicates older than the LRU may then be reprocessed. With
+    ``drop_probable=True`` they are reported as duplicates instead, trading about
+    ``fp_rate`` lost records for stricter dedupe; ``possible_drops`` counts them.
+    """
+
+    def __init__(
+        self,
+        window_sec: float = 3600.0,
+        capacity: int = 100_000,
+        fp_rate: float = 0.001,
+        lru_size: int = 10_000,
+        clock: Callable[[], float] = time.time,
+        drop_probable: bool = False,
+    ) -> None:
+        self.window_sec = window_sec
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.lru_size = lru_size
+        self.drop_probable = drop_probable
+        self._clock = clock
+        self._current = BloomFilter(capacity, fp_rate)
+        self._previous: BloomFilter | None = None
+        self._rotated_at = clock()
+        self._recent: OrderedDict[str, float] = OrderedDict()  # key → last seen
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.exact_hits = 0
+        self.probable_hits = 0
+        self.rotations = 0
+
+    def _maybe_rotate(self, now: float) -> None:
+        elapsed = now - self._rotated_at
+        if elapsed >= 2 * self.window_sec:
+            self._previous = None  # idle for two windows: everything has expired
+        elif elapsed >= self.window_sec or self._current.count >= self.capacity:
+            self._previous = self._current
+        else:
+            return
+        self._current = BloomFilter(self.capacity, self.fp_rate)
+        self._rotated_at = now
+        self.rotations += 1
+
+    def check_and_add(self, key: str) -> bool:
+        now = self._clock()
+        with self._lock:
+            self._maybe_rotate(now)
+            self.checks += 1
+            last_seen = self._recent.pop(key, None)
+            self._recent[key] = now
+            if len(self._recent) > self.lru_size:
+                self._recent.popitem(last=False)
+            in_filters = key in self._current or (
+                self._previous is not None and key in self._previous
+            )
+            self._current.add(key)
+            if last_seen is not None:
+                # The LRU knows exactly when the key was last seen; the filters do not.
+                if now - last_seen < self.window_sec:
+                    self.exact_hits += 1
+                    return True
+                return False
+            if in_filters:
+                self.probable_hits += 1
+                return self.drop_probable
+            return False
+
+    def discard(self, key: str) -> None:
+        # Bloom bits cannot be cleared; a stale LRU entry overrides them instead.
+        with self._lock:
+            self._recent.pop(key, None)
+            self._recent[key] = -math.inf
+            if len(self._recent) > self.lru_size:
+                self._recent.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            filters = [f for f in (self._current, self._previous) if f is not None]
+            # A key is a false positive if it hits either filter.
+            miss_both = math.prod(1 - f.estimated_fp_rate() for f in filters)
+            lru_bytes = sys.getsizeof(self._recent) + sum(
+                sys.getsizeof(k) for k in self._recent
+            )
+            return {
+                "backend": "bloom+lru",
+                "window_sec": self.window_sec,
+                "checks": self.checks,
+                "exact_hits": self.exact_hits,
+                "probable_hits": self.probable_hits,
+                "drop_probable": self.drop_probable,
+                "possible_drops": self.probable_hits if self.drop_probable else 0,
+                "rotations": self.rotations,
+                "lru_keys": len(self._recent),
+                "target_fp_rate": self.fp_rate,
+                "estimated_fp_rate": round(1 - miss_both, 6),
+                "memory_bytes": sum(f.memory_bytes for f in filters) + lru_bytes,
+            }
+
+
+class SqliteDedupeStore:
+    """Exact, persistent dedupe in SQLite; keys older than ``window_sec`` are purged."""
+
+    _PURGE_EVERY = 1000
+
+    def __init__(
+        self,
+        path: str | Path,
+        window_sec: float = 7 * 24 * 3600.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = str(path)
+        self.window_sec = window_sec
+        self._clock = clock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedupe_keys (key TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_seen_at ON dedupe_keys (seen_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.hits = 0
+        self.purged = 0
+
+    def check_and_add(self, key: str) -> bool:
+        now = self._clock()
+        with self._lock:
+            self.checks += 1
+            if self.checks % self._PURGE_EVERY == 0:
+                self._purge(now)
+            cur = self._conn.execute(
+                "INSERT INTO dedupe_keys (key, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE dedupe_keys.seen_at < ?",
+                (key, now, now - self.window_sec),
+            )
+            self._conn.commit()
+            # rowcount 0 → existing key still inside the window.
+            duplicate = cur.rowcount == 0
+            self.hits += duplicate
+            return duplicate
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM dedupe_keys WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _purge(self, now: float) -> None:
+        cur = self._conn.execute(
+            "DELETE FROM dedupe_keys WHERE seen_at < ?", (now - self.window_sec,)
+        )
+        self.purged += cur.rowcount
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (keys,) = self._conn.execute("SELECT COUNT(*) FROM dedupe_keys").fetchone()
+            (pages,) = self._conn.execute("PRAGMA page_count").fetchone()
+            (page_size,) = self._conn.execute("PRAGMA page_size").fetchone()
+        return {
+            "backend": "sqlite",
+            "window_sec": self.window_sec,
+            "checks": self.checks,
+            "exact_hits": self.hits,
+            "keys": keys,
+            "purged": self.purged,
+            "estimated_fp_rate": 0.0,
+            "disk_bytes": pages * page_size,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def make_dedupe_store(
+    backend: str = "memory", path: str | Path | None = None, **options: Any
+) -> WindowedDedupeStore | SqliteDedupeStore:
+    if backend == "memory":
+        return WindowedDedupeStore(**options)
+    if backend == "sqlite":
+        return SqliteDedupeStore(path or ":memory:", **options)
+    raise ValueError(f"unknown dedupe backend: {backend}")
@@ -7,7 +7,8 @@ import argparse
 import json
 
 from .api import create_app
-from .service import StreamStack
+from .executor import EXECUTOR_MODES
+from .service import WINDOW_TYPES, StreamStack
 
 
 def run_demo(stack: StreamStack) -> None:
@@ -19,15 +20,15 @@ def run_demo(stack: StreamStack) -> None:
     print("==> 2. Run enricher (orders → orders-enriched)")
     print(f"    {stack.enricher.run_once()}")
 
-    print("==> 3. Run aggregator (1-min tumbling windows)")
-    print(f"    {stack.aggregator.run_once()}")
+    print("==> 3. Run aggregator (1-min windows; flush closes the open ones)")
+    print(f"    {stack.aggregator.run_once(flush=True)}")
 
     print("==> 4. Inject poison message → DLT")
     stack.inject_poison()
     print(f"    {stack.enricher.run_once()}")
 
     print("==> 5. Metrics")
-    print(json.dumps(stack.list_metrics(), indent=2))
+    print(json.dumps(stack.closed_metrics(), indent=2))
 
     print("==> Stats:", json.dumps(stack.stats(), indent=2))
 
@@ -37,9 +38,29 @@ def main() -> int:
     parser.add_argument("--serve", action="store_true", help="Start API on :8094")
     parser.add_argument("--demo", action="store_true", help="Run end-to-end demo")
     parser.add_argument("--port", type=int, default=8094)
+    parser.add_argument("--partitions", type=int, default=4, help="Partitions per topic")
+    parser.add_argument("--log-dir", default=None, help="Persist partition logs (mmap) here")
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTOR_MODES,
+        default="thread",
+        help="How partition consumers run (process = enrichment in a process pool)",
+    )
+    parser.add_argument("--window", choices=WINDOW_TYPES, default="tumbling")
+    parser.add_argument("--allowed-lateness", type=float, default=0.0, help="Seconds")
+    parser.add_argument("--dedupe", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--dedupe-dir", default=None, help="SQLite dedupe files (--dedupe sqlite)")
     args = parser.parse_args()
 
-    stack = StreamStack()
+    stack = StreamStack(
+        args.partitions,
+        log_dir=args.log_dir,
+        executor_mode=args.executor,
+        window_type=args.window,
+        allowed_lateness_sec=args.allowed_lateness,
+        dedupe_backend=args.dedupe,
+        dedupe_dir=args.dedupe_dir,
+    )
 
     if args.demo:
         run_demo(stack)
@@ -27,14 +27,16 @@ class Order:
 
 @dataclass
 class WindowMetrics:
-    window_start: int
+    window_start: float
     region: str
     count: int = 0
     revenue: float = 0.0
+    window_end: float = 0.0
 
     def to_dict(self) -> dict[str, Any]:
         return {
             "window_start": self.window_start,
+            "window_end": self.window_end,
             "region": self.region,
             "count": self.count,
             "revenue": round(self.revenue, 2),
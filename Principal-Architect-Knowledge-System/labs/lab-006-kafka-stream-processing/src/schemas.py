@@ -10,3 +10,8 @@ class CreateOrderRequest(BaseModel):
     amount: float = Field(..., gt=0, examples=[99.99])
     region: str = Field(..., examples=["us-west"])
     order_id: str | None = Field(default=None, examples=["ord-demo-1"])
+
+
+class SeekRequest(BaseModel):
+    topic: str = Field(..., examples=["orders"])
+    offset: int = Field(default=0, ge=0, examples=[0])
@@ -3,28 +3,47 @@
 from __future__ import annotations
 
 import json
+import threading
 import time
 import uuid
+from dataclasses import replace
+from pathlib import Path
 from typing import Any
 
 from .broker import InMemoryBroker
+from .dedupe import (
+    DedupeStore,
+    SqliteDedupeStore,
+    WindowedDedupeStore,
+    make_dedupe_store,
+)
+from .executor import PartitionExecutor, PartitionStats
 from .models import Order, WindowMetrics
 
 
 class OrderProducer:
-    """Idempotent producer — dedupes by order_id within session."""
+    """Idempotent producer — dedupes by order_id within the dedupe store's window."""
 
-    def __init__(self, broker: InMemoryBroker, topic: str = "orders") -> None:
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        topic: str = "orders",
+        dedupe: DedupeStore | None = None,
+    ) -> None:
         self.broker = broker
         self.topic = topic
-        self._produced: set[str] = set()
+        self.dedupe = dedupe or WindowedDedupeStore()
         self.produced_total = 0
 
     def produce(self, order: Order) -> dict[str, Any]:
-        if order.order_id in self._produced:
+        if self.dedupe.check_and_add(order.order_id):
             return {"status": "duplicate_skipped", "order_id": order.order_id}
-        partition = self.broker.produce(self.topic, order.customer_id, order.to_dict())
-        self._produced.add(order.order_id)
+        try:
+            partition = self.broker.produce(self.topic, order.customer_id, order.to_dict())
+        except Exception:
+            # Not produced: a retry of this order must not be skipped as a duplicate.
+            self.dedupe.discard(order.order_id)
+            raise
         self.produced_total += 1
         return {
             "status": "produced",
@@ -35,76 +54,254 @@ class OrderProducer:
         }
 
 
+def enrich_order(raw: dict[str, Any]) -> dict[str, Any]:
+    if "order_id" not in raw or "amount" not in raw:
+        raise ValueError("invalid schema")
+    return {**raw, "enriched": True, "currency": "USD"}
+
+
+def try_enrich(raw: dict[str, Any]) -> dict[str, Any] | None:
+    """Module-level (picklable) enrichment step; ``None`` marks a poison record."""
+    try:
+        return enrich_order(raw)
+    except ValueError:
+        return None
+
+
 class EnricherConsumer:
     """At-least-once enricher with idempotent handler and DLT routing."""
 
-    def __init__(self, broker: InMemoryBroker) -> None:
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        group: str = "enricher",
+        executor: PartitionExecutor | None = None,
+        dedupe: DedupeStore | None = None,
+    ) -> None:
         self.broker = broker
-        self.processed_ids: set[str] = set()
+        self.group = group
+        self.executor = executor or PartitionExecutor("serial")
+        self.dedupe = dedupe or WindowedDedupeStore()
+        self.source_topic = "orders"
         self.enriched_topic = "orders-enriched"
         self.processed_total = 0
         self.duplicates_total = 0
+        self.partition_stats: dict[int, PartitionStats] = {}
 
     def enrich(self, raw: dict[str, Any]) -> dict[str, Any]:
-        if "order_id" not in raw or "amount" not in raw:
-            raise ValueError("invalid schema")
-        return {**raw, "enriched": True, "currency": "USD"}
+        return enrich_order(raw)
 
     def run_once(self) -> dict[str, int]:
+        partitions = range(self.broker.partition_count(self.source_topic))
+        for partition in partitions:
+            self.partition_stats.setdefault(partition, PartitionStats())
+        results = self.executor.map_partitions(self._run_partition, partitions)
+        totals = {"enriched": 0, "dlt_routed": 0, "duplicates": 0}
+        for result in results.values():
+            for name in totals:
+                totals[name] += result[name]
+        self.processed_total += totals["enriched"]
+        self.duplicates_total += totals["duplicates"]
+        return totals
+
+    def _run_partition(self, partition: int) -> dict[str, int]:
+        started = time.perf_counter()
         enriched = 0
         dlt_routed = 0
         duplicates = 0
-        for partition in range(InMemoryBroker.PARTITIONS):
-            for raw in self.broker.consume("orders", partition):
-                try:
-                    record = self.enrich(raw)
-                except ValueError:
-                    self.broker.send_dlt(json.dumps(raw), "schema validation failed")
-                    dlt_routed += 1
-                    continue
-                order_id = str(record["order_id"])
-                if order_id in self.processed_ids:
-                    duplicates += 1
-                    self.duplicates_total += 1
-                    continue
-                self.processed_ids.add(order_id)
+        offset = self.broker.committed(self.group, self.source_topic, partition)
+        batch = self.broker.fetch(self.source_topic, partition, offset, max_records=100)
+        records = self.executor.map_records(try_enrich, [message.value for message in batch])
+        for message, record in zip(batch, records):
+            if record is None:
+                self.broker.send_dlt(json.dumps(message.value), "schema validation failed")
+                dlt_routed += 1
+                continue
+            # Same order_id → same customer key → same partition, so only this task sees it.
+            order_id = str(record["order_id"])
+            if self.dedupe.check_and_add(order_id):
+                duplicates += 1
+                continue
+            try:
                 self.broker.produce(self.enriched_topic, str(record["customer_id"]), record)
-                enriched += 1
-                self.processed_total += 1
+            except Exception:
+                self.dedupe.discard(order_id)  # the uncommitted batch is replayed
+                raise
+            enriched += 1
+        if batch:
+            # Commit after the side effects — a crash before this line replays the batch.
+            self.broker.commit(self.group, self.source_topic, partition, batch[-1].offset + 1)
+        self.partition_stats[partition].observe(len(batch), time.perf_counter() - started)
         return {"enriched": enriched, "dlt_routed": dlt_routed, "duplicates": duplicates}
 
 
+WINDOW_TYPES = ("tumbling", "sliding", "session")
+
+
 class WindowAggregator:
-    """Tumbling window aggregation keyed by region."""
+    """Event-time window aggregation keyed by region, emitted once per window on close.
 
-    def __init__(self, broker: InMemoryBroker, window_size_sec: int = 60) -> None:
+    The watermark trails the slowest active partition's max event time by
+    ``max_out_of_orderness_sec``. A window closes — is emitted to ``order-metrics``
+    and evicted — once the watermark passes ``window_end + allowed_lateness_sec``;
+    events for windows that already closed are counted as late and dropped.
+    """
+
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        window_size_sec: int = 60,
+        group: str = "aggregator",
+        executor: PartitionExecutor | None = None,
+        *,
+        window_type: str = "tumbling",
+        slide_sec: int | None = None,
+        session_gap_sec: float = 30.0,
+        allowed_lateness_sec: float = 0.0,
+        max_out_of_orderness_sec: float = 5.0,
+    ) -> None:
+        if window_type not in WINDOW_TYPES:
+            raise ValueError(f"unknown window type: {window_type}")
         self.broker = broker
+        self.group = group
+        self.executor = executor or PartitionExecutor("serial")
         self.window_size_sec = window_size_sec
-        self.windows: dict[tuple[int, str], WindowMetrics] = {}
+        self.window_type = window_type
+        self.slide_sec = slide_sec or window_size_sec
+        self.session_gap_sec = session_gap_sec
+        self.allowed_lateness_sec = allowed_lateness_sec
+        self.max_out_of_orderness_sec = max_out_of_orderness_sec
+        self.windows: dict[tuple[float, str], WindowMetrics] = {}
         self.metrics_topic = "order-metrics"
+        self.partition_stats: dict[int, PartitionStats] = {}
+        self.watermark = float("-inf")
+        self.closed_total = 0
+        self.late_dropped_total = 0
+        self._max_event_time: dict[int, float] = {}
+        # Regions span partitions, so window updates from different workers are serialized.
+        self._windows_lock = threading.Lock()
 
-    def aggregate(self, enriched: dict[str, Any]) -> WindowMetrics:
-        window_start = int(enriched["event_time"] // self.window_size_sec) * self.window_size_sec
-        key = (window_start, str(enriched["region"]))
-        if key not in self.windows:
-            self.windows[key] = WindowMetrics(window_start, str(enriched["region"]))
-        metrics = self.windows[key]
-        metrics.count += 1
-        metrics.revenue += float(enriched["amount"])
-        return metrics
+    def _assign(self, event_time: float) -> list[tuple[float, float]]:
+        if self.window_type == "session":
+            return [(event_time, event_time + self.session_gap_sec)]
+        size, slide = self.window_size_sec, self.slide_sec
+        start = int(event_time // slide) * slide
+        spans = []
+        while start > event_time - size:
+            spans.append((start, start + size))
+            start -= slide
+        return spans
 
-    def run_once(self) -> dict[str, int]:
-        emitted = 0
-        for partition in range(InMemoryBroker.PARTITIONS):
-            for enriched in self.broker.consume("orders-enriched", partition):
-                metrics = self.aggregate(enriched)
+    def _is_late(self, window_end: float) -> bool:
+        return window_end + self.allowed_lateness_sec <= self.watermark
+
+    def aggregate(self, enriched: dict[str, Any], partition: int = 0) -> WindowMetrics | None:
+        """Add one event to its open window(s); ``None`` when it arrived too late."""
+        event_time = float(enriched["event_time"])
+        region = str(enriched["region"])
+        amount = float(enriched["amount"])
+        with self._windows_lock:
+            self._max_event_time[partition] = max(
+                self._max_event_time.get(partition, event_time), event_time
+            )
+            spans = [
+                span
+                for span in self._assign(event_time)
+                if not self._is_late(span[1]) or self._open_session(region, *span)
+            ]
+            if not spans:
+                self.late_dropped_total += 1
+                return None
+            if self.window_type == "session":
+                targets = [self._merge_session(region, *spans[0])]
+            else:
+                targets = [
+                    self.windows.setdefault(
+                        (start, region), WindowMetrics(start, region, window_end=end)
+                    )
+                    for start, end in spans
+                ]
+            for metrics in targets:
+                metrics.count += 1
+                metrics.revenue += amount
+            return replace(targets[0])
+
+    def _open_session(self, region: str, start: float, end: float) -> bool:
+        return self.window_type == "session" and any(
+            k[1] == region and w.window_start < end and start < w.window_end
+            for k, w in self.windows.items()
+        )
+
+    def _merge_session(self, region: str, start: float, end: float) -> WindowMetrics:
+        """Merge ``[start, end)`` with every overlapping open session of ``region``."""
+        merged = WindowMetrics(start, region, window_end=end)
+        for key in [k for k, w in self.windows.items() if k[1] == region]:
+            session = self.windows[key]
+            if (
+                session.window_start < merged.window_end
+                and merged.window_start < session.window_end
+            ):
+                del self.windows[key]
+                merged.window_start = min(merged.window_start, session.window_start)
+                merged.window_end = max(merged.window_end, session.window_end)
+                merged.count += session.count
+                merged.revenue += session.revenue
+        self.windows[(merged.window_start, region)] = merged
+        return merged
+
+    def advance_watermark(self) -> float:
+        """Watermark from the slowest partition that has seen data (idle ones are skipped)."""
+        with self._windows_lock:
+            if self._max_event_time:
+                candidate = min(self._max_event_time.values()) - self.max_out_of_orderness_sec
+                self.watermark = max(self.watermark, candidate)
+            return self.watermark
+
+    def current_watermark(self) -> float | None:
+        return None if self.watermark == float("-inf") else self.watermark
+
+    def close_windows(self, *, flush: bool = False) -> int:
+        """Emit and evict every closed window (all open windows when ``flush``)."""
+        with self._windows_lock:
+            closing = sorted(
+                (w for w in self.windows.values() if flush or self._is_late(w.window_end)),
+                key=lambda w: (w.window_end, w.region),
+            )
+            for metrics in closing:
+                del self.windows[(metrics.window_start, metrics.region)]
                 self.broker.produce(
-                    self.metrics_topic,
-                    str(metrics.window_start),
-                    metrics.to_dict(),
+                    self.metrics_topic, str(metrics.window_start), metrics.to_dict()
                 )
-                emitted += 1
-        return {"metrics_emitted": emitted, "windows": len(self.windows)}
+            if flush and closing:
+                # Flushed windows are final: later events for them count as late, so the
+                # watermark must pass their end by the allowed lateness (see ``_is_late``).
+                last_end = max(w.window_end for w in closing)
+                self.watermark = max(self.watermark, last_end + self.allowed_lateness_sec)
+            self.closed_total += len(closing)
+            return len(closing)
+
+    def run_once(self, flush: bool = False) -> dict[str, Any]:
+        partitions = range(self.broker.partition_count("orders-enriched"))
+        for partition in partitions:
+            self.partition_stats.setdefault(partition, PartitionStats())
+        late_before = self.late_dropped_total
+        self.executor.map_partitions(self._run_partition, partitions)
+        self.advance_watermark()
+        emitted = self.close_windows(flush=flush)
+        return {
+            "metrics_emitted": emitted,
+            "windows": len(self.windows),
+            "late_dropped": self.late_dropped_total - late_before,
+            "watermark": self.current_watermark(),
+        }
+
+    def _run_partition(self, partition: int) -> int:
+        started = time.perf_counter()
+        batch = self.broker.consume("orders-enriched", partition, group=self.group)
+        for enriched in batch:
+            self.aggregate(enriched, partition)
+        self.partition_stats[partition].observe(len(batch), time.perf_counter() - started)
+        return len(batch)
 
 
 class DLTHandler:
@@ -130,13 +327,41 @@ class DLTHandler:
 class StreamStack:
     """Wires broker + pipeline stages for API and CLI."""
 
-    def __init__(self) -> None:
-        self.broker = InMemoryBroker()
-        self.producer = OrderProducer(self.broker)
-        self.enricher = EnricherConsumer(self.broker)
-        self.aggregator = WindowAggregator(self.broker)
+    def __init__(
+        self,
+        partitions: int = InMemoryBroker.PARTITIONS,
+        log_dir: str | None = None,
+        executor_mode: str = "thread",
+        window_type: str = "tumbling",
+        allowed_lateness_sec: float = 0.0,
+        dedupe_backend: str = "memory",
+        dedupe_dir: str | None = None,
+    ) -> None:
+        self.broker = InMemoryBroker(partitions, log_dir=log_dir)
+        self.executor = PartitionExecutor(executor_mode, max_workers=partitions)
+        self.producer = OrderProducer(
+            self.broker, dedupe=self._dedupe_store(dedupe_backend, dedupe_dir, "producer")
+        )
+        self.enricher = EnricherConsumer(
+            self.broker,
+            executor=self.executor,
+            dedupe=self._dedupe_store(dedupe_backend, dedupe_dir, "enricher"),
+        )
+        self.aggregator = WindowAggregator(
+            self.broker,
+            executor=self.executor,
+            window_type=window_type,
+            allowed_lateness_sec=allowed_lateness_sec,
+        )
         self.dlt = DLTHandler(self.broker)
 
+    @staticmethod
+    def _dedupe_store(backend: str, directory: str | None, name: str) -> DedupeStore:
+        if backend == "sqlite" and directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            return make_dedupe_store(backend, Path(directory) / f"{name}-dedupe.db")
+        return make_dedupe_store(backend)
+
     def create_order(
         self,
         customer_id: str,
@@ -158,12 +383,55 @@ class StreamStack:
             "orders_topic_depth": self.broker.topic_depth("orders"),
             "enriched_topic_depth": self.broker.topic_depth("orders-enriched"),
             "metrics_topic_depth": self.broker.topic_depth("order-metrics"),
+            "enricher_lag": self.broker.lag(self.enricher.group, "orders"),
+            "aggregator_lag": self.broker.lag(self.aggregator.group, "orders-enriched"),
             "dlt_messages": len(self.broker.dlt),
             "produced_total": self.producer.produced_total,
             "enricher_processed": self.enricher.processed_total,
             "enricher_duplicates": self.enricher.duplicates_total,
             "windows": len(self.aggregator.windows),
+            "windows_closed": self.aggregator.closed_total,
+            "late_dropped": self.aggregator.late_dropped_total,
+            "watermark": self.aggregator.current_watermark(),
+            "executor": self.executor.mode,
+            "dedupe": {
+                "producer": self.producer.dedupe.stats(),
+                "enricher": self.enricher.dedupe.stats(),
+            },
+            "partitions": {
+                "enricher": self._partition_report(
+                    self.enricher.group, "orders", self.enricher.partition_stats
+                ),
+                "aggregator": self._partition_report(
+                    self.aggregator.group, "orders-enriched", self.aggregator.partition_stats
+                ),
+            },
         }
 
+    def _partition_report(
+        self, group: str, topic: str, stats: dict[int, PartitionStats]
+    ) -> dict[str, dict[str, Any]]:
+        return {
+            str(p): {**stats.get(p, PartitionStats()).to_dict(), "lag": lag}
+            for p, lag in self.broker.partition_lag(group, topic).items()
+        }
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.broker.close()
+        for store in (self.producer.dedupe, self.enricher.dedupe):
+            if isinstance(store, SqliteDedupeStore):
+                store.close()
+
     def list_metrics(self) -> list[dict[str, Any]]:
+        """Open (still updating) windows."""
         return [m.to_dict() for m in self.aggregator.windows.values()]
+
+    def closed_metrics(self, limit: int = 100) -> list[dict[str, Any]]:
+        """Most recent final window records emitted to ``order-metrics``."""
+        records = [
+            record["value"]
+            for partition in self.broker.peek(self.aggregator.metrics_topic, limit).values()
+            for record in partition
+        ]
+        return sorted(records, key=lambda m: (m["window_end"], m["region"]))[-limit:]
@@ -9,7 +9,8 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
-from src.broker import InMemoryBroker
+from src.broker import InMemoryBroker, MmapPartitionLog, PartitionLog, murmur2
+from src.dedupe import SqliteDedupeStore, WindowedDedupeStore, make_dedupe_store
 from src.models import Order
 from src.service import (
     DLTHandler,
@@ -32,12 +33,171 @@ def test_producer_partition_routing(stack: StreamStack) -> None:
     assert len(stack.broker.topics["orders"][partition]) == 2
 
 
+def test_murmur2_partitioner_matches_kafka() -> None:
+    # Reference values from Kafka's Utils.murmur2 (signed 32-bit).
+    assert murmur2(b"21") == -973932308 & 0xFFFFFFFF
+    assert murmur2(b"foobar") == -790332482 & 0xFFFFFFFF
+    broker = InMemoryBroker(partitions=12)
+    assert broker.partition_count("orders") == 12
+    assert broker.partition_for("cust-1") == (murmur2(b"cust-1") & 0x7FFFFFFF) % 12
+
+
+def test_partition_log_segments_fetch_and_retention() -> None:
+    log = PartitionLog(segment_records=3)
+    for i in range(10):
+        assert log.append(f"k{i}", {"i": i}) == i
+    assert log.segment_count == 4
+    batch = log.fetch(2, max_records=5)
+    assert [r.offset for r in batch] == [2, 3, 4, 5, 6]
+    assert log.fetch(10) == []
+    assert log.truncate_before(7) == 6
+    assert log.fetch(0, max_records=2)[0].offset == 6
+    assert len(log) == 4
+
+
+def test_consumer_groups_track_independent_offsets(stack: StreamStack) -> None:
+    for i in range(3):
+        stack.create_order("c1", 10.0, "eu", order_id=f"o{i}")
+    p = stack.broker.partition_for("c1")
+    assert len(stack.broker.consume("orders", p, limit=2, group="a")) == 2
+    assert len(stack.broker.consume("orders", p, group="b")) == 3
+    assert stack.broker.committed("a", "orders", p) == 2
+    assert stack.broker.lag("a", "orders") == 1
+    stack.broker.seek("b", "orders", 0)
+    assert [v["order_id"] for v in stack.broker.consume("orders", p, group="b")] == [
+        "o0",
+        "o1",
+        "o2",
+    ]
+    assert stack.enricher.run_once()["enriched"] == 3
+    assert stack.stats()["enricher_lag"] == 0
+
+
+def test_mmap_log_persists_and_fetches_views(tmp_path: Path) -> None:
+    broker = InMemoryBroker(2, log_dir=tmp_path, segment_records=2)
+    for i in range(5):
+        broker.produce("orders", "c1", {"order_id": f"o{i}"})
+    p = broker.partition_for("c1", 2)
+    log = broker.topics["orders"][p]
+    assert isinstance(log, MmapPartitionLog)
+    offset, key, value = log.fetch_raw(3, max_records=1)[0]
+    assert (offset, bytes(key)) == (3, b"c1")
+    assert isinstance(value, memoryview)
+    broker.close()
+
+    reopened = InMemoryBroker(2, log_dir=tmp_path, segment_records=2)
+    records = reopened.fetch("orders", p, 1, max_records=10)
+    assert [r.value["order_id"] for r in records] == ["o1", "o2", "o3", "o4"]
+    assert reopened.produce("orders", "c1", {"order_id": "o5"}) == p
+    assert reopened.topics["orders"][p].end_offset == 6
+    reopened.close()
+
+
+@pytest.mark.parametrize("mode", ["serial", "thread", "process"])
+def test_parallel_partition_consumers_keep_per_key_order(mode: str) -> None:
+    stack = StreamStack(partitions=4, executor_mode=mode)
+    try:
+        for i in range(40):
+            stack.create_order(f"c{i % 5}", 1.0, "us", order_id=f"o{i:02d}")
+        stack.inject_poison()
+        assert stack.enricher.run_once() == {"enriched": 40, "dlt_routed": 1, "duplicates": 0}
+        assert stack.aggregator.run_once(flush=True)["metrics_emitted"] >= 1
+        for customer in range(5):
+            p = stack.broker.partition_for(f"c{customer}")
+            ids = [
+                r.value["order_id"]
+                for r in stack.broker.fetch("orders-enriched", p, 0)
+                if r.key == f"c{customer}"
+            ]
+            assert ids == sorted(ids)
+        report = stack.stats()["partitions"]
+        assert sum(p["records"] for p in report["enricher"].values()) == 41
+        assert all(p["lag"] == 0 for p in report["aggregator"].values())
+        assert sum(m["count"] for m in stack.closed_metrics()) == 40
+    finally:
+        stack.close()
+
+
 def test_consumer_at_least_once(stack: StreamStack) -> None:
     stack.create_order("c1", 10.0, "eu", order_id="o1")
     assert stack.enricher.run_once()["enriched"] == 1
     assert stack.enricher.run_once()["enriched"] == 0
 
 
+def test_windowed_dedupe_store_is_bounded_and_expires() -> None:
+    now = [0.0]
+    store = WindowedDedupeStore(
+        window_sec=60, capacity=1_000, fp_rate=0.01, lru_size=100, clock=lambda: now[0]
+    )
+    assert not store.check_and_add("o1")
+    assert store.check_and_add("o1")
+    for i in range(20_000):
+        store.check_and_add(f"k{i}")
+    stats = store.stats()
+    assert stats["lru_keys"] == 100
+    assert stats["rotations"] >= 19
+    assert stats["memory_bytes"] < 64_000
+    assert stats["estimated_fp_rate"] < 0.05
+    now[0] = 30.0
+    assert not store.check_and_add("k19500")  # out of the LRU, still in a filter: let through
+    assert store.stats()["probable_hits"] >= 1
+    assert store.stats()["possible_drops"] == 0
+    now[0] = 200.0  # idle for two windows: both generations expire
+    assert not store.check_and_add("o1")
+
+
+def test_windowed_dedupe_store_drop_probable_reports_possible_drops() -> None:
+    store = WindowedDedupeStore(capacity=1_000, lru_size=10, drop_probable=True)
+    for i in range(100):
+        store.check_and_add(f"k{i}")
+    assert store.check_and_add("k0")  # Bloom-only hit, dropped
+    stats = store.stats()
+    assert stats["probable_hits"] == stats["possible_drops"] >= 1
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_failed_produce_is_not_recorded_as_duplicate(backend: str) -> None:
+    broker = InMemoryBroker()
+    producer = OrderProducer(broker, dedupe=make_dedupe_store(backend))
+    order = Order(order_id="o1", customer_id="c1", amount=5.0, region="eu")
+    real_produce = broker.produce
+
+    def failing_produce(*args, **kwargs):
+        raise ConnectionError("broker unavailable")
+
+    broker.produce = failing_produce
+    with pytest.raises(ConnectionError):
+        producer.produce(order)
+    broker.produce = real_produce
+    assert producer.produce(order)["status"] == "produced"
+    assert producer.produce(order)["status"] == "duplicate_skipped"
+
+
+def test_sqlite_dedupe_store_persists_within_window(tmp_path: Path) -> None:
+    now = [0.0]
+    path = tmp_path / "dedupe.db"
+    store = SqliteDedupeStore(path, window_sec=60, clock=lambda: now[0])
+    assert not store.check_and_add("o1")
+    store.close()
+    reopened = SqliteDedupeStore(path, window_sec=60, clock=lambda: now[0])
+    assert reopened.check_and_add("o1")
+    now[0] = 61.0
+    assert not reopened.check_and_add("o1")
+    assert reopened.stats()["keys"] == 1
+    reopened.close()
+
+
+def test_stack_dedupe_stats(tmp_path: Path) -> None:
+    stack = StreamStack(executor_mode="serial", dedupe_backend="sqlite", dedupe_dir=str(tmp_path))
+    stack.create_order("c1", 1.0, "us", order_id="o1")
+    assert stack.create_order("c1", 1.0, "us", order_id="o1")["status"] == "duplicate_skipped"
+    stack.enricher.run_once()
+    dedupe = stack.stats()["dedupe"]
+    assert dedupe["producer"]["exact_hits"] == 1
+    assert dedupe["enricher"]["keys"] == 1
+    stack.close()
+
+
 def test_windowed_aggregate(stack: StreamStack) -> None:
     import time
 
@@ -50,6 +210,57 @@ def test_windowed_aggregate(stack: StreamStack) -> None:
     assert agg.windows[(m.window_start, "us")].count == 2
 
 
+def _feed(agg: WindowAggregator, *events: tuple[float, float]) -> dict:
+    for event_time, amount in events:
+        event = {"event_time": event_time, "region": "us", "amount": amount}
+        agg.broker.produce("orders-enriched", "c1", event)
+    return agg.run_once()
+
+
+def test_watermark_closes_windows_once_and_drops_late_events() -> None:
+    agg = WindowAggregator(InMemoryBroker(), max_out_of_orderness_sec=5)
+    result = _feed(agg, (10, 1.0), (50, 2.0), (62, 4.0))
+    assert result["metrics_emitted"] == 0  # watermark 57 < window end 60
+    result = _feed(agg, (70, 8.0))
+    assert result["metrics_emitted"] == 1 and result["watermark"] == 65
+    assert list(agg.windows) == [(60, "us")]  # closed window evicted
+    closed = agg.broker.fetch("order-metrics", agg.broker.partition_for("0"), 0)
+    assert [r.value["count"] for r in closed] == [2]
+    assert _feed(agg, (30, 16.0))["late_dropped"] == 1
+    assert agg.windows[(60, "us")].revenue == 12.0
+
+
+def test_allowed_lateness_keeps_window_open() -> None:
+    agg = WindowAggregator(InMemoryBroker(), max_out_of_orderness_sec=0, allowed_lateness_sec=10)
+    assert _feed(agg, (10, 1.0), (65, 1.0))["metrics_emitted"] == 0
+    assert _feed(agg, (59, 1.0))["late_dropped"] == 0
+    assert agg.windows[(0, "us")].count == 2
+    assert _feed(agg, (75, 1.0))["metrics_emitted"] == 1
+
+
+def test_flush_with_allowed_lateness_makes_windows_final() -> None:
+    agg = WindowAggregator(InMemoryBroker(), max_out_of_orderness_sec=0, allowed_lateness_sec=30)
+    agg.broker.produce("orders-enriched", "c1", {"event_time": 70, "region": "us", "amount": 1.0})
+    assert agg.run_once(flush=True)["metrics_emitted"] == 1
+    agg.broker.produce("orders-enriched", "c1", {"event_time": 110, "region": "us", "amount": 2.0})
+    result = agg.run_once(flush=True)
+    assert result["late_dropped"] == 1 and result["metrics_emitted"] == 0
+    records = agg.broker.fetch("order-metrics", agg.broker.partition_for("60"), 0)
+    assert [(r.value["count"], r.value["revenue"]) for r in records] == [(1, 1.0)]
+
+
+def test_sliding_and_session_windows() -> None:
+    sliding = WindowAggregator(InMemoryBroker(), 60, window_type="sliding", slide_sec=30)
+    sliding.aggregate({"event_time": 45, "region": "us", "amount": 1.0})
+    assert sorted(sliding.windows) == [(0, "us"), (30, "us")]
+
+    session = WindowAggregator(InMemoryBroker(), window_type="session", session_gap_sec=10)
+    for t in (0, 5, 24, 14.5):  # 14.5 bridges [0, 15) and [24, 34)
+        session.aggregate({"event_time": t, "region": "us", "amount": 1.0})
+    (merged,) = session.windows.values()
+    assert (merged.window_start, merged.window_end, merged.count) == (0, 34, 4)
+
+
 def test_dlt_on_poison_message(stack: StreamStack) -> None:
     stack.inject_poison()
     stack.enricher.run_once()
@@ -79,8 +290,18 @@ def test_http_pipeline(stack: StreamStack) -> None:
     assert resp.status_code == 201
     assert resp.json()["status"] == "produced"
     assert client.post("/v1/enricher/run").json()["enriched"] == 1
-    assert client.post("/v1/aggregator/run").json()["metrics_emitted"] == 1
+    assert client.post("/v1/aggregator/run").json()["metrics_emitted"] == 0
+    assert client.post("/v1/aggregator/run?flush=true").json()["metrics_emitted"] == 1
+    assert client.get("/v1/metrics").json()["closed"][0]["count"] == 1
     assert client.get("/health").status_code == 200
+    partition = stack.broker.partition_for("cust-99")
+    fetched = client.get(f"/v1/topics/orders/partitions/{partition}?offset=0").json()
+    assert fetched["end_offset"] == 1
+    assert fetched["records"][0]["value"]["customer_id"] == "cust-99"
+    lag = client.get("/v1/groups/enricher").json()["topics"]["orders"]["lag"]
+    assert lag == 0
+    client.post("/v1/groups/enricher/seek", json={"topic": "orders", "offset": 0})
+    assert stack.stats()["enricher_lag"] == 1
 
 
 def test_swagger_docs(stack: StreamStack) -> None:
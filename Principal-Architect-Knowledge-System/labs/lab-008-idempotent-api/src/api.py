@@ -68,10 +68,7 @@ def create_app(service: PaymentService) -> FastAPI:
 
     @app.get("/health")
     def health() -> dict[str, Any]:
-        return {
-            "status": "ok",
-            "ledger_entries": service.ledger_count(),
-        }
+        return {"status": "ok", **service.stats()}
 
     @app.post("/v1/payments")
     def create_payment(
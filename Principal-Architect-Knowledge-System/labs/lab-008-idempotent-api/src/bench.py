@@ -0,0 +1,83 @@
+"""Benchmarks — ``create_payment`` throughput vs thread count, and expiry under churn."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from .service import IdempotencyStore, PaymentService
+
+
+def _run_threads(service: PaymentService, threads: int, requests: int, replay_every: int) -> float:
+    per_thread = requests // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_id: int) -> None:
+        body = {"amount": 10.0, "currency": "USD"}
+        barrier.wait()
+        for i in range(per_thread):
+            # Every ``replay_every``-th request retries the previous key (a replay hit).
+            n = i - 1 if replay_every and i % replay_every == 0 and i else i
+            service.create_payment(f"tenant-{n % 50}", f"w{worker_id}-{n}", body)
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started
+
+
+def benchmark_threads(
+    thread_counts: tuple[int, ...] = (1, 2, 4, 8, 16),
+    requests: int = 40_000,
+    replay_every: int = 5,
+    stripes: tuple[int, ...] = (1, 64),
+) -> list[dict[str, Any]]:
+    """Payments/sec per thread count; ``stripes=1`` is the old single-lock layout."""
+    rows = []
+    for stripe_count in stripes:
+        for threads in thread_counts:
+            service = PaymentService(IdempotencyStore(stripes=stripe_count))
+            elapsed = _run_threads(service, threads, requests, replay_every)
+            total = requests // threads * threads
+            rows.append(
+                {
+                    "stripes": stripe_count,
+                    "threads": threads,
+                    "requests": total,
+                    "payments": service.ledger_count(),
+                    "requests_per_sec": round(total / elapsed),
+                }
+            )
+    return rows
+
+
+def benchmark_expiry(
+    keys: int = 200_000, ttl_seconds: float = 60.0, rate: int = 1_000
+) -> dict[str, Any]:
+    """Churn ``keys`` unique keys at ``rate``/s of simulated time; memory stays ~rate × TTL."""
+    now = [0.0]
+    store = IdempotencyStore(ttl_seconds=ttl_seconds, clock=lambda: now[0])
+    service = PaymentService(store)
+    peak = 0
+    body = {"amount": 1.0, "currency": "USD"}
+    for i in range(keys):
+        now[0] = i / rate
+        service.create_payment("t", f"k{i}", body)
+        if i % 1000 == 0:
+            peak = max(peak, len(store))
+    now[0] += ttl_seconds + 1
+    purged = store.purge_expired()
+    return {
+        "keys_written": keys,
+        "ttl_seconds": ttl_seconds,
+        "write_rate_per_sec": rate,
+        "peak_records": peak,
+        "expected_live": int(rate * ttl_seconds),
+        "purged_after_idle": purged,
+        **{k: v for k, v in store.stats().items() if k in ("records", "expired_total")},
+    }
@@ -0,0 +1,79 @@
+"""Per-key request coalescing (single-flight) for concurrent duplicate requests.
+
+The same file ships in lab-008 and lab-017 so each lab stays self-contained; change both.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class RequestCoalescer(Generic[K, T]):
+    """The first caller for a key runs; concurrent callers wait on its future.
+
+    ``do`` registers a ``Future`` for the key before running ``fn``; callers that arrive
+    while it is registered block on ``future.result(timeout)`` and get the leader's
+    result (or its exception) without running ``fn`` themselves. The future is removed
+    once the leader finishes, so later callers start a fresh execution — caching the
+    result across time is the idempotency store's job, not this one. Only coalesces
+    within one process; other processes still see the store's in-flight record.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[K, Future[T]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: K, fn: Callable[[], T], timeout: float) -> tuple[T, bool]:
+        """Run ``fn`` once per concurrent burst on ``key``; returns (result, shared).
+
+        ``shared`` is True for followers. Raises ``TimeoutError`` if a follower waited
+        ``timeout`` seconds without the leader finishing.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return future.result(timeout), True
+            except FutureTimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"in-flight request for {key!r} still running") from None
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "wait_timeouts": self.timeouts,
+        }
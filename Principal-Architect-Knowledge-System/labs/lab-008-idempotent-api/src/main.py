@@ -4,8 +4,10 @@
 from __future__ import annotations
 
 import argparse
+import json
 
 from .api import create_app
+from .bench import benchmark_expiry, benchmark_threads
 from .service import PaymentService
 
 
@@ -14,9 +16,26 @@ def main() -> int:
     parser.add_argument("--serve", action="store_true", help="Start API on :8081")
     parser.add_argument("--demo", action="store_true", help="Run idempotency retry demo")
     parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--bench", action="store_true", help="create_payment throughput vs threads + expiry"
+    )
+    parser.add_argument(
+        "--wait-for-in-flight",
+        action="store_true",
+        help="Duplicates wait for the in-flight request's result instead of getting 409",
+    )
+    parser.add_argument("--wait-timeout", type=float, default=5.0, help="Seconds to wait")
     args = parser.parse_args()
 
-    service = PaymentService()
+    if args.bench:
+        for row in benchmark_threads():
+            print(json.dumps(row))
+        print(json.dumps(benchmark_expiry()))
+        return 0
+
+    service = PaymentService(
+        wait_for_in_flight=args.wait_for_in_flight, wait_timeout=args.wait_timeout
+    )
 
     if args.demo:
         body = {"amount": 49.99, "currency": "USD"}
@@ -2,14 +2,19 @@
 
 from __future__ import annotations
 
+import copy
 import hashlib
 import json
 import threading
 import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any
 
+from .coalesce import RequestCoalescer
+from .timing_wheel import ExpiringKeySet, TimingWheel
+
 
 class PaymentState(Enum):
     PENDING = "pending"
@@ -49,32 +54,152 @@ def request_hash(body: dict[str, Any]) -> str:
     return hashlib.sha256(payload.encode()).hexdigest()
 
 
+class _Stripe:
+    __slots__ = ("lock", "records", "wheel")
+
+    def __init__(self, tick_seconds: float, now: float) -> None:
+        self.lock = threading.Lock()
+        self.records: dict[tuple[str, str], IdempotencyRecord] = {}  # insertion-ordered
+        self.wheel: TimingWheel[tuple[str, str]] = TimingWheel(tick_seconds, start=now)
+
+
 class IdempotencyStore:
-    def __init__(self, ttl_seconds: float = 86400) -> None:
-        self._records: dict[tuple[str, str], IdempotencyRecord] = {}
-        self._lock = threading.Lock()
+    """Lock-striped idempotency records with timing-wheel expiry and a memory bound.
+
+    Keys hash onto ``stripes`` independent dicts, each with its own lock, so requests
+    for different keys rarely contend. Every save schedules the record's
+    ``expires_at`` on the stripe's timing wheel; each access advances that wheel and
+    drops what has expired, so expired keys leave memory without being re-read
+    (``purge_expired`` sweeps all stripes for idle periods). Past ``max_records`` the
+    oldest completed record in the stripe is evicted and counted in ``evicted_total``
+    — size the bound above peak keys-per-TTL, since an evicted key can be replayed.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 86400,
+        stripes: int = 64,
+        max_records: int = 1_000_000,
+        tick_seconds: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if stripes < 1 or max_records < stripes:
+            raise ValueError("stripes must be >= 1 and max_records >= stripes")
         self.ttl_seconds = ttl_seconds
+        self.max_records = max_records
+        self.clock = clock
+        now = clock()
+        self._stripes = [_Stripe(tick_seconds, now) for _ in range(stripes)]
+        self._stripe_capacity = -(-max_records // stripes)
+        self.expired_total = 0
+        self.evicted_total = 0
+
+    def _stripe(self, tenant_id: str, key: str) -> _Stripe:
+        return self._stripes[hash((tenant_id, key)) % len(self._stripes)]
+
+    def _expire(self, stripe: _Stripe, now: float) -> None:
+        for record_key in stripe.wheel.advance(now):
+            record = stripe.records.get(record_key)
+            # Lazy cancel: a record re-saved with a later expiry outlives its old entry.
+            if record is not None and record.expires_at <= now:
+                del stripe.records[record_key]
+                self.expired_total += 1
+
+    def _insert(self, stripe: _Stripe, record: IdempotencyRecord) -> None:
+        record_key = (record.tenant_id, record.key)
+        if record_key not in stripe.records and len(stripe.records) >= self._stripe_capacity:
+            victim = next(
+                (k for k, r in stripe.records.items() if r.status != IdempotencyStatus.IN_FLIGHT),
+                None,
+            )
+            if victim is not None:
+                del stripe.records[victim]
+                self.evicted_total += 1
+        stripe.records[record_key] = record
+        stripe.wheel.schedule(record_key, record.expires_at)
 
     def lookup(self, tenant_id: str, key: str) -> IdempotencyRecord | None:
-        with self._lock:
-            record = self._records.get((tenant_id, key))
-            if record and record.expires_at < time.time():
-                del self._records[(tenant_id, key)]
+        stripe = self._stripe(tenant_id, key)
+        now = self.clock()
+        with stripe.lock:
+            self._expire(stripe, now)
+            record = stripe.records.get((tenant_id, key))
+            if record and record.expires_at < now:
+                del stripe.records[(tenant_id, key)]
                 return None
             return record
 
     def save(self, record: IdempotencyRecord) -> None:
-        with self._lock:
-            self._records[(record.tenant_id, record.key)] = record
+        stripe = self._stripe(record.tenant_id, record.key)
+        now = self.clock()
+        with stripe.lock:
+            self._expire(stripe, now)
+            self._insert(stripe, record)
+
+    def claim(self, record: IdempotencyRecord) -> IdempotencyRecord | None:
+        """Atomically save ``record`` unless a live record holds its key; return that one."""
+        stripe = self._stripe(record.tenant_id, record.key)
+        now = self.clock()
+        with stripe.lock:
+            self._expire(stripe, now)
+            existing = stripe.records.get((record.tenant_id, record.key))
+            if existing is not None and existing.expires_at >= now:
+                return existing
+            self._insert(stripe, record)
+            return None
+
+    def purge_expired(self) -> int:
+        before = self.expired_total
+        now = self.clock()
+        for stripe in self._stripes:
+            with stripe.lock:
+                self._expire(stripe, now)
+        return self.expired_total - before
+
+    def __len__(self) -> int:
+        return sum(len(stripe.records) for stripe in self._stripes)
+
+    def stats(self) -> dict[str, Any]:
+        sizes = [len(stripe.records) for stripe in self._stripes]
+        return {
+            "records": sum(sizes),
+            "max_records": self.max_records,
+            "stripes": len(self._stripes),
+            "largest_stripe": max(sizes),
+            "scheduled_expiries": sum(stripe.wheel.size for stripe in self._stripes),
+            "expired_total": self.expired_total,
+            "evicted_total": self.evicted_total,
+            "ttl_seconds": self.ttl_seconds,
+        }
 
 
 class PaymentService:
-    def __init__(self, store: IdempotencyStore | None = None) -> None:
-        self.store = store or IdempotencyStore()
+    """Idempotent payment handler.
+
+    By default a duplicate that arrives while the first request is still executing gets
+    ``409 request in flight``. With ``wait_for_in_flight`` it instead waits up to
+    ``wait_timeout`` seconds on the first request's result (``RequestCoalescer``) and is
+    served that response, so a burst of retries costs one execution and no retry storm.
+    """
+
+    def __init__(
+        self,
+        store: IdempotencyStore | None = None,
+        webhook_dedup: ExpiringKeySet | None = None,
+        *,
+        wait_for_in_flight: bool = False,
+        wait_timeout: float = 5.0,
+    ) -> None:
+        self.store = store if store is not None else IdempotencyStore()
+        self.wait_timeout = wait_timeout
+        self.coalescer: RequestCoalescer[tuple[str, str], tuple[str, int, dict[str, Any]]] | None
+        self.coalescer = RequestCoalescer() if wait_for_in_flight else None
         self.ledger: list[Payment] = []
         self._lock = threading.Lock()
         self._counter = 0
-        self.webhook_dedup: set[str] = set()
+        if webhook_dedup is None:
+            webhook_dedup = ExpiringKeySet(clock=self.store.clock)
+        self.webhook_dedup = webhook_dedup
 
     def create_payment(
         self,
@@ -103,7 +228,44 @@ class PaymentService:
             return 400, {"error": "currency must be a 3-letter ISO code (e.g. USD)"}
 
         body_hash = request_hash(body)
-        existing = self.store.lookup(tenant_id, idempotency_key)
+        if self.coalescer is None:
+            return self._execute(tenant_id, idempotency_key, body_hash, amount, currency)
+        try:
+            (leader_hash, status, payload), shared = self.coalescer.do(
+                (tenant_id, idempotency_key),
+                lambda: (
+                    body_hash,
+                    *self._execute(tenant_id, idempotency_key, body_hash, amount, currency),
+                ),
+                self.wait_timeout,
+            )
+        except TimeoutError:
+            return 409, {"error": "request in flight", "waited_seconds": self.wait_timeout}
+        if not shared:
+            return status, payload
+        if leader_hash != body_hash:
+            return 409, {"error": "idempotency key reused with different body"}
+        return status, copy.deepcopy(payload)
+
+    def _execute(
+        self,
+        tenant_id: str,
+        idempotency_key: str,
+        body_hash: str,
+        amount: float,
+        currency: str,
+    ) -> tuple[int, dict[str, Any]]:
+        now = self.store.clock()
+        in_flight = IdempotencyRecord(
+            tenant_id,
+            idempotency_key,
+            body_hash,
+            IdempotencyStatus.IN_FLIGHT,
+            created_at=now,
+            expires_at=now + self.store.ttl_seconds,
+        )
+        # Lookup and claim in one step so two racing requests can't both execute.
+        existing = self.store.claim(in_flight)
         if existing:
             if existing.request_hash != body_hash:
                 return 409, {"error": "idempotency key reused with different body"}
@@ -111,11 +273,6 @@ class PaymentService:
                 return 409, {"error": "request in flight"}
             return existing.response_status, json.loads(existing.response_body)
 
-        in_flight = IdempotencyRecord(
-            tenant_id, idempotency_key, body_hash, IdempotencyStatus.IN_FLIGHT
-        )
-        self.store.save(in_flight)
-
         with self._lock:
             self._counter += 1
             payment = Payment(
@@ -142,15 +299,22 @@ class PaymentService:
                 IdempotencyStatus.COMPLETED,
                 201,
                 encoded,
+                created_at=now,
+                expires_at=self.store.clock() + self.store.ttl_seconds,
             )
         )
         return 201, response
 
     def handle_webhook(self, event_id: str, payload: dict[str, Any]) -> bool:
-        if event_id in self.webhook_dedup:
-            return False
-        self.webhook_dedup.add(event_id)
-        return True
+        return self.webhook_dedup.add(event_id)
 
     def ledger_count(self) -> int:
         return len(self.ledger)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ledger_entries": self.ledger_count(),
+            "idempotency_store": self.store.stats(),
+            "webhook_dedup": self.webhook_dedup.stats(),
+            "in_flight_wait": self.coalescer.stats() if self.coalescer is not None else None,
+        }
@@ -0,0 +1,151 @@
+"""Hierarchical timing wheel — O(1) expiry scheduling for idempotency keys."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimingWheel(Generic[K]):
+    """``levels`` wheels of ``slots`` buckets; level ``l`` buckets span ``slots**l`` ticks.
+
+    ``schedule`` drops an item into the coarsest-needed bucket in O(1). ``advance``
+    walks tick by tick: when a level wraps, the next bucket of the level above is
+    cascaded down, so each item is touched at most ``levels`` times before it fires.
+    Items beyond the wheel's horizon wait in an overflow list. Cancellation is lazy:
+    callers re-check the item when it fires. Not thread-safe; the owner locks.
+    """
+
+    def __init__(
+        self, tick_seconds: float = 1.0, slots: int = 64, levels: int = 4, start: float = 0.0
+    ) -> None:
+        if tick_seconds <= 0 or slots < 2 or levels < 1:
+            raise ValueError("tick_seconds must be > 0, slots >= 2, levels >= 1")
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots**level for level in range(levels + 1)]
+        self._wheels: list[list[list[tuple[int, K]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: list[tuple[int, K]] = []
+        self._due: list[K] = []
+        self._current = int(start / tick_seconds)
+        self.size = 0
+
+    @property
+    def horizon_seconds(self) -> float:
+        return self._spans[self.levels] * self.tick_seconds
+
+    def _place(self, tick: int, item: K) -> None:
+        delta = tick - self._current
+        if delta <= 0:
+            self._due.append(item)
+            return
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                slot = (tick // self._spans[level]) % self.slots
+                self._wheels[level][slot].append((tick, item))
+                return
+        self._overflow.append((tick, item))
+
+    def schedule(self, item: K, expires_at: float) -> None:
+        # Round up so an item never fires before its deadline.
+        tick = -int(-expires_at // self.tick_seconds)
+        self._place(tick, item)
+        self.size += 1
+
+    def advance(self, now: float) -> list[K]:
+        """Move the wheel to ``now``; return every item whose deadline has passed."""
+        target = int(now // self.tick_seconds)
+        fired, self._due = self._due, []
+        if self.size == len(fired):
+            self._current = max(self._current, target)  # nothing else pending: jump
+        while self._current < target:
+            self._current += 1
+            current = self._current
+            if current % self._spans[self.levels] == 0 and self._overflow:
+                pending, self._overflow = self._overflow, []
+                for tick, item in pending:
+                    self._place(tick, item)
+            for level in range(self.levels - 1, 0, -1):
+                if current % self._spans[level] == 0:
+                    slot = (current // self._spans[level]) % self.slots
+                    bucket, self._wheels[level][slot] = self._wheels[level][slot], []
+                    for tick, item in bucket:
+                        self._place(tick, item)
+            wheel = self._wheels[0]
+            bucket, wheel[current % self.slots] = wheel[current % self.slots], []
+            fired.extend(item for _, item in bucket)
+            fired.extend(self._due)
+            self._due = []
+            if self.size == len(fired):
+                self._current = max(self._current, target)
+        self.size -= len(fired)
+        return fired
+
+
+class ExpiringKeySet:
+    """Bounded set of recently seen keys, each forgotten ``ttl_seconds`` after insertion.
+
+    Used for webhook ``event_id`` dedupe: expiry runs off a timing wheel and, past
+    ``max_keys``, the oldest keys are evicted first (counted in ``evicted_total``).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3 * 86400,
+        max_keys: int = 1_000_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._keys: OrderedDict[str, float] = OrderedDict()  # key -> expires_at
+        self._wheel: TimingWheel[str] = TimingWheel(start=clock())
+        self._lock = threading.Lock()
+        self.expired_total = 0
+        self.evicted_total = 0
+
+    def _expire(self, now: float) -> None:
+        for key in self._wheel.advance(now):
+            expires_at = self._keys.get(key)
+            if expires_at is not None and expires_at <= now:
+                del self._keys[key]
+                self.expired_total += 1
+
+    def add(self, key: str) -> bool:
+        """Insert ``key``; False if it was already present (a duplicate)."""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            if key in self._keys:
+                return False
+            while len(self._keys) >= self.max_keys:
+                self._keys.popitem(last=False)
+                self.evicted_total += 1
+            self._keys[key] = now + self.ttl_seconds
+            self._wheel.schedule(key, now + self.ttl_seconds)
+            return True
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            self._expire(self._clock())
+            return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "ttl_seconds": self.ttl_seconds,
+            "expired_total": self.expired_total,
+            "evicted_total": self.evicted_total,
+        }
@@ -14,6 +14,7 @@ LAB_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(LAB_ROOT))
 
 from src.api import create_app  # noqa: E402
+from src.bench import benchmark_threads  # noqa: E402
 from src.service import (  # noqa: E402
     IdempotencyRecord,
     IdempotencyStatus,
@@ -21,6 +22,15 @@ from src.service import (  # noqa: E402
     PaymentService,
     request_hash,
 )
+from src.timing_wheel import ExpiringKeySet, TimingWheel  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
 
 
 @pytest.fixture()
@@ -131,3 +141,131 @@ def test_api_webhook_endpoint(service: PaymentService) -> None:
     event = {"event_id": "evt-99", "type": "payment.completed"}
     assert client.post("/v1/webhooks", json=event).json()["processed"] is True
     assert client.post("/v1/webhooks", json=event).json()["duplicate"] is True
+
+
+def test_timing_wheel_fires_on_deadline_never_early() -> None:
+    wheel: TimingWheel[int] = TimingWheel(tick_seconds=1.0, slots=4, levels=3)
+    deadlines = {i: (i * 7.3) % 200 for i in range(300)}
+    for item, deadline in deadlines.items():
+        wheel.schedule(item, deadline)
+    fired_at: dict[int, float] = {}
+    now = 0.0
+    while now < 250:
+        now += 0.5
+        for item in wheel.advance(now):
+            fired_at[item] = now
+    assert fired_at.keys() == deadlines.keys()
+    assert all(deadlines[i] <= t < deadlines[i] + 1.5 for i, t in fired_at.items())
+    assert wheel.size == 0
+
+
+def test_expired_records_leave_memory_without_reads() -> None:
+    clock = FakeClock()
+    store = IdempotencyStore(ttl_seconds=60, stripes=8, clock=clock)
+    service = PaymentService(store)
+    for i in range(100):
+        service.create_payment("t1", f"k{i}", {"amount": 1, "currency": "USD"})
+    assert len(store) == 100
+    clock.now += 61
+    assert store.purge_expired() == 100
+    assert len(store) == 0
+    assert store.stats()["expired_total"] == 100
+
+
+def test_store_is_bounded_and_evicts_oldest_completed() -> None:
+    store = IdempotencyStore(stripes=1, max_records=10)
+    for i in range(15):
+        store.save(IdempotencyRecord("t1", f"k{i}", "h", IdempotencyStatus.COMPLETED, 201, b"{}"))
+    assert len(store) == 10
+    assert store.evicted_total == 5
+    assert store.lookup("t1", "k0") is None
+    assert store.lookup("t1", "k14") is not None
+
+
+def test_claim_is_atomic_insert_if_absent() -> None:
+    store = IdempotencyStore()
+    first = IdempotencyRecord("t1", "k1", "h1", IdempotencyStatus.IN_FLIGHT)
+    assert store.claim(first) is None
+    second = IdempotencyRecord("t1", "k1", "h2", IdempotencyStatus.IN_FLIGHT)
+    assert store.claim(second) is first
+
+
+def test_webhook_dedup_is_bounded_and_expires() -> None:
+    clock = FakeClock()
+    dedup = ExpiringKeySet(ttl_seconds=10, max_keys=3, clock=clock)
+    service = PaymentService(IdempotencyStore(clock=clock), webhook_dedup=dedup)
+    assert service.handle_webhook("evt-1", {}) is True
+    assert service.handle_webhook("evt-1", {}) is False
+    clock.now += 11
+    assert service.handle_webhook("evt-1", {}) is True
+    for i in range(2, 6):
+        service.handle_webhook(f"evt-{i}", {})
+    assert len(dedup) == 3
+    assert dedup.stats()["evicted_total"] == 2
+
+
+def test_thread_benchmark_one_payment_per_key() -> None:
+    rows = benchmark_threads(thread_counts=(1, 4), requests=400, replay_every=4, stripes=(8,))
+    assert [row["threads"] for row in rows] == [1, 4]
+    # Every 4th request per thread replays the previous key and must not charge again.
+    assert [row["payments"] for row in rows] == [400 - 99, 4 * (100 - 24)]
+
+
+def test_api_health_reports_store_metrics(service: PaymentService) -> None:
+    client = TestClient(create_app(service))
+    client.post(
+        "/v1/payments",
+        json={"amount": 5.0, "currency": "USD"},
+        headers={"Idempotency-Key": "m-1", "X-Tenant-Id": "demo"},
+    )
+    store = client.get("/health").json()["idempotency_store"]
+    assert store["records"] == 1 and store["stripes"] == 64
+
+
+class SlowStore(IdempotencyStore):
+    """Holds the leader inside its execution so duplicates arrive while it is in flight."""
+
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+
+    def save(self, record: IdempotencyRecord) -> None:
+        time.sleep(self.delay)
+        super().save(record)
+
+
+def _race(service: PaymentService, key: str, bodies: list[dict]) -> list[tuple[int, dict]]:
+    results: list[tuple[int, dict]] = []
+    threads = [
+        threading.Thread(target=lambda b=b: results.append(service.create_payment("t1", key, b)))
+        for b in bodies
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_wait_for_in_flight_serves_leader_result() -> None:
+    service = PaymentService(SlowStore(0.2), wait_for_in_flight=True)
+    results = _race(service, "burst", [{"amount": 5, "currency": "USD"}] * 8)
+    assert [status for status, _ in results] == [201] * 8
+    assert len({body["payment_id"] for _, body in results}) == 1
+    assert service.ledger_count() == 1
+    wait = service.stats()["in_flight_wait"]
+    assert wait["leaders"] == 1 and wait["coalesced"] == 7 and wait["in_flight"] == 0
+
+
+def test_wait_for_in_flight_times_out_and_checks_body() -> None:
+    service = PaymentService(SlowStore(0.3), wait_for_in_flight=True, wait_timeout=0.05)
+    results = _race(service, "slow", [{"amount": 5, "currency": "USD"}] * 3)
+    assert sorted(status for status, _ in results) == [201, 409, 409]
+    assert service.stats()["in_flight_wait"]["wait_timeouts"] == 2
+
+    service = PaymentService(SlowStore(0.2), wait_for_in_flight=True)
+    results = _race(
+        service, "mixed", [{"amount": 5, "currency": "USD"}, {"amount": 6, "currency": "USD"}]
+    )
+    assert sorted(status for status, _ in results) == [201, 409]
+    assert service.ledger_count() == 1
@@ -65,8 +65,8 @@ def create_app(service: RateLimitService) -> FastAPI:
         return {"status": "ok", **service.stats()}
 
     @app.post("/v1/check")
-    def check_rate(body: CheckRequest) -> JSONResponse:
-        result = service.check(body.tenant_id, body.route)
+    async def check_rate(body: CheckRequest) -> JSONResponse:
+        result = await service.acheck(body.tenant_id, body.route)
         headers: dict[str, str] = {
             "X-RateLimit-Limit": str(result.limit),
             "X-RateLimit-Remaining": str(result.remaining),
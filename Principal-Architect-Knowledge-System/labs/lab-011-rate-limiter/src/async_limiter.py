@@ -0,0 +1,129 @@
+"""Async global limiter — concurrent checks coalesced into pipelined backend calls."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Protocol
+
+from .models import REDIS, Command, GlobalLimiter, InMemoryRedis, RateLimitResult
+
+_Pending = tuple[Command, int, "asyncio.Future[RateLimitResult]"]
+
+
+class PipelineBackend(Protocol):
+    async def execute(self, commands: list[Command]) -> list[Any]:
+        """Run ``commands`` in one round trip; per-command failures come back as exceptions."""
+        ...
+
+
+class InProcessServer:
+    """Redis-server stand-in: each pipeline costs one simulated network round trip."""
+
+    def __init__(self, redis: InMemoryRedis | None = None, rtt: float = 0.0005) -> None:
+        self.redis = redis or REDIS
+        self.rtt = rtt
+        self.round_trips = 0
+        self.commands_total = 0
+
+    async def execute(self, commands: list[Command]) -> list[Any]:
+        self.round_trips += 1
+        self.commands_total += len(commands)
+        await asyncio.sleep(self.rtt)
+        return self.redis.pipeline(commands)
+
+
+class AsyncRateLimiter:
+    """Awaitable ``check`` over a sync limiter's commands.
+
+    Checks issued while the event loop is busy are queued; one flusher drains the
+    queue into pipelines of up to ``max_batch`` commands, with at most ``max_inflight``
+    pipelines outstanding. While pipelines are in flight the queue keeps growing, so
+    batches get larger exactly when load is high.
+    """
+
+    def __init__(
+        self,
+        limiter: GlobalLimiter,
+        backend: PipelineBackend,
+        max_batch: int = 1024,
+        max_inflight: int = 4,
+    ) -> None:
+        self.limiter = limiter
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_inflight = max_inflight
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: list[_Pending] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._flusher: asyncio.Task[None] | None = None
+        self._sends: set[asyncio.Task[None]] = set()
+        self.checks_total = 0
+        self.pipelines_total = 0
+        self.largest_batch = 0
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Queue and semaphore belong to one loop (e.g. a new TestClient portal).
+            self._loop = loop
+            self._pending = []
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._flusher = None
+        return loop
+
+    async def check(self, key: str, limit: int | None = None, cost: int = 1) -> RateLimitResult:
+        loop = self._bind()
+        effective_limit = limit if limit is not None else self.limiter.default_limit
+        command = self.limiter.command(key, effective_limit, cost, time.monotonic())
+        future: asyncio.Future[RateLimitResult] = loop.create_future()
+        self._pending.append((command, effective_limit, future))
+        self.checks_total += 1
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush())
+        return await future
+
+    async def _flush(self) -> None:
+        assert self._slots is not None
+        try:
+            await asyncio.sleep(0)  # let checks issued in the same tick join the batch
+            while self._pending:
+                await self._slots.acquire()
+                batch = self._pending[: self.max_batch]
+                del self._pending[: len(batch)]
+                task = asyncio.get_running_loop().create_task(self._send(batch))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+        finally:
+            self._flusher = None
+
+    async def _send(self, batch: list[_Pending]) -> None:
+        assert self._slots is not None
+        self.pipelines_total += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await self.backend.execute([command for command, _, _ in batch])
+        except Exception as exc:  # whole pipeline failed (e.g. ConnectionError)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._slots.release()
+        for (_, limit, future), raw in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(raw, Exception):
+                future.set_exception(raw)
+            else:
+                future.set_result(self.limiter.result(raw, limit))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "checks": self.checks_total,
+            "pipelines": self.pipelines_total,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.checks_total / self.pipelines_total, 1)
+            if self.pipelines_total
+            else None,
+        }
@@ -0,0 +1,102 @@
+"""Benchmarks — memory and checks/sec per algorithm; async pipelined check latency."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import tracemalloc
+from typing import Any
+
+from .async_limiter import AsyncRateLimiter, InProcessServer
+from .models import GLOBAL_ALGORITHMS, InMemoryRedis, make_global_limiter
+
+
+def _workload(tenants: int, checks_per_tenant: int, seed: int = 11) -> list[str]:
+    keys = [f"tenant-{i}:/api" for i in range(tenants)] * checks_per_tenant
+    random.Random(seed).shuffle(keys)
+    return keys
+
+
+def benchmark_algorithm(
+    algorithm: str,
+    tenants: int = 100_000,
+    checks_per_tenant: int = 10,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """Time one pass over the workload, then replay it under tracemalloc for memory."""
+    keys = _workload(tenants, checks_per_tenant)
+
+    limiter = make_global_limiter(algorithm, 60.0, limit, InMemoryRedis())
+    started = time.perf_counter()
+    for key in keys:
+        limiter.check(key)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    redis = InMemoryRedis()
+    baseline = tracemalloc.get_traced_memory()[0]
+    limiter = make_global_limiter(algorithm, 60.0, limit, redis)
+    for key in keys:
+        limiter.check(key)
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return {
+        "algorithm": algorithm,
+        "tenants": tenants,
+        "checks": len(keys),
+        "checks_per_sec": round(len(keys) / elapsed) if elapsed else None,
+        "tracked_keys": len(redis.store),
+        "memory_mb": round(held / 1e6, 2),
+        "bytes_per_tenant": round(held / tenants),
+    }
+
+
+def run_benchmark(tenants: int = 100_000, checks_per_tenant: int = 10) -> list[dict[str, Any]]:
+    return [benchmark_algorithm(a, tenants, checks_per_tenant) for a in GLOBAL_ALGORITHMS]
+
+
+async def _timed_check(limiter: AsyncRateLimiter, key: str) -> float:
+    started = time.perf_counter()
+    await limiter.check(key)
+    return time.perf_counter() - started
+
+
+def benchmark_async(
+    concurrency: int = 50_000,
+    tenants: int = 1_000,
+    rtt: float = 0.0005,
+    max_batch: int = 1024,
+    max_inflight: int = 4,
+) -> dict[str, Any]:
+    """Fire ``concurrency`` checks at once and report per-check latency percentiles."""
+    server = InProcessServer(InMemoryRedis(), rtt=rtt)
+    limiter = AsyncRateLimiter(
+        make_global_limiter("gcra", 60.0, 100, server.redis), server, max_batch, max_inflight
+    )
+    keys = [f"tenant-{i % tenants}:/api" for i in range(concurrency)]
+
+    async def run() -> list[float]:
+        return await asyncio.gather(*(_timed_check(limiter, key) for key in keys))
+
+    started = time.perf_counter()
+    latencies = sorted(asyncio.run(run()))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "max_batch": max_batch,
+        "max_inflight": max_inflight,
+        "rtt_ms": rtt * 1000,
+        "round_trips": server.round_trips,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "checks_per_sec": round(concurrency / elapsed) if elapsed else None,
+    }
+
+
+def run_async_benchmark(concurrency: int = 50_000) -> list[dict[str, Any]]:
+    """Pipelined batches vs one command per round trip (64 in flight)."""
+    return [
+        benchmark_async(concurrency),
+        benchmark_async(concurrency, max_batch=1, max_inflight=64),
+    ]
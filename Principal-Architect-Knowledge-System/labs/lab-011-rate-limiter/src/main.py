@@ -7,6 +7,8 @@ import argparse
 import json
 
 from .api import create_app
+from .bench import run_async_benchmark, run_benchmark
+from .models import GLOBAL_ALGORITHMS, MIDDLEWARE_MODES
 from .service import RateLimitService
 
 
@@ -26,9 +28,31 @@ def main() -> int:
     parser.add_argument("--inject", choices=["redis-down"])
     parser.add_argument("--mode", choices=["fail-open", "fail-closed"], default="fail-closed")
     parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--algorithm", choices=GLOBAL_ALGORITHMS, default="sliding-log")
+    parser.add_argument(
+        "--global-mode",
+        choices=MIDDLEWARE_MODES,
+        default="direct",
+        help="lease = reserve blocks of global quota and spend them locally",
+    )
+    parser.add_argument("--bench", action="store_true", help="Memory + checks/sec benchmark")
+    parser.add_argument("--tenants", type=int, default=100_000)
+    parser.add_argument(
+        "--bench-async", action="store_true", help="p50/p99 of 50k concurrent async checks"
+    )
     args = parser.parse_args()
 
-    service = RateLimitService()
+    if args.bench:
+        for row in run_benchmark(args.tenants):
+            print(json.dumps(row))
+        return 0
+
+    if args.bench_async:
+        for row in run_async_benchmark():
+            print(json.dumps(row))
+        return 0
+
+    service = RateLimitService(args.algorithm, args.global_mode)
 
     if args.inject == "redis-down":
         print(json.dumps(service.simulate_redis_down(True, args.mode), indent=2))
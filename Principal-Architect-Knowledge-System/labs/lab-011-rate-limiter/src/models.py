@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
+from typing import Any
+
+from .store import ShardedStore
 
 
 @dataclass
@@ -36,54 +40,358 @@ class RateLimitResult:
     retry_after: float | None = None
 
 
+Command = tuple[str, tuple[Any, ...]]
+
+
 class InMemoryRedis:
-    """ZSET sliding window backing store."""
+    """Redis stand-in on a lock-striped sharded store.
+
+    ``zadd_prune`` is the exact sliding log (one timestamp per request);
+    ``sliding_counter`` and ``gcra`` keep constant-size state per key.
+    """
+
+    COMMANDS = frozenset({"zadd_prune", "sliding_counter", "gcra"})
 
-    def __init__(self) -> None:
-        self.zsets: dict[str, deque[float]] = defaultdict(deque)
+    def __init__(self, shard_count: int = 64) -> None:
+        self.store = ShardedStore(shard_count)
         self.available: bool = True
 
-    def zadd_prune(self, key: str, now: float, window_seconds: float) -> int:
+    def _check_available(self) -> None:
         if not self.available:
             raise ConnectionError("redis unavailable")
-        z = self.zsets[key]
-        cutoff = now - window_seconds
-        while z and z[0] <= cutoff:
-            z.popleft()
-        z.append(now)
-        return len(z)
+
+    def zadd_prune(
+        self,
+        key: str,
+        now: float,
+        window_seconds: float,
+        count: int = 1,
+        limit: int | None = None,
+    ) -> int:
+        """Prune, append ``count`` entries and return the new size.
+
+        With ``limit`` the entries are only appended when they fit, and the returned
+        size is what it *would* have been — callers compare it against the limit.
+        """
+        self._check_available()
+
+        def add(z: deque[float] | None) -> tuple[deque[float], float, int]:
+            z = z if z is not None else deque()
+            cutoff = now - window_seconds
+            while z and z[0] <= cutoff:
+                z.popleft()
+            size = len(z) + count
+            if limit is None or size <= limit:
+                z.extend([now] * count)
+            return z, now + window_seconds, size
+
+        return self.store.update(f"log:{key}", add, now)
+
+    def sliding_counter(
+        self, key: str, now: float, window_seconds: float, limit: int, cost: int = 1
+    ) -> tuple[bool, float, float | None]:
+        """Weighted two-window counter → ``(allowed, estimate, retry_after)``."""
+        self._check_available()
+
+        def count(state: tuple[float, int, int] | None) -> tuple[Any, float, Any]:
+            window_start = (now // window_seconds) * window_seconds
+            if state is None or state[0] < window_start - window_seconds:
+                previous, current = 0, 0
+            elif state[0] < window_start:
+                previous, current = state[2], 0
+            else:
+                previous, current = state[1], state[2]
+            weight = 1 - (now - window_start) / window_seconds
+            estimate = previous * weight + current
+            allowed = estimate + cost <= limit
+            retry_after = None
+            if allowed:
+                current += cost
+                estimate += cost
+            elif previous and current + cost <= limit:
+                # Wait until the previous window's weight has decayed enough.
+                needed = (limit - cost - current) / previous
+                retry_after = max(0.0, (1 - needed) * window_seconds - (now - window_start))
+            else:
+                retry_after = window_start + window_seconds - now
+            new_state = (window_start, previous, current)
+            return new_state, window_start + 2 * window_seconds, (allowed, estimate, retry_after)
+
+        return self.store.update(f"swc:{key}", count, now)
+
+    def gcra(
+        self, key: str, now: float, emission_interval: float, burst: int, cost: int = 1
+    ) -> tuple[bool, int, float | None]:
+        """Generic cell rate algorithm → ``(allowed, remaining, retry_after)``."""
+        self._check_available()
+        tolerance = emission_interval * burst
+
+        def arrive(tat: float | None) -> tuple[Any, float, Any]:
+            tat = max(tat if tat is not None else now, now)
+            new_tat = tat + emission_interval * cost
+            allow_at = new_tat - tolerance
+            if now < allow_at:
+                return tat, tat, (False, 0, allow_at - now)
+            remaining = int((tolerance - (new_tat - now)) / emission_interval + 1e-9)
+            return new_tat, new_tat, (True, remaining, None)
+
+        return self.store.update(f"gcra:{key}", arrive, now)
+
+    def execute(self, command: Command) -> Any:
+        name, args = command
+        if name not in self.COMMANDS:
+            raise ValueError(f"unknown command: {name}")
+        return getattr(self, name)(*args)
+
+    def pipeline(self, commands: list[Command]) -> list[Any]:
+        """Run commands in order; a failing command yields its exception, not a raise."""
+        self._check_available()
+        results: list[Any] = []
+        for command in commands:
+            try:
+                results.append(self.execute(command))
+            except (ConnectionError, ValueError) as exc:
+                results.append(exc)
+        return results
+
+    def clear(self) -> None:
+        self.store.clear()
 
 
 REDIS = InMemoryRedis()
 
 
 class SlidingWindowLog:
-    def __init__(self, redis_url: str, window_seconds: float, limit: int = 100) -> None:
+    """Exact sliding window: one stored timestamp per request in the window."""
+
+    def __init__(
+        self,
+        redis_url: str,
+        window_seconds: float,
+        limit: int = 100,
+        redis: InMemoryRedis | None = None,
+    ) -> None:
         self.redis_url = redis_url
         self.window_seconds = window_seconds
         self.default_limit = limit
+        self.redis = redis or REDIS
+
+    def command(self, key: str, limit: int, cost: int, now: float) -> Command:
+        # Single checks keep the classic log behaviour (denied requests are recorded too);
+        # multi-permit reservations are only recorded when they fit.
+        return ("zadd_prune", (key, now, self.window_seconds, cost, limit if cost > 1 else None))
+
+    def result(self, count: int, limit: int) -> RateLimitResult:
+        allowed = count <= limit
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, limit - count),
+            retry_after=None if allowed else self.window_seconds,
+        )
 
-    def check(self, key: str, limit: int | None = None) -> RateLimitResult:
+    def check(self, key: str, limit: int | None = None, cost: int = 1) -> RateLimitResult:
         effective_limit = limit if limit is not None else self.default_limit
-        now = time.monotonic()
-        count = REDIS.zadd_prune(key, now, self.window_seconds)
-        allowed = count <= effective_limit
-        retry_after = None if allowed else self.window_seconds
+        command = self.command(key, effective_limit, cost, time.monotonic())
+        return self.result(self.redis.execute(command), effective_limit)
+
+
+class SlidingWindowCounter:
+    """Approximate sliding window from two fixed-window counts — O(1) state per key."""
+
+    def __init__(
+        self, window_seconds: float, limit: int = 100, redis: InMemoryRedis | None = None
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.default_limit = limit
+        self.redis = redis or REDIS
+
+    def command(self, key: str, limit: int, cost: int, now: float) -> Command:
+        return ("sliding_counter", (key, now, self.window_seconds, limit, cost))
+
+    def result(self, raw: tuple[bool, float, float | None], limit: int) -> RateLimitResult:
+        allowed, estimate, retry_after = raw
         return RateLimitResult(
             allowed=allowed,
-            limit=effective_limit,
-            remaining=max(0, effective_limit - count),
+            limit=limit,
+            remaining=max(0, int(limit - estimate)),
             retry_after=retry_after,
         )
 
+    def check(self, key: str, limit: int | None = None, cost: int = 1) -> RateLimitResult:
+        effective_limit = limit if limit is not None else self.default_limit
+        command = self.command(key, effective_limit, cost, time.monotonic())
+        return self.result(self.redis.execute(command), effective_limit)
+
+
+class GCRALimiter:
+    """GCRA: ``limit`` requests per window as a single stored timestamp per key."""
+
+    def __init__(
+        self, window_seconds: float, limit: int = 100, redis: InMemoryRedis | None = None
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.default_limit = limit
+        self.redis = redis or REDIS
+
+    def command(self, key: str, limit: int, cost: int, now: float) -> Command:
+        return ("gcra", (key, now, self.window_seconds / limit, limit, cost))
+
+    def result(self, raw: tuple[bool, int, float | None], limit: int) -> RateLimitResult:
+        allowed, remaining, retry_after = raw
+        return RateLimitResult(
+            allowed=allowed, limit=limit, remaining=remaining, retry_after=retry_after
+        )
+
+    def check(self, key: str, limit: int | None = None, cost: int = 1) -> RateLimitResult:
+        effective_limit = limit if limit is not None else self.default_limit
+        command = self.command(key, effective_limit, cost, time.monotonic())
+        return self.result(self.redis.execute(command), effective_limit)
+
+
+GlobalLimiter = SlidingWindowLog | SlidingWindowCounter | GCRALimiter
+GLOBAL_ALGORITHMS = ("sliding-log", "sliding-counter", "gcra")
+
+
+def make_global_limiter(
+    algorithm: str,
+    window_seconds: float,
+    limit: int = 100,
+    redis: InMemoryRedis | None = None,
+) -> GlobalLimiter:
+    if algorithm == "sliding-log":
+        return SlidingWindowLog("redis://localhost", window_seconds, limit, redis)
+    if algorithm == "sliding-counter":
+        return SlidingWindowCounter(window_seconds, limit, redis)
+    if algorithm == "gcra":
+        return GCRALimiter(window_seconds, limit, redis)
+    raise ValueError(f"unknown algorithm: {algorithm}")
+
+
+@dataclass
+class Lease:
+    """Block of global quota reserved by this process and spent locally."""
+
+    permits: int
+    expires_at: float
+    global_remaining: int
+    denied: bool = False  # global quota exhausted: deny locally until expiry
+
+
+MIDDLEWARE_MODES = ("direct", "lease")
+
 
 class RateLimitMiddleware:
-    def __init__(self, local: TokenBucket, global_limiter: SlidingWindowLog) -> None:
+    """Per-tenant/route local token buckets in front of the global limiter.
+
+    ``local`` is the template for each key's bucket; at most ``max_buckets`` buckets
+    are kept (least recently used evicted). In ``lease`` mode the process reserves
+    ``lease_size`` permits from the global limiter in one call and spends them locally
+    until they run out or ``lease_ttl`` passes. Reserved-but-late permits let a window
+    admit at most ``lease_size`` extra requests per process, so ``lease_size`` is derived
+    from ``max_overshoot`` (a fraction of the limit) shared across ``processes``.
+    """
+
+    def __init__(
+        self,
+        local: TokenBucket,
+        global_limiter: GlobalLimiter,
+        *,
+        max_buckets: int = 10_000,
+        mode: str = "direct",
+        lease_ttl: float = 1.0,
+        max_overshoot: float = 0.1,
+        processes: int = 1,
+    ) -> None:
+        if mode not in MIDDLEWARE_MODES:
+            raise ValueError(f"unknown middleware mode: {mode}")
         self.local = local
         self.global_limiter = global_limiter
+        self.max_buckets = max_buckets
+        self.mode = mode
+        self.lease_ttl = lease_ttl
+        self.lease_size = max(1, int(global_limiter.default_limit * max_overshoot / processes))
+        self.buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.leases: OrderedDict[str, Lease] = OrderedDict()
+        self._lock = threading.Lock()
+        self.global_calls = 0
+        self.local_denials = 0
+        self.lease_hits = 0
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.local.rate, burst=self.local.burst)
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def allow_local(self, key: str) -> bool:
+        with self._lock:
+            if self._bucket(key).allow():
+                return True
+            self.local_denials += 1
+            return False
+
+    def record_global_call(self) -> None:
+        """Count a global-limiter call made for this middleware (e.g. a pipelined one)."""
+        with self._lock:
+            self.global_calls += 1
 
     def check(self, tenant_id: str, route: str) -> RateLimitResult:
-        if not self.local.allow():
-            return RateLimitResult(False, 0, 0, retry_after=1.0)
         key = f"{tenant_id}:{route}"
-        return self.global_limiter.check(key, limit=self.global_limiter.default_limit)
+        limit = self.global_limiter.default_limit
+        if not self.allow_local(key):
+            return RateLimitResult(False, 0, 0, retry_after=1.0)
+        with self._lock:
+            if self.mode == "lease":
+                lease = self.leases.get(key)
+                now = time.monotonic()
+                if lease is not None and now < lease.expires_at:
+                    if lease.denied:
+                        self.lease_hits += 1
+                        return RateLimitResult(False, limit, 0, retry_after=lease.expires_at - now)
+                    if lease.permits > 0:
+                        lease.permits -= 1
+                        self.lease_hits += 1
+                        return RateLimitResult(True, limit, lease.global_remaining + lease.permits)
+            self.global_calls += 1
+        if self.mode == "direct":
+            return self.global_limiter.check(key, limit=limit)
+        return self._renew_lease(key, limit)
+
+    def _renew_lease(self, key: str, limit: int) -> RateLimitResult:
+        result = self.global_limiter.check(key, limit=limit, cost=self.lease_size)
+        if result.allowed:
+            expires_at = time.monotonic() + self.lease_ttl
+            self._store_lease(key, Lease(self.lease_size - 1, expires_at, result.remaining))
+            return RateLimitResult(True, limit, result.remaining + self.lease_size - 1)
+        if self.lease_size > 1:
+            # Not enough quota left for a whole block: fall back to a single permit.
+            self.record_global_call()
+            result = self.global_limiter.check(key, limit=limit, cost=1)
+        if not result.allowed:
+            hold = min(result.retry_after or self.lease_ttl, self.lease_ttl)
+            self._store_lease(key, Lease(0, time.monotonic() + hold, 0, denied=True))
+        return result
+
+    def _store_lease(self, key: str, lease: Lease) -> None:
+        with self._lock:
+            self.leases[key] = lease
+            self.leases.move_to_end(key)
+            if len(self.leases) > self.max_buckets:
+                self.leases.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "local_buckets": len(self.buckets),
+            "max_buckets": self.max_buckets,
+            "local_denials": self.local_denials,
+            "global_calls": self.global_calls,
+            "lease_size": self.lease_size if self.mode == "lease" else None,
+            "lease_hits": self.lease_hits,
+        }
@@ -4,43 +4,70 @@ from __future__ import annotations
 
 from typing import Any
 
-from .models import REDIS, RateLimitMiddleware, RateLimitResult, SlidingWindowLog, TokenBucket
+from .async_limiter import AsyncRateLimiter, InProcessServer
+from .models import (
+    REDIS,
+    RateLimitMiddleware,
+    RateLimitResult,
+    TokenBucket,
+    make_global_limiter,
+)
 
 
 class RateLimitService:
     """Two-tier rate limiter with chaos simulation hooks."""
 
-    def __init__(self) -> None:
+    def __init__(self, algorithm: str = "sliding-log", mode: str = "direct") -> None:
+        self.algorithm = algorithm
         self.local_bucket = TokenBucket(rate=100.0, burst=200.0)
-        self.global_limiter = SlidingWindowLog("redis://localhost", 60.0, limit=100)
-        self.middleware = RateLimitMiddleware(self.local_bucket, self.global_limiter)
+        self.global_limiter = make_global_limiter(algorithm, 60.0, limit=100)
+        self.middleware = RateLimitMiddleware(self.local_bucket, self.global_limiter, mode=mode)
+        self.async_limiter = AsyncRateLimiter(self.global_limiter, InProcessServer(REDIS, rtt=0.0))
         self.redis_down = False
         self.fail_mode = "fail-closed"
         self.allowed_total = 0
         self.denied_total = 0
         self.checks_total = 0
 
-    def check(self, tenant_id: str, route: str) -> RateLimitResult:
-        self.checks_total += 1
-        if self.redis_down:
-            if self.fail_mode == "fail-open":
-                result = RateLimitResult(True, 100, 100)
-            else:
-                result = RateLimitResult(False, 0, 0, retry_after=60.0)
-        else:
-            try:
-                result = self.middleware.check(tenant_id, route)
-            except ConnectionError:
-                if self.fail_mode == "fail-open":
-                    result = RateLimitResult(True, 100, 100)
-                else:
-                    result = RateLimitResult(False, 0, 0, retry_after=60.0)
+    def _outage_result(self) -> RateLimitResult:
+        if self.fail_mode == "fail-open":
+            return RateLimitResult(True, 100, 100)
+        return RateLimitResult(False, 0, 0, retry_after=60.0)
+
+    def _record(self, result: RateLimitResult) -> RateLimitResult:
         if result.allowed:
             self.allowed_total += 1
         else:
             self.denied_total += 1
         return result
 
+    def check(self, tenant_id: str, route: str) -> RateLimitResult:
+        self.checks_total += 1
+        if self.redis_down:
+            return self._record(self._outage_result())
+        try:
+            result = self.middleware.check(tenant_id, route)
+        except ConnectionError:
+            result = self._outage_result()
+        return self._record(result)
+
+    async def acheck(self, tenant_id: str, route: str) -> RateLimitResult:
+        """Async path: the global check joins a pipelined batch with concurrent requests."""
+        if self.middleware.mode == "lease":
+            return self.check(tenant_id, route)  # already served locally almost always
+        self.checks_total += 1
+        if self.redis_down:
+            return self._record(self._outage_result())
+        key = f"{tenant_id}:{route}"
+        if not self.middleware.allow_local(key):
+            return self._record(RateLimitResult(False, 0, 0, retry_after=1.0))
+        self.middleware.record_global_call()
+        try:
+            result = await self.async_limiter.check(key)
+        except ConnectionError:
+            result = self._outage_result()
+        return self._record(result)
+
     def simulate_redis_down(self, enabled: bool, mode: str = "fail-closed") -> dict[str, Any]:
         self.redis_down = enabled
         self.fail_mode = mode
@@ -61,10 +88,15 @@ class RateLimitService:
             "local_burst": self.local_bucket.burst,
             "global_limit": self.global_limiter.default_limit,
             "window_seconds": self.global_limiter.window_seconds,
+            "algorithm": self.algorithm,
+            "tracked_keys": len(REDIS.store),
+            "evicted_keys": REDIS.store.evicted_total,
+            "middleware": self.middleware.stats(),
+            "async_pipeline": self.async_limiter.stats(),
         }
 
     def reset(self) -> None:
-        REDIS.zsets.clear()
+        REDIS.clear()
         self.allowed_total = 0
         self.denied_total = 0
         self.checks_total = 0
@@ -0,0 +1,97 @@
+"""Lock-striped in-process store backing the rate limit algorithms."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+R = TypeVar("R")
+
+# update() callbacks receive the live state (or None) and return
+# (new_state, expires_at, result). Expired state is indistinguishable from absent,
+# so evicting it never changes a limiter decision.
+Updater = Callable[[Any], tuple[Any, float, R]]
+
+
+class _Shard:
+    __slots__ = ("lock", "data")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.data: dict[str, tuple[Any, float]] = {}
+
+
+class ShardedStore:
+    """``shard_count`` independent dicts, each behind its own lock.
+
+    Threads only contend when their keys hash to the same shard. Every entry
+    carries an ``expires_at`` chosen by the algorithm; expired entries are swept one
+    shard at a time (every ``sweep_every`` updates) or all at once via ``evict_idle``.
+    """
+
+    def __init__(
+        self,
+        shard_count: int = 64,
+        sweep_every: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if shard_count < 1:
+            raise ValueError("shard_count must be >= 1")
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self.sweep_every = sweep_every
+        self.clock = clock
+        self._ops = 0
+        self._next_sweep = 0
+        self.evicted_total = 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def update(self, key: str, fn: Updater[R], now: float) -> R:
+        """Atomically read-modify-write ``key`` under its shard lock."""
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.data.get(key)
+            state = entry[0] if entry is not None and entry[1] > now else None
+            new_state, expires_at, result = fn(state)
+            shard.data[key] = (new_state, expires_at)
+        # Racy counter on purpose: a missed or doubled sweep is harmless.
+        self._ops += 1
+        if self.sweep_every and self._ops % self.sweep_every == 0:
+            self._sweep(self._shards[self._next_sweep % len(self._shards)], now)
+            self._next_sweep += 1
+        return result
+
+    def get(self, key: str, now: float | None = None) -> Any:
+        now = self.clock() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.data.get(key)
+        return entry[0] if entry is not None and entry[1] > now else None
+
+    def _sweep(self, shard: _Shard, now: float) -> int:
+        with shard.lock:
+            expired = [k for k, (_, expires_at) in shard.data.items() if expires_at <= now]
+            for key in expired:
+                del shard.data[key]
+        self.evicted_total += len(expired)
+        return len(expired)
+
+    def evict_idle(self, now: float | None = None) -> int:
+        """Drop every expired key across all shards; returns how many were removed."""
+        now = self.clock() if now is None else now
+        return sum(self._sweep(shard, now) for shard in self._shards)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.data.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self._shards)
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
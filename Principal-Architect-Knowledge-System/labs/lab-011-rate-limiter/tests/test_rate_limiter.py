@@ -1,19 +1,33 @@
 """Tests for Lab 011: Distributed Rate Limiter."""
 
+import asyncio
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
-from src.models import REDIS, RateLimitMiddleware, SlidingWindowLog, TokenBucket
+from src.async_limiter import AsyncRateLimiter, InProcessServer
+from src.models import (
+    REDIS,
+    GCRALimiter,
+    InMemoryRedis,
+    RateLimitMiddleware,
+    SlidingWindowCounter,
+    SlidingWindowLog,
+    TokenBucket,
+)
 from src.service import RateLimitService
+from src.store import ShardedStore
 
 
 def setup_function() -> None:
-    REDIS.zsets.clear()
+    REDIS.clear()
     REDIS.available = True
 
 
@@ -52,6 +66,55 @@ def test_per_tenant_isolation():
     assert result.allowed is True
 
 
+def test_sliding_window_counter_weights_previous_window():
+    redis = InMemoryRedis()
+    for _ in range(10):
+        assert redis.sliding_counter("k", 5.0, 10.0, limit=10)[0]
+    assert redis.sliding_counter("k", 9.0, 10.0, limit=10)[0] is False
+    # 25% into the next window the previous 10 weigh 7.5 → 2 more fit.
+    assert [redis.sliding_counter("k", 12.5, 10.0, limit=10)[0] for _ in range(3)] == [
+        True,
+        True,
+        False,
+    ]
+    limiter = SlidingWindowCounter(60.0, limit=2, redis=redis)
+    assert [limiter.check("c").allowed for _ in range(3)] == [True, True, False]
+
+
+def test_gcra_burst_and_retry_after():
+    redis = InMemoryRedis()
+    results = [redis.gcra("k", 0.0, emission_interval=1.0, burst=3) for _ in range(4)]
+    assert [r[0] for r in results] == [True, True, True, False]
+    assert [r[1] for r in results[:3]] == [2, 1, 0]
+    assert results[3][2] == 1.0
+    assert redis.gcra("k", 1.0, 1.0, 3)[0] is True
+    limiter = GCRALimiter(60.0, limit=3, redis=redis)
+    assert [limiter.check("g").allowed for _ in range(4)] == [True, True, True, False]
+
+
+def test_sharded_store_is_thread_safe_and_evicts_idle_keys():
+    redis = InMemoryRedis(shard_count=8)
+    limiter = GCRALimiter(60.0, limit=100, redis=redis)
+    allowed = []
+
+    def hammer() -> None:
+        allowed.extend(limiter.check("hot").allowed for _ in range(100))
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(allowed) == 100
+
+    store = ShardedStore(shard_count=4, sweep_every=0)
+    for i in range(10):
+        store.update(f"k{i}", lambda _: (1, 5.0 if i % 2 else 50.0, None), now=0.0)
+    assert store.get("k1", now=6.0) is None  # expired reads as absent
+    assert store.evict_idle(now=10.0) == 5
+    assert len(store) == 5
+
+
 def test_token_bucket_stub():
     bucket = TokenBucket(rate=10.0, burst=20.0)
     assert bucket.rate == 10.0
@@ -65,6 +128,81 @@ def test_middleware_local_deny():
     assert mw.check("t1", "/api").allowed is False
 
 
+def test_middleware_buckets_are_per_tenant_and_bounded():
+    mw = RateLimitMiddleware(
+        TokenBucket(rate=0.1, burst=1.0),
+        SlidingWindowLog("redis://localhost", 60.0, limit=100),
+        max_buckets=2,
+    )
+    assert mw.check("t1", "/api").allowed is True
+    assert mw.check("t1", "/api").allowed is False
+    assert mw.check("t2", "/api").allowed is True
+    assert mw.check("t3", "/api").allowed is True
+    assert list(mw.buckets) == ["t2:/api", "t3:/api"]
+
+
+def test_lease_mode_batches_global_calls_within_overshoot():
+    limiter = GCRALimiter(60.0, limit=1000, redis=InMemoryRedis())
+    mw = RateLimitMiddleware(
+        TokenBucket(rate=1e6, burst=1e6), limiter, mode="lease", max_overshoot=0.05
+    )
+    assert mw.lease_size == 50
+    allowed = sum(mw.check("t1", "/api").allowed for _ in range(1200))
+    assert allowed <= 1000 + mw.lease_size
+    assert allowed >= 1000 - mw.lease_size
+    assert mw.stats()["global_calls"] < 30  # vs 1200 in direct mode
+
+
+def test_global_calls_exact_across_threads():
+    limiter = GCRALimiter(60.0, limit=10**9, redis=InMemoryRedis())
+    mw = RateLimitMiddleware(TokenBucket(rate=1e9, burst=1e9), limiter)
+
+    def worker(tenant: str) -> None:
+        for _ in range(500):
+            mw.check(tenant, "/api")
+
+    threads = [threading.Thread(target=worker, args=(f"t{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert mw.stats()["global_calls"] == 4_000
+
+
+def test_lease_expiry_is_absolute():
+    limiter = GCRALimiter(60.0, limit=1000, redis=InMemoryRedis())
+    mw = RateLimitMiddleware(TokenBucket(rate=1e6, burst=1e6), limiter, mode="lease", lease_ttl=5.0)
+    before = time.monotonic()
+    mw.check("t1", "/api")
+    assert before + 5.0 <= mw.leases["t1:/api"].expires_at <= time.monotonic() + 5.0
+
+
+def test_async_limiter_pipelines_concurrent_checks():
+    server = InProcessServer(InMemoryRedis(), rtt=0.001)
+    limiter = AsyncRateLimiter(GCRALimiter(60.0, limit=50, redis=server.redis), server)
+
+    async def burst() -> list[bool]:
+        results = await asyncio.gather(*(limiter.check("hot") for _ in range(200)))
+        return [r.allowed for r in results]
+
+    allowed = asyncio.run(burst())
+    assert sum(allowed) == 50
+    assert server.round_trips == 1
+    assert limiter.stats()["largest_batch"] == 200
+
+
+def test_async_limiter_propagates_outage():
+    server = InProcessServer(InMemoryRedis(), rtt=0.0)
+    server.redis.available = False
+    limiter = AsyncRateLimiter(SlidingWindowCounter(60.0, redis=server.redis), server)
+
+    async def one() -> None:
+        await limiter.check("k")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(one())
+
+
 def test_http_check():
     service = RateLimitService()
     client = TestClient(create_app(service))
@@ -72,6 +210,8 @@ def test_http_check():
     assert resp.status_code == 200
     assert resp.json()["allowed"] is True
     assert "X-RateLimit-Limit" in resp.headers
+    client.post("/v1/check", json={"tenant_id": "tenant-1", "route": "/api"})
+    assert client.get("/health").json()["middleware"]["global_calls"] == 2
 
 
 def test_http_redis_down_fail_closed():
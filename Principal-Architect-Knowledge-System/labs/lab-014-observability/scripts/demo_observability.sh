@@ -20,6 +20,9 @@ echo ""
 echo "==> GET /v1/traces"
 curl -sS "$BASE_URL/v1/traces?limit=5" | python3 -m json.tool
 
+echo "==> GET /v1/traces (slowest, last 5 minutes)"
+curl -sS "$BASE_URL/v1/traces?order=slowest&window_seconds=300&limit=3" | python3 -m json.tool
+
 echo "==> POST /v1/chaos/inject (error spike 50%)"
 curl -sS -X POST "$BASE_URL/v1/chaos/inject" \
   -H "Content-Type: application/json" \
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import Any, Literal
 
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse, PlainTextResponse
@@ -34,7 +34,8 @@ _LANDING_HTML = """<!DOCTYPE html>
   <ol>
     <li><code>POST /v1/requests/simulate</code> — generate instrumented request</li>
     <li><code>GET /metrics</code> — Prometheus text exposition</li>
-    <li><code>GET /v1/traces</code> — recent correlated log entries</li>
+    <li><code>GET /v1/traces</code> — recent or slowest traces, by route/status/window</li>
+    <li><code>GET /v1/traces/{trace_id}</code> — one trace as a span tree</li>
     <li><code>GET /health</code> — service stats</li>
   </ol>
   <p><a href="/docs">Swagger UI</a> · <a href="/health">Health</a> · <a href="/metrics">Metrics</a></p>
@@ -61,6 +62,7 @@ def create_app(service: ObservabilityService) -> FastAPI:
                 "metrics": "GET /metrics",
                 "simulate": "POST /v1/requests/simulate",
                 "traces": "GET /v1/traces",
+                "trace": "GET /v1/traces/{trace_id}",
                 "inject": "POST /v1/chaos/inject",
             },
         }
@@ -78,10 +80,23 @@ def create_app(service: ObservabilityService) -> FastAPI:
         return service.simulate_request(body.route)
 
     @app.get("/v1/traces")
-    def list_traces(limit: int = Query(default=20, ge=1, le=100)) -> dict[str, Any]:
-        traces = service.get_traces(limit)
+    def list_traces(
+        limit: int = Query(default=20, ge=1, le=100),
+        route: str | None = Query(default=None, examples=["/checkout"]),
+        status: str | None = Query(default=None, description='Status code or "error" (5xx)'),
+        window_seconds: float | None = Query(default=None, gt=0),
+        order: Literal["recent", "slowest"] = "recent",
+    ) -> dict[str, Any]:
+        traces = service.get_traces(limit, route, status, window_seconds, order)
         return {"count": len(traces), "traces": traces}
 
+    @app.get("/v1/traces/{trace_id}")
+    def get_trace(trace_id: str) -> dict[str, Any]:
+        trace = service.get_trace(trace_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail="trace not found")
+        return trace
+
     @app.post("/v1/chaos/inject")
     def chaos_inject(body: InjectRequest) -> dict[str, Any]:
         try:
@@ -0,0 +1,303 @@
+"""Benchmarks — metrics, sketch accuracy, memory, telemetry overhead, trace queries."""
+
+from __future__ import annotations
+
+import functools
+import heapq
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from .exporter import JsonLinesSink, LoggerSink, SpanRecord, TelemetryExporter
+from .models import MetricsRegistry, RequestContext, TelemetryMiddleware
+from .trace_store import TraceStore
+
+
+class _ListRegistry:
+    """The original registry: every duration appended to a per-route list."""
+
+    def __init__(self) -> None:
+        self.requests_total: dict[tuple[str, str], int] = {}
+        self.duration_histogram: dict[str, list[float]] = {}
+
+    def record_request(self, route: str, status: str, duration_s: float) -> None:
+        key = (route, status)
+        self.requests_total[key] = self.requests_total.get(key, 0) + 1
+        self.duration_histogram.setdefault(route, []).append(duration_s)
+
+
+def _latencies(count: int, seed: int = 14) -> list[float]:
+    # Log-normal around ~20 ms with a long tail, like real request latency.
+    rng = random.Random(seed)
+    return [rng.lognormvariate(-4.0, 0.8) for _ in range(count)]
+
+
+def benchmark_record(samples: int = 200_000, threads: int = 4) -> dict[str, Any]:
+    """ns per ``record_request`` on one thread and split across ``threads``."""
+    values = _latencies(samples)
+    results: dict[str, Any] = {"samples": samples, "threads": threads}
+
+    for label, factory in (("list", _ListRegistry), ("histogram", MetricsRegistry)):
+        registry = factory()
+        started = time.perf_counter()
+        for v in values:
+            registry.record_request("/api", "200", v)
+        results[f"{label}_ns_per_op"] = round((time.perf_counter() - started) * 1e9 / samples)
+
+    registry = MetricsRegistry()
+    per_thread = samples // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def writer(offset: int) -> None:
+        chunk = values[offset : offset + per_thread]
+        barrier.wait()
+        for v in chunk:
+            registry.record_request("/api", "200", v)
+
+    workers = [threading.Thread(target=writer, args=(i * per_thread,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    recorded = registry.requests_total[("/api", "200")]
+    results["histogram_threaded_ns_per_op"] = round(elapsed * 1e9 / recorded)
+    results["threaded_count_exact"] = recorded == per_thread * threads
+    return results
+
+
+def benchmark_accuracy(
+    samples: int = 200_000, quantiles: tuple[float, ...] = (0.5, 0.9, 0.99, 0.999)
+) -> list[dict[str, Any]]:
+    """Sketch quantile vs the exact sorted-sample quantile."""
+    values = _latencies(samples)
+    registry = MetricsRegistry()
+    for v in values:
+        registry.record_request("/api", "200", v)
+    ordered = sorted(values)
+    rows = []
+    for q in quantiles:
+        exact = ordered[int(q * (len(ordered) - 1))]
+        estimate = registry.quantile("/api", q)
+        rows.append(
+            {
+                "quantile": q,
+                "exact_ms": round(exact * 1000, 3),
+                "sketch_ms": round(estimate * 1000, 3),
+                "relative_error": round(abs(estimate - exact) / exact, 5),
+            }
+        )
+    return rows
+
+
+def benchmark_memory(sample_counts: tuple[int, ...] = (10_000, 100_000, 1_000_000)) -> list[dict]:
+    """Bytes retained by one route's series after ``n`` samples, list vs histogram."""
+    rows = []
+    for n in sample_counts:
+        values = _latencies(n)
+        row: dict[str, Any] = {"samples": n}
+        for label, factory in (("list", _ListRegistry), ("histogram", MetricsRegistry)):
+            tracemalloc.start()
+            registry = factory()
+            for v in values:
+                registry.record_request("/api", "200", v)
+            row[f"{label}_kib"] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+            tracemalloc.stop()
+            del registry
+        rows.append(row)
+    return rows
+
+
+def _percentiles(samples_ns: list[int]) -> dict[str, float]:
+    ordered = sorted(samples_ns)
+    return {
+        "mean_us": round(sum(ordered) / len(ordered) / 1000, 2),
+        "p50_us": round(ordered[len(ordered) // 2] / 1000, 2),
+        "p99_us": round(ordered[int(len(ordered) * 0.99)] / 1000, 2),
+    }
+
+
+def benchmark_telemetry(requests: int = 20_000, burst_capacity: int = 1_000) -> list[dict]:
+    """Request-path cost of ``TelemetryMiddleware.handle``: inline vs buffered export.
+
+    Both modes log to a temporary file through the ``lab-014`` logger. ``inline`` is
+    the original path (``json.dumps`` + ``logger.info`` + trace sink per request);
+    ``buffered`` enqueues to ``TelemetryExporter``, which also writes OTLP JSON lines.
+    ``burst`` submits ``requests`` spans into a ``burst_capacity`` buffer with the
+    flusher stopped, to show drops are counted instead of blocking.
+    """
+    fd, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    otlp_path = log_path + ".otlp.jsonl"
+    logger = logging.getLogger("lab-014")
+    handler = logging.FileHandler(log_path)
+    saved = (logger.level, logger.propagate)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    contexts = [RequestContext() for _ in range(requests)]
+    rows = []
+    try:
+        for mode in ("inline", "buffered"):
+            exporter = None
+            if mode == "inline":
+                traces: deque[dict[str, Any]] = deque(maxlen=100)
+                middleware = TelemetryMiddleware(MetricsRegistry(), trace_sink=traces.appendleft)
+            else:
+                exporter = TelemetryExporter([LoggerSink(logger), JsonLinesSink(otlp_path)])
+                middleware = TelemetryMiddleware(MetricsRegistry(), exporter=exporter)
+            timings = []
+            clock = time.perf_counter_ns
+            started = time.perf_counter()
+            for ctx in contexts:
+                t0 = clock()
+                middleware.handle("/checkout", ctx)
+                timings.append(clock() - t0)
+            elapsed = time.perf_counter() - started
+            row: dict[str, Any] = {"mode": mode, "requests": requests, **_percentiles(timings)}
+            row["requests_per_sec"] = round(requests / elapsed)
+            if exporter is not None:
+                exporter.close()
+                stats = exporter.stats()
+                row.update(exported=stats["exported"], dropped=stats["dropped"])
+            rows.append(row)
+
+        exporter = TelemetryExporter([LoggerSink(logger)], capacity=burst_capacity, autostart=False)
+        start_ns = time.time_ns()
+        for i in range(requests):
+            exporter.submit(uuid.uuid4().hex, "span", "req", "/checkout", "200", start_ns, 0.001)
+        burst = {"mode": "burst", "requests": requests, **exporter.stats()}
+        burst["flushed"] = exporter.flush()
+        rows.append(burst)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        logger.setLevel(saved[0])
+        logger.propagate = saved[1]
+        for path in (log_path, otlp_path):
+            if os.path.exists(path):
+                os.unlink(path)
+    return rows
+
+
+TRACE_ROUTES = ("/checkout", "/api", "/orders", "/cart", "/search", "/login", "/health", "/profile")
+
+
+def _synthetic_spans(spans: int, span_age_s: float, seed: int = 25) -> list[SpanRecord]:
+    """Traces of one root and two child spans, finishing evenly over ``span_age_s``.
+
+    Roots are log-normal (~20 ms median) with 2% 5xx; children end before their root,
+    as they do in a real exporter stream.
+    """
+    rng = random.Random(seed)
+    now = time.time_ns()
+    records = []
+    for i in range(spans // 3):
+        trace_id = f"{i:032x}"
+        root_id = f"{i:015x}r"
+        duration = rng.lognormvariate(-4.0, 0.8)
+        end_ns = now - int(span_age_s * 1e9 * (1 - i / (spans // 3)))
+        start_ns = end_ns - int(duration * 1e9)
+        route = TRACE_ROUTES[i % len(TRACE_ROUTES)]
+        status = "500" if rng.random() < 0.02 else "200"
+        for child in ("db", "cache"):
+            records.append(
+                SpanRecord(
+                    trace_id, f"{i:015x}{child[0]}", "req", child, "200",
+                    start_ns, duration / 3, root_id,
+                )
+            )
+        records.append(SpanRecord(trace_id, root_id, "req", route, status, start_ns, duration))
+    return records
+
+
+def benchmark_trace_store(
+    spans: int = 1_000_000, span_age_s: float = 1800, repeats: int = 200
+) -> dict[str, Any]:
+    """Ingest ``spans`` spans (spread over the last ``span_age_s``) and time queries.
+
+    Each query is run ``repeats`` times; p50/p99 are reported. ``linear scan`` is the
+    same "slowest error traces on /checkout in 5 min" answered by filtering every span,
+    which is what the old flat trace buffer would have to do at this size.
+    """
+    records = _synthetic_spans(spans, span_age_s)
+    store = TraceStore(max_spans=len(records))
+    started = time.perf_counter()
+    for i in range(0, len(records), 512):
+        store.add_batch(records[i : i + 512])
+    ingest = time.perf_counter() - started
+    now_ns = time.time_ns()
+
+    queries = {
+        "slowest 20 error traces on /checkout, last 5 min": dict(
+            route="/checkout", status="error", window_s=300, order="slowest"
+        ),
+        "slowest 20 traces on /api, last 5 min": dict(route="/api", window_s=300, order="slowest"),
+        "slowest 20 traces, any route, all time": dict(order="slowest"),
+        "20 most recent error traces": dict(status="error", order="recent"),
+    }
+    results: dict[str, Any] = {
+        "spans": len(records),
+        "traces": store.stats()["traces"],
+        "ingest_spans_per_sec": round(len(records) / ingest),
+        "queries": {},
+    }
+
+    def timed(fn: Callable[[], object]) -> dict[str, float]:
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter_ns()
+            fn()
+            samples.append(time.perf_counter_ns() - t0)
+        samples.sort()
+        return {
+            "p50_ms": round(samples[len(samples) // 2] / 1e6, 3),
+            "p99_ms": round(samples[int(len(samples) * 0.99)] / 1e6, 3),
+        }
+
+    for label, params in queries.items():
+        run = functools.partial(store.query, limit=20, now_ns=now_ns, **params)
+        results["queries"][label] = {"returned": len(run()), **timed(run)}
+
+    sample_trace = records[len(records) // 2].trace_id
+    results["queries"]["get_trace (span tree)"] = timed(lambda: store.get_trace(sample_trace))
+
+    cutoff = now_ns - 300 * 10**9
+
+    def linear_scan() -> list[SpanRecord]:
+        return heapq.nlargest(
+            20,
+            (
+                r
+                for r in records
+                if not r.parent_span_id
+                and r.route == "/checkout"
+                and r.status.startswith("5")
+                and r.end_ns >= cutoff
+            ),
+            key=lambda r: r.duration_s,
+        )
+
+    expected = [r.trace_id for r in linear_scan()]
+    got = [
+        t["trace_id"]
+        for t in store.query(
+            route="/checkout", status="error", window_s=300, order="slowest", now_ns=now_ns
+        )
+    ]
+    t0 = time.perf_counter()
+    for _ in range(3):
+        linear_scan()
+    results["linear_scan_ms"] = round((time.perf_counter() - t0) / 3 * 1000, 1)
+    results["matches_linear_scan"] = got == expected
+    return results
@@ -0,0 +1,375 @@
+"""Buffered telemetry exporter — ring buffer, background flush, per-trace sampling."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from .threadlocal import ThreadCounters
+
+SERVICE_NAME = "lab-014-observability"
+
+
+class SpanRecord(NamedTuple):
+    """One finished request span; the request path enqueues the bare tuple."""
+
+    trace_id: str
+    span_id: str
+    request_id: str
+    route: str
+    status: str
+    start_ns: int
+    duration_s: float
+    parent_span_id: str = ""  # empty for the root span of a trace
+
+    @property
+    def is_error(self) -> bool:
+        return self.status.startswith("5")
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int(self.duration_s * 1e9)
+
+    def log_entry(self) -> dict[str, Any]:
+        """The structured log line the middleware used to write inline."""
+        entry = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "request_id": self.request_id,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": round(self.duration_s * 1000, 2),
+        }
+        if self.parent_span_id:
+            entry["parent_span_id"] = self.parent_span_id
+        return entry
+
+    def otlp_span(self) -> dict[str, Any]:
+        return {
+            "traceId": self.trace_id.replace("-", ""),
+            "spanId": self.span_id.replace("-", ""),
+            "parentSpanId": self.parent_span_id.replace("-", ""),
+            "name": self.route,
+            "kind": 3 if self.parent_span_id else 2,  # SPAN_KIND_CLIENT / SERVER
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self),
+            "status": {"code": 2 if self.is_error else 1},  # ERROR / OK
+        }
+
+    def otlp_log(self) -> dict[str, Any]:
+        return {
+            "timeUnixNano": str(self.start_ns),
+            "severityText": "ERROR" if self.is_error else "INFO",
+            "body": {"stringValue": json.dumps(self.log_entry())},
+            "traceId": self.trace_id.replace("-", ""),
+            "spanId": self.span_id.replace("-", ""),
+            "attributes": _attributes(self),
+        }
+
+
+def _attributes(record: SpanRecord) -> list[dict[str, Any]]:
+    return [
+        {"key": "http.route", "value": {"stringValue": record.route}},
+        {"key": "http.response.status_code", "value": {"intValue": record.status}},
+        {"key": "request.id", "value": {"stringValue": record.request_id}},
+    ]
+
+
+Sink = Callable[[list[SpanRecord]], None]
+
+
+class LoggerSink:
+    """Writes each record as the JSON log line ``TelemetryMiddleware`` used to emit."""
+
+    def __init__(self, logger: logging.Logger | None = None) -> None:
+        self.logger = logger or logging.getLogger("lab-014")
+
+    def __call__(self, batch: list[SpanRecord]) -> None:
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        for record in batch:
+            self.logger.info(json.dumps(record.log_entry()))
+
+
+class JsonLinesSink:
+    """OTLP/JSON file export, one ``ExportTraceServiceRequest`` and one
+    ``ExportLogsServiceRequest`` per batch — the collector's file-exporter layout."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._resource = {
+            "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+        }
+
+    def __call__(self, batch: list[SpanRecord]) -> None:
+        scope = {"name": "lab-014"}
+        traces = {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [{"scope": scope, "spans": [r.otlp_span() for r in batch]}],
+                }
+            ]
+        }
+        logs = {
+            "resourceLogs": [
+                {
+                    "resource": self._resource,
+                    "scopeLogs": [{"scope": scope, "logRecords": [r.otlp_log() for r in batch]}],
+                }
+            ]
+        }
+        self._file.write(json.dumps(traces, separators=(",", ":")) + "\n")
+        self._file.write(json.dumps(logs, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def head_sampled(trace_id: str, rate: float) -> bool:
+    """Deterministic per trace, so every service keeps or drops the same traces."""
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    return zlib.crc32(trace_id.encode()) < rate * 0x1_0000_0000
+
+
+_SUBMITTED, _DROPPED = 0, 1
+
+
+class _PendingTrace:
+    __slots__ = ("spans", "keep", "first_seen")
+
+    def __init__(self, first_seen: float) -> None:
+        self.spans: list[SpanRecord] = []
+        self.keep = False
+        self.first_seen = first_seen
+
+
+class TelemetryExporter:
+    """Takes finished spans off the request path and exports them in batches.
+
+    ``submit`` is all the request thread does: a capacity check and a ``deque.append``
+    of a tuple — no JSON, no logging, no lock. A daemon thread wakes every
+    ``flush_interval_s`` (or when ``batch_size`` records are waiting), drains the buffer,
+    applies sampling and hands each batch to every sink.
+
+    Sampling is per trace, so span trees stay whole. A trace is kept if it is
+    head-sampled at ``head_sample_rate`` (a hash of the trace id); otherwise its spans
+    are held until the root span (no parent) finishes, and the whole trace is kept if
+    any span failed (5xx) or took at least ``slow_threshold_s`` — tail sampling. Spans
+    of a trace whose root does not arrive within ``tail_wait_s`` are decided on what
+    has arrived; late spans of a decided trace follow that decision. The buffer holds
+    ``capacity`` records; when the flusher falls behind, new spans are dropped and
+    counted rather than blocking requests.
+    """
+
+    def __init__(
+        self,
+        sinks: list[Sink] | None = None,
+        capacity: int = 10_000,
+        batch_size: int = 512,
+        flush_interval_s: float = 0.5,
+        head_sample_rate: float = 1.0,
+        slow_threshold_s: float = 0.5,
+        tail_wait_s: float = 30.0,
+        autostart: bool = True,
+    ) -> None:
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("capacity and batch_size must be >= 1")
+        self.sinks: list[Sink] = list(sinks or [])
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.head_sample_rate = head_sample_rate
+        self.slow_threshold_s = slow_threshold_s
+        self.tail_wait_s = tail_wait_s
+        self._buffer: deque[tuple] = deque()
+        self._counters = ThreadCounters("submitted", "dropped")
+        # Tail-sampling state; touched only under ``_flush_lock``.
+        self._pending: OrderedDict[str, _PendingTrace] = OrderedDict()
+        self._decided: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.sampled_out = 0
+        self.exported = 0
+        self.batches = 0
+        self.export_errors = 0
+        self.last_error: str | None = None
+        if autostart:
+            self.start()
+
+    def add_sink(self, sink: Sink) -> None:
+        self.sinks.append(sink)
+
+    def submit(
+        self,
+        trace_id: str,
+        span_id: str,
+        request_id: str,
+        route: str,
+        status: str,
+        start_ns: int,
+        duration_s: float,
+        parent_span_id: str = "",
+    ) -> bool:
+        """Enqueue a finished span; returns False if the buffer was full."""
+        counters = self._counters.shard()
+        counters[_SUBMITTED] += 1
+        buffer = self._buffer
+        # Concurrent producers may overshoot ``capacity`` by one record each.
+        if len(buffer) >= self.capacity:
+            counters[_DROPPED] += 1
+            return False
+        buffer.append(
+            (trace_id, span_id, request_id, route, status, start_ns, duration_s, parent_span_id)
+        )
+        if len(buffer) == self.batch_size:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Export everything buffered now, on the calling thread; returns records sent.
+
+        Spans of tail-sampled traces still waiting for their root stay pending.
+        """
+        sent = 0
+        with self._flush_lock:
+            while self._buffer:
+                sent += self._export_batch()
+            sent += self._expire_pending(time.monotonic())
+        return sent
+
+    def _sample(self, record: SpanRecord, now: float, out: list[SpanRecord]) -> None:
+        trace_id = record.trace_id
+        if head_sampled(trace_id, self.head_sample_rate):
+            out.append(record)
+            return
+        decided = self._decided.get(trace_id)
+        if decided is not None:
+            if decided[0]:
+                out.append(record)
+            else:
+                self.sampled_out += 1
+            return
+        pending = self._pending.get(trace_id)
+        if pending is None:
+            pending = self._pending[trace_id] = _PendingTrace(now)
+        pending.spans.append(record)
+        if record.is_error or record.duration_s >= self.slow_threshold_s:
+            pending.keep = True
+        if not record.parent_span_id:
+            self._decide(trace_id, now, out)
+
+    def _decide(self, trace_id: str, now: float, out: list[SpanRecord]) -> None:
+        pending = self._pending.pop(trace_id)
+        if pending.keep:
+            out.extend(pending.spans)
+        else:
+            self.sampled_out += len(pending.spans)
+        self._decided[trace_id] = (pending.keep, now)
+
+    def _expire_pending(self, now: float, force: bool = False) -> int:
+        """Decide traces whose root is overdue; forget old decisions. Returns sent."""
+        out: list[SpanRecord] = []
+        horizon = now - self.tail_wait_s
+        while self._pending:
+            trace_id, pending = next(iter(self._pending.items()))
+            if not force and pending.first_seen > horizon and len(self._pending) <= self.capacity:
+                break
+            self._decide(trace_id, now, out)
+        while self._decided:
+            _, decided_at = next(iter(self._decided.values()))
+            if decided_at > horizon and len(self._decided) <= self.capacity:
+                break
+            self._decided.popitem(last=False)
+        return self._send(out)
+
+    def _export_batch(self) -> int:
+        buffer = self._buffer
+        now = time.monotonic()
+        batch: list[SpanRecord] = []
+        for _ in range(min(self.batch_size, len(buffer))):
+            self._sample(SpanRecord._make(buffer.popleft()), now, batch)
+        return self._send(batch)
+
+    def _send(self, batch: list[SpanRecord]) -> int:
+        if not batch:
+            return 0
+        for sink in self.sinks:
+            try:
+                sink(batch)
+            except Exception as exc:  # a broken sink must not stop the pipeline
+                self.export_errors += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+        self.exported += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="telemetry-export", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Stop the flusher after a final flush, then close sinks that own files."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        with self._flush_lock:
+            self._expire_pending(time.monotonic(), force=True)
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+    @property
+    def submitted(self) -> int:
+        return self._counters.totals()["submitted"]
+
+    @property
+    def dropped(self) -> int:
+        return self._counters.totals()["dropped"]
+
+    def stats(self) -> dict[str, Any]:
+        counters = self._counters.totals()
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "buffered": len(self._buffer),
+            "capacity": self.capacity,
+            "submitted": counters["submitted"],
+            "pending_traces": len(self._pending),
+            "sampled_out": self.sampled_out,
+            "dropped": counters["dropped"],
+            "exported": self.exported,
+            "batches": self.batches,
+            "export_errors": self.export_errors,
+            "last_error": self.last_error,
+            "head_sample_rate": self.head_sample_rate,
+            "slow_threshold_ms": round(self.slow_threshold_s * 1000, 3),
+        }
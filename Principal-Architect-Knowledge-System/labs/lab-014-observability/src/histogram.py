@@ -0,0 +1,164 @@
+"""Constant-memory latency summaries — fixed-bucket histograms and a DDSketch."""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from dataclasses import dataclass
+from math import ceil, log
+
+# Prometheus client defaults (seconds).
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class DDSketch:
+    """Quantile sketch with relative-error guarantees (Masson et al., DDSketch).
+
+    A value ``x`` lands in bin ``ceil(log_gamma(x))`` with
+    ``gamma = (1 + a) / (1 - a)``, so any quantile is returned within ``a`` relative
+    error of the true sample. Bins are sparse; past ``max_bins`` the lowest two are
+    merged, trading accuracy at the low end (irrelevant for tail latency) for a hard
+    memory bound. Values at or below ``min_value`` are counted as zero.
+    """
+
+    __slots__ = ("relative_accuracy", "max_bins", "min_value", "_gamma", "_inv_log_gamma",
+                 "bins", "zero_count", "count", "min", "max")
+
+    def __init__(
+        self, relative_accuracy: float = 0.01, max_bins: int = 2048, min_value: float = 1e-9
+    ) -> None:
+        if not 0 < relative_accuracy < 1 or max_bins < 2:
+            raise ValueError("relative_accuracy must be in (0, 1) and max_bins >= 2")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1 / math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value > self.min_value:
+            key = ceil(log(value) * self._inv_log_gamma)
+            bins = self.bins
+            if key in bins:
+                bins[key] += 1
+            else:
+                bins[key] = 1
+                if len(bins) > self.max_bins:
+                    self._collapse()
+        else:
+            self.zero_count += 1
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self) -> None:
+        while len(self.bins) > self.max_bins:
+            lowest = min(self.bins)
+            moved = self.bins.pop(lowest)
+            nxt = min(self.bins)
+            self.bins[nxt] += moved
+
+    def merge(self, other: DDSketch) -> None:
+        if other._gamma != self._gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for key, n in list(other.bins.items()):
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(0.0, self.min)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Midpoint (in relative terms) of (gamma^(k-1), gamma^k].
+                value = 2 * self._gamma**key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+@dataclass
+class HistogramSnapshot:
+    """Merged view of one series: cumulative ``le`` counts plus the sketch."""
+
+    buckets: tuple[float, ...]
+    cumulative: list[int]  # one per bucket, then +Inf
+    sum: float
+    count: int
+    sketch: DDSketch
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+
+class HistogramShard:
+    """One writer's share of a histogram series: bucket counts, sum, count, sketch.
+
+    Only its owning thread writes to it, so ``observe`` takes no lock; readers merge
+    all shards at scrape time. Memory is fixed by ``len(buckets)`` and the sketch's
+    ``max_bins`` — independent of how many samples are observed.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count", "sketch")
+
+    def __init__(self, buckets: tuple[float, ...], relative_accuracy: float = 0.01) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.sketch = DDSketch(relative_accuracy)
+
+    def observe(self, value: float) -> None:
+        # ``le`` is inclusive: the first bucket whose bound is >= value.
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.sketch.add(value)
+
+    def merge(self, other: HistogramShard) -> None:
+        """Fold ``other`` (no longer written to) into this shard."""
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.sum += other.sum
+        self.count += other.count
+        self.sketch.merge(other.sketch)
+
+
+def merge_shards(
+    shards: list[HistogramShard], buckets: tuple[float, ...], relative_accuracy: float = 0.01
+) -> HistogramSnapshot:
+    counts = [0] * (len(buckets) + 1)
+    total = 0.0
+    sketch = DDSketch(relative_accuracy)
+    for shard in shards:
+        for i, n in enumerate(list(shard.counts)):
+            counts[i] += n
+        total += shard.sum
+        sketch.merge(shard.sketch)
+    cumulative = []
+    running = 0
+    for n in counts:
+        running += n
+        cumulative.append(running)
+    # _count must equal the +Inf bucket even if a writer raced this scrape.
+    return HistogramSnapshot(buckets, cumulative, total, running, sketch)
@@ -8,6 +8,14 @@ import json
 import logging
 
 from .api import create_app
+from .bench import (
+    benchmark_accuracy,
+    benchmark_memory,
+    benchmark_record,
+    benchmark_telemetry,
+    benchmark_trace_store,
+)
+from .exporter import JsonLinesSink, LoggerSink, TelemetryExporter
 from .service import ObservabilityService
 
 
@@ -33,27 +41,65 @@ def main() -> int:
     parser.add_argument("--inject", choices=["error-spike", "latency-spike"])
     parser.add_argument("--rate", type=float, default=0.5)
     parser.add_argument("--port", type=int, default=8104)
+    parser.add_argument(
+        "--bench", action="store_true", help="Metrics record cost, sketch accuracy, memory"
+    )
+    parser.add_argument("--threads", type=int, default=4, help="Writer threads for --bench")
+    parser.add_argument(
+        "--bench-telemetry", action="store_true", help="Request-path cost, inline vs buffered"
+    )
+    parser.add_argument(
+        "--bench-traces", action="store_true", help="Trace store queries over 1M spans"
+    )
+    parser.add_argument("--export-file", help="Also export OTLP/JSON lines to this file")
+    parser.add_argument(
+        "--sample-rate", type=float, default=1.0, help="Head sampling rate (errors always kept)"
+    )
+    parser.add_argument(
+        "--slow-ms", type=float, default=500, help="Tail sampling: always keep spans this slow"
+    )
     args = parser.parse_args()
 
-    service = ObservabilityService()
+    if args.bench:
+        print(json.dumps(benchmark_record(threads=args.threads)))
+        for row in benchmark_accuracy():
+            print(json.dumps(row))
+        for row in benchmark_memory():
+            print(json.dumps(row))
+        return 0
 
-    if args.inject:
-        print(json.dumps(service.set_injection(args.inject, args.rate), indent=2))
+    if args.bench_telemetry:
+        for row in benchmark_telemetry():
+            print(json.dumps(row))
         return 0
 
-    if args.demo:
-        run_demo(service)
+    if args.bench_traces:
+        print(json.dumps(benchmark_trace_store(), indent=2))
         return 0
 
-    if args.serve:
-        import uvicorn
+    sinks = [LoggerSink()]
+    if args.export_file:
+        sinks.append(JsonLinesSink(args.export_file))
+    exporter = TelemetryExporter(
+        sinks, head_sample_rate=args.sample_rate, slow_threshold_s=args.slow_ms / 1000
+    )
+    service = ObservabilityService(exporter=exporter)
+    try:
+        if args.inject:
+            print(json.dumps(service.set_injection(args.inject, args.rate), indent=2))
+            return 0
+
+        if args.serve:
+            import uvicorn
+
+            app = create_app(service)
+            uvicorn.run(app, host="0.0.0.0", port=args.port)
+            return 0
 
-        app = create_app(service)
-        uvicorn.run(app, host="0.0.0.0", port=args.port)
+        run_demo(service)
         return 0
-
-    run_demo(service)
-    return 0
+    finally:
+        service.close()
 
 
 if __name__ == "__main__":
@@ -4,17 +4,25 @@ from __future__ import annotations
 
 import json
 import logging
+import math
 import time
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Any, Callable
 
+from .exporter import TelemetryExporter
+from .histogram import DEFAULT_BUCKETS, HistogramShard, HistogramSnapshot, merge_shards
+from .threadlocal import ThreadShards
+
 
 @dataclass
 class RequestContext:
     request_id: str = field(default_factory=lambda: str(uuid.uuid4()))
     trace_id: str = ""
     span_id: str = ""
+    parent_span_id: str = ""
 
     def ensure_trace(self) -> None:
         if not self.trace_id:
@@ -22,63 +30,227 @@ class RequestContext:
         if not self.span_id:
             self.span_id = str(uuid.uuid4())[:16]
 
+    def child(self) -> RequestContext:
+        """Context for a span nested under this one (same trace and request)."""
+        self.ensure_trace()
+        return RequestContext(
+            request_id=self.request_id, trace_id=self.trace_id, parent_span_id=self.span_id
+        )
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _ThreadMetrics:
+    """Everything one thread has recorded; only that thread mutates it."""
+
+    __slots__ = ("requests", "durations")
 
-class MetricsRegistry:
     def __init__(self) -> None:
-        self.requests_total: dict[tuple[str, str], int] = {}
-        self.duration_histogram: dict[str, list[float]] = {}
+        self.requests: dict[tuple[str, str], int] = {}
+        self.durations: dict[str, HistogramShard] = {}
+
+    def merge(self, other: _ThreadMetrics) -> None:
+        """Fold ``other`` (its thread has exited) into this shard."""
+        for key, count in other.requests.items():
+            self.requests[key] = self.requests.get(key, 0) + count
+        for route, histogram in other.durations.items():
+            target = self.durations.get(route)
+            if target is None:
+                target = self.durations[route] = HistogramShard(
+                    histogram.buckets, histogram.sketch.relative_accuracy
+                )
+            target.merge(histogram)
+
+
+class MetricsRegistry:
+    """RED metrics with per-thread shards instead of a global lock.
+
+    ``record_request`` touches only the calling thread's shard (see
+    ``threadlocal.ThreadShards``), so concurrent requests never contend. Scrapes merge
+    every shard. Durations go into a fixed-bucket histogram plus a DDSketch per route,
+    so memory per series stays constant however many requests are recorded.
+
+    When a thread exits, its shard is folded into a retired aggregate, so thread churn
+    — e.g. thread-per-request servers or executors retiring idle workers — does not
+    grow memory or scrape cost.
+    """
+
+    def __init__(
+        self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, relative_accuracy: float = 0.01
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.relative_accuracy = relative_accuracy
+        self._shards: ThreadShards[_ThreadMetrics] = ThreadShards(
+            _ThreadMetrics, _ThreadMetrics.merge
+        )
 
     def record_request(self, route: str, status: str, duration_s: float) -> None:
+        shard = self._shards.shard()
+        requests = shard.requests
         key = (route, status)
-        self.requests_total[key] = self.requests_total.get(key, 0) + 1
-        self.duration_histogram.setdefault(route, []).append(duration_s)
+        if key in requests:
+            requests[key] += 1
+        else:
+            requests[key] = 1
+        histogram = shard.durations.get(route)
+        if histogram is None:
+            histogram = shard.durations[route] = HistogramShard(
+                self.buckets, self.relative_accuracy
+            )
+        histogram.observe(duration_s)
+
+    @property
+    def requests_total(self) -> dict[tuple[str, str], int]:
+        totals: dict[tuple[str, str], int] = {}
+        with self._shards.locked() as shards:
+            for shard in shards:
+                for key, count in shard.requests.copy().items():
+                    totals[key] = totals.get(key, 0) + count
+        return totals
+
+    def histogram(self, route: str) -> HistogramSnapshot:
+        with self._shards.locked() as shards:
+            found = [h for shard in shards if (h := shard.durations.get(route)) is not None]
+            return merge_shards(found, self.buckets, self.relative_accuracy)
 
-    def prometheus_text(self) -> str:
+    def thread_shards(self) -> int:
+        """Live per-thread shards (excluding the retired aggregate)."""
+        return self._shards.live_count()
+
+    def routes(self) -> list[str]:
+        with self._shards.locked() as shards:
+            return sorted({route for shard in shards for route in shard.durations.copy()})
+
+    def quantile(self, route: str, q: float) -> float:
+        return self.histogram(route).quantile(q)
+
+    def prometheus_text(self, quantiles: tuple[float, ...] = (0.5, 0.9, 0.99)) -> str:
         lines = [
             "# HELP http_requests_total Total HTTP requests",
             "# TYPE http_requests_total counter",
         ]
         for (route, status), count in sorted(self.requests_total.items()):
-            lines.append(f'http_requests_total{{route="{route}",status="{status}"}} {count}')
+            lines.append(
+                f'http_requests_total{{route="{_label(route)}",status="{_label(status)}"}} {count}'
+            )
+        snapshots = [(route, self.histogram(route)) for route in self.routes()]
         lines.extend([
-            "# HELP http_request_duration_seconds Request duration histogram samples",
-            "# TYPE http_request_duration_seconds gauge",
+            "# HELP http_request_duration_seconds Request duration histogram",
+            "# TYPE http_request_duration_seconds histogram",
         ])
-        for route, durations in sorted(self.duration_histogram.items()):
-            if durations:
+        for route, snap in snapshots:
+            label = _label(route)
+            for bound, cumulative in zip((*snap.buckets, math.inf), snap.cumulative):
+                le = "+Inf" if bound == math.inf else repr(float(bound))
                 lines.append(
-                    f'http_request_duration_seconds{{route="{route}"}} {durations[-1]:.6f}'
+                    f'http_request_duration_seconds_bucket{{route="{label}",le="{le}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(f'http_request_duration_seconds_sum{{route="{label}"}} {snap.sum:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{route="{label}"}} {snap.count}')
+        lines.extend([
+            "# HELP http_request_duration_quantile_seconds Sketch-estimated duration quantiles",
+            "# TYPE http_request_duration_quantile_seconds gauge",
+        ])
+        for route, snap in snapshots:
+            for q in quantiles:
+                lines.append(
+                    f'http_request_duration_quantile_seconds{{route="{_label(route)}",'
+                    f'quantile="{q}"}} {snap.quantile(q):.6f}'
                 )
         return "\n".join(lines) + "\n"
 
 
 class TelemetryMiddleware:
+    """Times each request and records RED metrics, then emits the span.
+
+    With an ``exporter`` the span is only enqueued (see ``TelemetryExporter``); logging
+    and sinks run on the exporter's thread. Without one, the original synchronous path
+    is kept: ``json.dumps`` + ``logger.info`` and ``trace_sink`` inline.
+    """
+
     def __init__(
         self,
         metrics: MetricsRegistry,
         trace_sink: Callable[[dict[str, Any]], None] | None = None,
+        exporter: TelemetryExporter | None = None,
     ) -> None:
         self.metrics = metrics
         self.logger = logging.getLogger("lab-014")
         self.trace_sink = trace_sink
+        self.exporter = exporter
 
-    def handle(self, route: str, ctx: RequestContext, status: str = "200") -> dict[str, Any]:
+    def handle(
+        self,
+        route: str,
+        ctx: RequestContext,
+        status: str = "200",
+        work: Callable[[RequestContext], None] | None = None,
+    ) -> dict[str, Any]:
+        """Run ``work`` (the handler body, if any) inside the request span.
+
+        If ``work`` raises, the request is recorded and emitted as ``"500"`` and the
+        exception propagates.
+        """
         ctx.ensure_trace()
+        start_ns = time.time_ns()
         start = time.monotonic()
         try:
+            if work is not None:
+                work(ctx)
             result: dict[str, Any] = {"route": route, "ok": status == "200"}
+        except Exception:
+            status = "500"
+            raise
         finally:
             duration = time.monotonic() - start
             self.metrics.record_request(route, status, duration)
-            entry = {
-                "trace_id": ctx.trace_id,
-                "span_id": ctx.span_id,
-                "request_id": ctx.request_id,
-                "route": route,
-                "status": status,
-                "duration_ms": round(duration * 1000, 2),
-            }
-            self.logger.info(json.dumps(entry))
-            if self.trace_sink:
-                self.trace_sink(entry)
+            self._emit(ctx, route, status, start_ns, duration)
         return result
+
+    @contextmanager
+    def span(self, parent: RequestContext, name: str) -> Iterator[RequestContext]:
+        """Child span (e.g. a downstream call) inside a request; no RED metrics."""
+        ctx = parent.child()
+        ctx.ensure_trace()
+        start_ns = time.time_ns()
+        start = time.monotonic()
+        status = "200"
+        try:
+            yield ctx
+        except Exception:
+            status = "500"
+            raise
+        finally:
+            self._emit(ctx, name, status, start_ns, time.monotonic() - start)
+
+    def _emit(
+        self, ctx: RequestContext, route: str, status: str, start_ns: int, duration: float
+    ) -> None:
+        if self.exporter is not None:
+            self.exporter.submit(
+                ctx.trace_id,
+                ctx.span_id,
+                ctx.request_id,
+                route,
+                status,
+                start_ns,
+                duration,
+                ctx.parent_span_id,
+            )
+            return
+        entry = {
+            "trace_id": ctx.trace_id,
+            "span_id": ctx.span_id,
+            "request_id": ctx.request_id,
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if ctx.parent_span_id:
+            entry["parent_span_id"] = ctx.parent_span_id
+        self.logger.info(json.dumps(entry))
+        if self.trace_sink:
+            self.trace_sink(entry)
@@ -3,37 +3,48 @@
 from __future__ import annotations
 
 import random
-from collections import deque
+import time
 from typing import Any
 
+from .exporter import LoggerSink, TelemetryExporter
 from .models import MetricsRegistry, RequestContext, TelemetryMiddleware
+from .trace_store import TraceStore
 
 
 class ObservabilityService:
-    """Instrumented service with metrics, logs, and trace buffer."""
+    """Instrumented service with metrics, logs, and a trace store.
 
-    def __init__(self, trace_buffer_size: int = 100) -> None:
+    Spans leave the request path through ``exporter`` (JSON logs by default); the
+    trace store is one of its sinks, so trace queries flush first.
+    """
+
+    def __init__(
+        self, max_spans: int = 100_000, exporter: TelemetryExporter | None = None
+    ) -> None:
         self.metrics = MetricsRegistry()
-        self.traces: deque[dict[str, Any]] = deque(maxlen=trace_buffer_size)
-        self.middleware = TelemetryMiddleware(self.metrics, trace_sink=self._record_trace)
+        self.traces = TraceStore(max_spans)
+        if exporter is None:
+            exporter = TelemetryExporter([LoggerSink()])
+        self.exporter = exporter
+        self.exporter.add_sink(self.traces)
+        self.middleware = TelemetryMiddleware(self.metrics, exporter=self.exporter)
         self.error_spike_rate = 0.0
         self.latency_spike_ms = 0.0
         self.simulations_total = 0
 
-    def _record_trace(self, entry: dict[str, Any]) -> None:
-        self.traces.appendleft(entry)
+    def _call_downstream(self, ctx: RequestContext) -> None:
+        with self.middleware.span(ctx, "downstream"):
+            time.sleep(self.latency_spike_ms / 1000.0)
 
     def simulate_request(self, route: str) -> dict[str, Any]:
-        import time
-
         self.simulations_total += 1
         ctx = RequestContext()
         status = "200"
         if self.error_spike_rate > 0 and random.random() < self.error_spike_rate:
             status = "500"
-        if self.latency_spike_ms > 0:
-            time.sleep(self.latency_spike_ms / 1000.0)
-        result = self.middleware.handle(route, ctx, status=status)
+        # A latency spike is a slow downstream call: a child span inside the request.
+        work = self._call_downstream if self.latency_spike_ms > 0 else None
+        result = self.middleware.handle(route, ctx, status=status, work=work)
         return {
             **result,
             "status": status,
@@ -41,8 +52,22 @@ class ObservabilityService:
             "request_id": ctx.request_id,
         }
 
-    def get_traces(self, limit: int = 20) -> list[dict[str, Any]]:
-        return list(self.traces)[:limit]
+    def get_traces(
+        self,
+        limit: int = 20,
+        route: str | None = None,
+        status: str | None = None,
+        window_s: float | None = None,
+        order: str = "recent",
+    ) -> list[dict[str, Any]]:
+        self.exporter.flush()
+        return self.traces.query(
+            route=route, status=status, window_s=window_s, order=order, limit=limit
+        )
+
+    def get_trace(self, trace_id: str) -> dict[str, Any] | None:
+        self.exporter.flush()
+        return self.traces.get_trace(trace_id)
 
     def get_metrics_text(self) -> str:
         return self.metrics.prometheus_text()
@@ -65,8 +90,12 @@ class ObservabilityService:
     def stats(self) -> dict[str, Any]:
         return {
             "simulations_total": self.simulations_total,
-            "trace_buffer_size": len(self.traces),
+            "trace_store": self.traces.stats(),
             "metric_series": len(self.metrics.requests_total),
             "error_spike_rate": self.error_spike_rate,
             "latency_spike_ms": self.latency_spike_ms,
+            "telemetry": self.exporter.stats(),
         }
+
+    def close(self) -> None:
+        self.exporter.close()
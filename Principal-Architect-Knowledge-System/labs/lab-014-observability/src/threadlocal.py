@@ -0,0 +1,111 @@
+"""Per-thread state that is folded back into a shared total when its thread exits."""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _ExitToken:
+    """Lives only in a thread's ``threading.local``; collected when the thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+def on_thread_exit(local: threading.local, callback: Callable[..., Any], *args: Any) -> None:
+    """Call ``callback(*args)`` once the current thread has exited.
+
+    CPython clears a thread's ``threading.local`` values when the thread ends; a token
+    stored there with a ``weakref.finalize`` fires at that point. Pass weak references
+    in ``args`` so the callback does not keep its owner alive.
+    """
+    token = local.exit_token = _ExitToken()
+    weakref.finalize(token, callback, *args)
+
+
+class ThreadShards(Generic[T]):
+    """One ``factory()`` shard per writing thread, plus a retired aggregate.
+
+    ``shard()`` returns the calling thread's shard, creating it on first use; only that
+    thread mutates it, so writers take no lock. When the thread exits its shard is
+    folded into ``retired`` with ``fold(retired, shard)`` and dropped, so thread churn
+    does not grow memory or read cost. Readers iterate ``locked()``, which holds the
+    lock so a shard being retired is neither counted twice nor missed.
+    """
+
+    def __init__(self, factory: Callable[[], T], fold: Callable[[T, T], None]) -> None:
+        self._factory = factory
+        self._fold = fold
+        self._local = threading.local()
+        self.retired = factory()
+        self._live: list[T] = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> T:
+        try:
+            return self._local.shard
+        except AttributeError:
+            return self._register_thread()
+
+    def _register_thread(self) -> T:
+        shard = self._local.shard = self._factory()
+        on_thread_exit(self._local, _retire_shard, weakref.ref(self), shard)
+        with self._lock:
+            self._live.append(shard)
+        return shard
+
+    def _retire(self, shard: T) -> None:
+        with self._lock:
+            self._live.remove(shard)
+            self._fold(self.retired, shard)
+
+    @contextmanager
+    def locked(self) -> Iterator[list[T]]:
+        """The retired aggregate and every live shard, under the lock."""
+        with self._lock:
+            yield [self.retired, *self._live]
+
+    def live_count(self) -> int:
+        with self._lock:
+            return len(self._live)
+
+
+def _retire_shard(shards_ref: weakref.ref[ThreadShards[Any]], shard: Any) -> None:
+    shards = shards_ref()
+    if shards is not None:
+        shards._retire(shard)
+
+
+def _add_counts(total: list[int], shard: list[int]) -> None:
+    for i, n in enumerate(shard):
+        total[i] += n
+
+
+class ThreadCounters:
+    """Named counters with one shard per writing thread, summed on read.
+
+    Each thread increments only its own list, so no update is lost and the hot path
+    takes no lock.
+    """
+
+    def __init__(self, *names: str) -> None:
+        self.names = names
+        self._shards: ThreadShards[list[int]] = ThreadShards(
+            lambda: [0] * len(names), _add_counts
+        )
+
+    def shard(self) -> list[int]:
+        """The calling thread's counters, indexed like ``names``."""
+        return self._shards.shard()
+
+    def totals(self) -> dict[str, int]:
+        sums = [0] * len(self.names)
+        with self._shards.locked() as shards:
+            for shard in shards:
+                _add_counts(sums, shard)
+        return dict(zip(self.names, sums))
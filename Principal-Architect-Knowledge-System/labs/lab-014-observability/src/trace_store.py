@@ -0,0 +1,235 @@
+"""Bounded trace store — span trees indexed by trace, route, status and duration."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from .exporter import SpanRecord
+
+# Root spans are indexed in log-spaced duration buckets: 1 µs, then x1.25 up to ~1000 s.
+BUCKET_GROWTH = 1.25
+BUCKET_FLOOR_S = 1e-6
+BUCKET_COUNT = 96
+
+_INV_LOG_GROWTH = 1 / math.log(BUCKET_GROWTH)
+
+
+def duration_bucket(duration_s: float) -> int:
+    if duration_s <= BUCKET_FLOOR_S:
+        return 0
+    return min(BUCKET_COUNT - 1, int(math.log(duration_s / BUCKET_FLOOR_S) * _INV_LOG_GROWTH) + 1)
+
+
+def _bucket_upper_s(bucket: int) -> float:
+    return BUCKET_FLOOR_S * BUCKET_GROWTH**bucket if bucket < BUCKET_COUNT - 1 else math.inf
+
+
+def _status_matches(status: str, wanted: str | None) -> bool:
+    if wanted is None:
+        return True
+    if wanted == "error":
+        return status.startswith("5")
+    return status == wanted
+
+
+class TraceStore:
+    """The most recent ``max_spans`` spans, grouped into traces, with query indexes.
+
+    Spans live in a fixed ring; each gets a sequence number and the oldest is evicted
+    when the ring is full, so memory is bounded by ``max_spans``. Indexes:
+
+    - ``trace_id`` → sequence numbers of its live spans (for the span tree);
+    - per ``(route, status)`` of the root span, ``BUCKET_COUNT`` duration buckets, each
+      a deque of ``(seq, end_ns, duration_s)`` in arrival order, plus one arrival-order
+      deque for "most recent" queries.
+
+    "Slowest N" walks buckets from the slowest down and stops once N candidates are in
+    hand (every lower bucket is strictly faster); within a bucket it reads newest-first
+    and stops at the time-window edge. A query therefore touches roughly the matching
+    traces in its top buckets, not the whole store. Index entries of evicted spans are
+    recognised by ``seq < floor`` and trimmed lazily.
+
+    The exporter thread adds batches (the store is an exporter sink); one lock guards
+    writes and queries.
+    """
+
+    def __init__(self, max_spans: int = 100_000) -> None:
+        if max_spans < 1:
+            raise ValueError("max_spans must be >= 1")
+        self.max_spans = max_spans
+        self._spans: list[SpanRecord | None] = [None] * max_spans
+        self._next_seq = 0
+        self._by_trace: dict[str, list[int]] = {}
+        self._by_duration: dict[tuple[str, str], list[deque[tuple[int, int, float]]]] = {}
+        self._by_arrival: dict[tuple[str, str], deque[tuple[int, int, float]]] = {}
+        self._lock = threading.Lock()
+        self._since_trim = 0
+
+    @property
+    def _floor(self) -> int:
+        """Lowest sequence number still in the ring."""
+        return max(0, self._next_seq - self.max_spans)
+
+    def __call__(self, batch: list[SpanRecord]) -> None:
+        self.add_batch(batch)
+
+    def add_batch(self, batch: list[SpanRecord]) -> None:
+        with self._lock:
+            for record in batch:
+                self._add(record)
+
+    def add(self, record: SpanRecord) -> None:
+        with self._lock:
+            self._add(record)
+
+    def _add(self, record: SpanRecord) -> None:
+        seq = self._next_seq
+        slot = seq % self.max_spans
+        evicted = self._spans[slot]
+        if evicted is not None:
+            self._unlink(evicted, seq - self.max_spans)
+        self._spans[slot] = record
+        self._next_seq = seq + 1
+        seqs = self._by_trace.get(record.trace_id)
+        if seqs is None:
+            self._by_trace[record.trace_id] = [seq]
+        else:
+            seqs.append(seq)
+        if not record.parent_span_id:
+            self._index_root(seq, record)
+        self._since_trim += 1
+        if self._since_trim >= self.max_spans:
+            self._trim_all()
+
+    def _unlink(self, record: SpanRecord, seq: int) -> None:
+        seqs = self._by_trace.get(record.trace_id)
+        if seqs is None:
+            return
+        if seqs[0] == seq:
+            seqs.pop(0)
+        elif seq in seqs:
+            seqs.remove(seq)
+        if not seqs:
+            del self._by_trace[record.trace_id]
+
+    def _index_root(self, seq: int, record: SpanRecord) -> None:
+        key = (record.route, record.status)
+        buckets = self._by_duration.get(key)
+        if buckets is None:
+            buckets = self._by_duration[key] = [deque() for _ in range(BUCKET_COUNT)]
+            self._by_arrival[key] = deque()
+        entry = (seq, record.end_ns, record.duration_s)
+        floor = self._floor
+        for index in (buckets[duration_bucket(record.duration_s)], self._by_arrival[key]):
+            while index and index[0][0] < floor:
+                index.popleft()
+            index.append(entry)
+
+    def _trim_all(self) -> None:
+        """Drop evicted entries from indexes that have not been appended to lately."""
+        self._since_trim = 0
+        floor = self._floor
+        for key, buckets in list(self._by_duration.items()):
+            for index in (*buckets, self._by_arrival[key]):
+                while index and index[0][0] < floor:
+                    index.popleft()
+            if not self._by_arrival[key]:
+                del self._by_duration[key]
+                del self._by_arrival[key]
+
+    def query(
+        self,
+        route: str | None = None,
+        status: str | None = None,
+        window_s: float | None = None,
+        min_duration_s: float | None = None,
+        order: str = "recent",
+        limit: int = 20,
+        now_ns: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Traces whose root span matches, newest first or slowest first.
+
+        ``status`` is an exact status code or ``"error"`` for any 5xx; ``window_s``
+        keeps traces that finished in the last ``window_s`` seconds.
+        """
+        if order not in ("recent", "slowest"):
+            raise ValueError("order must be 'recent' or 'slowest'")
+        cutoff = -1
+        if window_s is not None:
+            cutoff = (now_ns if now_ns is not None else time.time_ns()) - int(window_s * 1e9)
+        min_duration = min_duration_s or 0.0
+        with self._lock:
+            floor = self._floor
+            keys = [
+                key
+                for key in self._by_arrival
+                if (route is None or key[0] == route) and _status_matches(key[1], status)
+            ]
+            if order == "recent":
+                found: list[tuple[int, int]] = []
+                for key in keys:
+                    taken = 0
+                    for seq, end_ns, duration in reversed(self._by_arrival[key]):
+                        if seq < floor or end_ns < cutoff or taken >= limit:
+                            break
+                        if duration >= min_duration:
+                            found.append((end_ns, seq))
+                            taken += 1
+                found.sort(reverse=True)
+                return [self._summary(seq) for _, seq in found[:limit]]
+
+            candidates: list[tuple[float, int]] = []
+            for bucket in range(BUCKET_COUNT - 1, -1, -1):
+                if _bucket_upper_s(bucket) < min_duration:
+                    break
+                for key in keys:
+                    for seq, end_ns, duration in reversed(self._by_duration[key][bucket]):
+                        if seq < floor or end_ns < cutoff:
+                            break
+                        if duration >= min_duration:
+                            candidates.append((duration, seq))
+                if len(candidates) >= limit:
+                    break  # every remaining bucket is faster than these
+            candidates.sort(reverse=True)
+            return [self._summary(seq) for _, seq in candidates[:limit]]
+
+    def _summary(self, seq: int) -> dict[str, Any]:
+        root = self._spans[seq % self.max_spans]
+        assert root is not None
+        return {**root.log_entry(), "span_count": len(self._by_trace.get(root.trace_id, ()))}
+
+    def get_trace(self, trace_id: str) -> dict[str, Any] | None:
+        """The trace as a span tree: each span with its ``children``, by start time."""
+        with self._lock:
+            seqs = self._by_trace.get(trace_id)
+            if not seqs:
+                return None
+            spans = [self._spans[seq % self.max_spans] for seq in seqs]
+        nodes = {}
+        for span in spans:
+            nodes[span.span_id] = {**span.log_entry(), "start_ns": span.start_ns, "children": []}
+        roots = []
+        for span in sorted(spans, key=lambda s: s.start_ns):
+            node = nodes[span.span_id]
+            parent = nodes.get(span.parent_span_id)
+            (parent["children"] if parent is not None else roots).append(node)
+        return {
+            "trace_id": trace_id,
+            "span_count": len(spans),
+            "duration_ms": max(node["duration_ms"] for node in roots),
+            "spans": roots,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": min(self._next_seq, self.max_spans),
+                "max_spans": self.max_spans,
+                "evicted": self._floor,
+                "traces": len(self._by_trace),
+                "indexed_series": len(self._by_arrival),
+            }
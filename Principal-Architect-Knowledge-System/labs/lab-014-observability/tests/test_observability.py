@@ -2,16 +2,21 @@
 
 import json
 import logging
+import random
 import sys
+import threading
 from pathlib import Path
 
+import pytest
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.api import create_app
+from src.exporter import JsonLinesSink, LoggerSink, SpanRecord, TelemetryExporter
 from src.models import MetricsRegistry, RequestContext, TelemetryMiddleware
 from src.service import ObservabilityService
+from src.trace_store import TraceStore
 
 
 def test_metrics_increment():
@@ -45,6 +50,246 @@ def test_prometheus_scrape():
     assert '/health"' in text
 
 
+def test_prometheus_histogram_buckets_sum_count():
+    m = MetricsRegistry(buckets=(0.1, 0.5, 1.0))
+    for d in (0.05, 0.1, 0.3, 0.7, 2.0):
+        m.record_request("/api", "200", d)
+    text = m.prometheus_text()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_bucket{route="/api",le="0.1"} 2' in text
+    assert 'http_request_duration_seconds_bucket{route="/api",le="0.5"} 3' in text
+    assert 'http_request_duration_seconds_bucket{route="/api",le="1.0"} 4' in text
+    assert 'http_request_duration_seconds_bucket{route="/api",le="+Inf"} 5' in text
+    assert 'http_request_duration_seconds_sum{route="/api"} 3.150000' in text
+    assert 'http_request_duration_seconds_count{route="/api"} 5' in text
+    assert 'http_request_duration_quantile_seconds{route="/api",quantile="0.99"}' in text
+
+
+def test_prometheus_label_escaping():
+    m = MetricsRegistry()
+    m.record_request('/a"b\\c', "200", 0.01)
+    assert 'route="/a\\"b\\\\c"' in m.prometheus_text()
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-4.0, 0.8) for _ in range(20_000)]
+    m = MetricsRegistry(relative_accuracy=0.01)
+    for v in values:
+        m.record_request("/api", "200", v)
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(m.quantile("/api", q) - exact) / exact <= 0.01
+
+
+def test_series_memory_is_bounded():
+    m = MetricsRegistry()
+    for i in range(50_000):
+        m.record_request("/api", "200", (i % 1000 + 1) / 1000)
+    snap = m.histogram("/api")
+    assert snap.count == 50_000
+    assert len(snap.sketch.bins) <= snap.sketch.max_bins
+    assert len(snap.cumulative) == len(snap.buckets) + 1
+
+
+def test_concurrent_record_counts_are_exact():
+    m = MetricsRegistry()
+
+    def writer():
+        for _ in range(5_000):
+            m.record_request("/api", "200", 0.01)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert m.requests_total[("/api", "200")] == 40_000
+    assert m.histogram("/api").count == 40_000
+
+
+def test_exited_threads_fold_into_retired_shard():
+    m = MetricsRegistry()
+
+    def writer():
+        for _ in range(100):
+            m.record_request("/api", "200", 0.01)
+
+    for _ in range(20):
+        t = threading.Thread(target=writer)
+        t.start()
+        t.join()
+    assert m.thread_shards() == 0
+    assert m.requests_total[("/api", "200")] == 2_000
+    assert m.histogram("/api").count == 2_000
+
+
+def test_buffered_middleware_logs_off_request_path(caplog):
+    caplog.set_level(logging.INFO)
+    exporter = TelemetryExporter([LoggerSink()], autostart=False)
+    mw = TelemetryMiddleware(MetricsRegistry(), exporter=exporter)
+    mw.handle("/health", RequestContext(trace_id="trace-async"))
+    assert not any("trace-async" in r.message for r in caplog.records)
+    assert exporter.flush() == 1
+    assert any("trace-async" in r.message for r in caplog.records)
+
+
+def test_exporter_writes_otlp_json_lines(tmp_path):
+    path = tmp_path / "telemetry.jsonl"
+    exporter = TelemetryExporter([JsonLinesSink(path)], batch_size=2)
+    mw = TelemetryMiddleware(MetricsRegistry(), exporter=exporter)
+    for status in ("200", "500", "200"):
+        mw.handle("/checkout", RequestContext(), status=status)
+    exporter.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    spans = [
+        span
+        for line in lines
+        if "resourceSpans" in line
+        for span in line["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    logs = [line for line in lines if "resourceLogs" in line]
+    assert len(spans) == 3 and len(logs) == 2  # two batches: 2 + 1
+    assert [s["status"]["code"] for s in spans] == [1, 2, 1]
+    assert all(s["name"] == "/checkout" and len(s["traceId"]) == 32 for s in spans)
+
+
+def test_tail_sampling_keeps_whole_traces_with_errors_or_slow_spans():
+    kept = []
+    exporter = TelemetryExporter(
+        [kept.extend], head_sample_rate=0.0, slow_threshold_s=0.1, autostart=False
+    )
+    for trace, child_s, root_status in (("err", 0.01, "500"), ("ok", 0.01, "200"),
+                                        ("slow", 0.2, "200")):
+        exporter.submit(trace, f"{trace}-c", "r", "db", "200", 0, child_s, f"{trace}-r")
+        exporter.submit(trace, f"{trace}-r", "r", "/api", root_status, 0, 0.3 * (trace == "slow"))
+    exporter.submit("orphan", "o-c", "r", "db", "200", 0, 0.01, "o-r")  # root never arrives
+    exporter.flush()
+    assert sorted(s.span_id for s in kept) == ["err-c", "err-r", "slow-c", "slow-r"]
+    assert exporter.stats()["pending_traces"] == 1
+    exporter.close()
+    stats = exporter.stats()
+    assert stats["pending_traces"] == 0 and stats["sampled_out"] == 3
+
+
+def test_tail_sampled_error_trace_keeps_its_span_tree():
+    exporter = TelemetryExporter(head_sample_rate=0.0, autostart=False)
+    service = ObservabilityService(exporter=exporter)
+    service.error_spike_rate, service.latency_spike_ms = 1.0, 1.0
+    trace_id = service.simulate_request("/checkout")["trace_id"]
+    trace = service.get_trace(trace_id)
+    assert trace["span_count"] == 2
+    assert trace["spans"][0]["children"][0]["route"] == "downstream"
+    service.close()
+
+
+def test_handler_exception_recorded_as_500():
+    kept = []
+    exporter = TelemetryExporter([kept.extend], head_sample_rate=0.0, autostart=False)
+    metrics = MetricsRegistry()
+    mw = TelemetryMiddleware(metrics, exporter=exporter)
+    ctx = RequestContext()
+
+    def work(ctx):
+        raise RuntimeError("handler failed")
+
+    with pytest.raises(RuntimeError):
+        mw.handle("/checkout", ctx, work=work)
+    assert metrics.requests_total == {("/checkout", "500"): 1}
+    assert 'http_requests_total{route="/checkout",status="500"} 1' in metrics.prometheus_text()
+    exporter.flush()
+    assert [(s.trace_id, s.status) for s in kept] == [(ctx.trace_id, "500")]
+
+
+def test_exporter_counters_exact_across_threads():
+    exporter = TelemetryExporter(capacity=1_000, autostart=False)
+
+    def producer():
+        for i in range(2_000):
+            exporter.submit(f"t{i}", "s", "r", "/api", "200", 0, 0.001)
+
+    threads = [threading.Thread(target=producer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = exporter.stats()
+    assert stats["submitted"] == 8_000
+    assert stats["dropped"] + stats["buffered"] == 8_000
+
+
+def test_full_buffer_drops_and_counts():
+    exporter = TelemetryExporter(capacity=10, autostart=False)
+    kept = [exporter.submit(f"t{i}", "s", "r", "/api", "200", 0, 0.001) for i in range(15)]
+    assert kept.count(True) == 10
+    assert exporter.stats()["dropped"] == 5
+    assert exporter.flush() == 10
+
+
+def _root(i, route="/checkout", status="200", duration=0.01, end_ns=10**18):
+    start_ns = end_ns - int(duration * 1e9)
+    return SpanRecord(f"t{i}", f"s{i}", "r", route, status, start_ns, duration)
+
+
+def test_trace_store_slowest_errors_in_window():
+    store = TraceStore()
+    now = 10**18
+    store.add_batch([
+        _root(1, status="500", duration=0.30, end_ns=now - 60 * 10**9),
+        _root(2, status="500", duration=0.90, end_ns=now - 600 * 10**9),  # outside window
+        _root(3, status="200", duration=2.00, end_ns=now),  # not an error
+        _root(4, route="/api", status="500", duration=5.0, end_ns=now),  # other route
+        _root(5, status="503", duration=0.05, end_ns=now - 10**9),
+        _root(6, status="500", duration=0.31, end_ns=now),
+    ])
+    found = store.query(
+        route="/checkout", status="error", window_s=300, order="slowest", now_ns=now
+    )
+    assert [t["trace_id"] for t in found] == ["t6", "t1", "t5"]
+    recent = store.query(route="/checkout", status="error", limit=2, now_ns=now)
+    assert [t["trace_id"] for t in recent] == ["t6", "t5"]
+
+
+def test_trace_store_builds_span_tree():
+    service = ObservabilityService()
+    service.set_injection("latency-spike", 0.01)
+    trace_id = service.simulate_request("/checkout")["trace_id"]
+    trace = service.get_trace(trace_id)
+    assert trace["span_count"] == 2
+    (root,) = trace["spans"]
+    assert root["route"] == "/checkout"
+    assert [c["route"] for c in root["children"]] == ["downstream"]
+    assert root["duration_ms"] >= root["children"][0]["duration_ms"] >= 10
+    service.close()
+
+
+def test_trace_store_evicts_oldest_spans():
+    store = TraceStore(max_spans=10)
+    for i in range(30):
+        store.add(_root(i, duration=0.001 * (i + 1)))
+    assert store.stats()["spans"] == 10
+    assert store.get_trace("t5") is None
+    assert store.get_trace("t29") is not None
+    slowest = store.query(order="slowest", limit=50)
+    assert [t["trace_id"] for t in slowest] == [f"t{i}" for i in range(29, 19, -1)]
+
+
+def test_http_trace_queries():
+    service = ObservabilityService()
+    client = TestClient(create_app(service))
+    service.set_injection("error-spike", 1.0)
+    trace_id = client.post("/v1/requests/simulate", json={"route": "/checkout"}).json()["trace_id"]
+    resp = client.get(
+        "/v1/traces",
+        params={"route": "/checkout", "status": "error", "order": "slowest", "window_seconds": 300},
+    )
+    assert [t["trace_id"] for t in resp.json()["traces"]] == [trace_id]
+    assert client.get(f"/v1/traces/{trace_id}").json()["spans"][0]["status"] == "500"
+    assert client.get("/v1/traces/missing").status_code == 404
+    service.close()
+
+
 def test_slo_recording_rule():
     promql = 'sum(rate(http_requests_total{status="500"}[5m])) / sum(rate(http_requests_total[5m]))'
     assert "http_requests_total" in promql
@@ -30,3 +30,7 @@ CREATE TABLE IF NOT EXISTS webhook_events (
 
 CREATE INDEX IF NOT EXISTS idx_idempotency_status_updated
     ON idempotency_keys (status, updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_processing
+    ON idempotency_keys (updated_at, tenant_id, idempotency_key)
+    WHERE status = 'processing';
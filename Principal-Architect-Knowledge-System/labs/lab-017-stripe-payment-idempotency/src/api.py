@@ -9,6 +9,7 @@ from fastapi.responses import HTMLResponse, JSONResponse
 
 from .schemas import ChargeRequest
 from .service import PaymentService, StoreUnavailableError
+from .sweeper import Sweeper
 
 _LANDING_HTML = """<!DOCTYPE html>
 <html lang="en">
@@ -53,7 +54,7 @@ _LANDING_HTML = """<!DOCTYPE html>
 </html>"""
 
 
-def create_app(service: PaymentService) -> FastAPI:
+def create_app(service: PaymentService, sweeper: Sweeper | None = None) -> FastAPI:
     app = FastAPI(title="Lab 017 — Stripe Payment Idempotency", version="1.0.0")
 
     @app.get("/", response_model=None)
@@ -73,8 +74,11 @@ def create_app(service: PaymentService) -> FastAPI:
         }
 
     @app.get("/health")
-    def health() -> dict[str, str]:
-        return {"status": "ok"}
+    def health() -> dict[str, Any]:
+        health = {"status": "ok", **service.stats()}
+        if sweeper is not None:
+            health["sweeper"] = sweeper.stats()
+        return health
 
     @app.post("/v1/charges")
     def create_charge(
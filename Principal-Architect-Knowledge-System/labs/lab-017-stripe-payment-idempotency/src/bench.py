@@ -0,0 +1,286 @@
+"""Benchmarks — checkout req/s per DB layout, webhook worker throughput, sweeper cost."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from .db import Database
+from .queue import WebhookQueue
+from .service import PaymentService
+from .stripe_mock import StripeMock
+from .sweeper import Sweeper
+from .webhook_worker import WebhookWorker
+
+# (label, pooled connections, fast-path checkout)
+CHECKOUT_MODES = (
+    ("connect-per-call", False, False),
+    ("pooled", True, False),
+    ("pooled+fast-path", True, True),
+)
+
+
+def _run_clients(
+    service: PaymentService, clients: int, requests: int, replay_every: int, run_id: str
+) -> float:
+    per_client = requests // clients
+    barrier = threading.Barrier(clients + 1)
+
+    def client(client_id: int) -> None:
+        body = {"amount_cents": 2500, "currency": "usd"}
+        barrier.wait()
+        for i in range(per_client):
+            # Every ``replay_every``-th request retries the previous key (a cached replay).
+            n = i - 1 if replay_every and i % replay_every == 0 and i else i
+            service.create_charge(f"tenant-{client_id % 8}", f"{run_id}-c{client_id}-{n}", body)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started
+
+
+def benchmark_checkout(
+    clients: int = 32,
+    requests: int = 4_000,
+    replay_every: int = 5,
+    dsn: str | None = None,
+    modes: tuple[tuple[str, bool, bool], ...] = CHECKOUT_MODES,
+) -> list[dict[str, Any]]:
+    """Checkout requests/sec with ``clients`` concurrent threads, for each of ``modes``.
+
+    ``connect-per-call`` is the original layer: a new connection per call behind one
+    global lock, and four or five separate DB calls per charge. ``fast-path`` claims
+    with an upsert-returning and completes in one transaction. Runs against a fresh
+    temporary SQLite file unless ``dsn`` is given (a PostgreSQL DSN is reused as-is,
+    so point it at a scratch database).
+    """
+    rows = []
+    for label, pooled, fast_path in modes:
+        path = None
+        if dsn is None:
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+        db = Database(dsn or f"sqlite:{path}", pooled=pooled, pool_size=clients)
+        db.migrate()
+        queue = WebhookQueue()
+        service = PaymentService(
+            db, StripeMock(on_success=queue.publish), queue, fast_path=fast_path
+        )
+        try:
+            elapsed = _run_clients(
+                service, clients, requests, replay_every, run_id=uuid.uuid4().hex[:8]
+            )
+            total = requests // clients * clients
+            stats = db.stats()
+            rows.append(
+                {
+                    "mode": label,
+                    "clients": clients,
+                    "requests": total,
+                    "charges": service.stripe.intent_count(),
+                    "requests_per_sec": round(total / elapsed),
+                    # Includes the one-off migrate and count.
+                    "db_transactions_per_request": round(stats["transactions"] / total, 2),
+                    "connections_opened": stats.get("connections_opened"),
+                }
+            )
+        finally:
+            db.close()
+            if path is not None:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.unlink(path + suffix)
+    return rows
+
+
+def _webhook_events(count: int, duplicate_every: int) -> list[dict[str, Any]]:
+    events = []
+    for i in range(count):
+        # Stripe redelivers: every ``duplicate_every``-th event repeats the previous one.
+        n = i - 1 if duplicate_every and i % duplicate_every == 0 and i else i
+        events.append({"event_id": f"evt_{n:08d}", "type": "payment_intent.succeeded"})
+    return events
+
+
+def benchmark_webhooks(
+    events: int = 5_000,
+    duplicate_every: int = 10,
+    handler_ms: float = 2.0,
+    batch_size: int = 100,
+    workers: int = 8,
+    legacy_events: int = 30,
+) -> list[dict[str, Any]]:
+    """Webhook events/sec and queue lag: original one-at-a-time loop vs batched worker.
+
+    The handler sleeps ``handler_ms`` to stand in for fulfilment I/O. ``legacy`` is the
+    original loop (pop one, dedupe one, handle, sleep 100 ms) over ``legacy_events``
+    events — it is capped near 10 events/s. ``one-at-a-time`` is the same loop without
+    the sleep; ``batched`` is ``WebhookWorker``.
+    """
+    def handler(event: dict[str, Any]) -> None:
+        time.sleep(handler_ms / 1000)
+
+    rows = []
+    for mode in ("legacy", "one-at-a-time", "batched"):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        db = Database(f"sqlite:{path}")
+        db.migrate()
+        queue = WebhookQueue()
+        service = PaymentService(db, StripeMock(), queue)
+        count = legacy_events if mode == "legacy" else events
+        for event in _webhook_events(count, duplicate_every):
+            queue.publish(event)
+        lags: list[float] = []
+        started = time.perf_counter()
+        try:
+            if mode == "batched":
+                worker = WebhookWorker(
+                    service, queue, handler=handler, batch_size=batch_size, workers=workers
+                )
+                worker.drain()
+                worker.close()
+                stats = worker.stats()
+                duplicates, lag_p99, lag_max = (
+                    stats["duplicates_total"],
+                    stats["lag_ms_p99"],
+                    stats["lag_ms_max"],
+                )
+            else:
+                duplicates = 0
+                while (item := queue.consume_batch(1, 0)):
+                    enqueued_at, event = item[0]
+                    if service.process_webhook(event):
+                        handler(event)
+                    else:
+                        duplicates += 1
+                    lags.append((time.time() - enqueued_at) * 1000)
+                    if mode == "legacy":
+                        time.sleep(0.1)
+                lags.sort()
+                lag_p99 = round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 2)
+                lag_max = round(lags[-1], 2)
+            elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+        rows.append(
+            {
+                "mode": mode,
+                "events": count,
+                "duplicates": duplicates,
+                "events_per_sec": round(count / elapsed),
+                "lag_ms_p99": lag_p99,
+                "lag_ms_max": lag_max,
+            }
+        )
+    return rows
+
+
+def _seed_keys(db: Database, stripe: StripeMock, keys: int, stuck: int) -> None:
+    """``keys`` completed keys (all past a 1-day TTL) plus ``stuck`` old processing rows.
+
+    Half the stuck rows have a Stripe intent (the charge went through, then the process
+    died) and record its id, so the original sweeper can heal them too.
+    """
+    old = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+    body = json.dumps({"status": "succeeded"})
+    rows = [
+        ("t1", f"done-{i:08d}", "h", "completed", 201, body, f"pi_done_{i}", old, old)
+        for i in range(keys)
+    ]
+    for i in range(stuck):
+        intent_id = None
+        if i % 2 == 0:
+            intent_id = stripe.create_payment_intent(100, "USD", f"stuck-{i:06d}", "t1").id
+        rows.append(("t1", f"stuck-{i:06d}", "h", "processing", None, None, intent_id, old, old))
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO idempotency_keys VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def benchmark_sweeper(
+    keys: int = 200_000, stuck: int = 2_000, page_size: int = 500
+) -> dict[str, Any]:
+    """Stuck-row sweep and TTL purge over a SQLite table of ``keys + stuck`` rows.
+
+    ``original`` is the pre-pagination sweeper: load every stuck row, then one Stripe
+    lookup (a scan over intents) and one completion write per row. ``paged`` is the
+    keyset-paginated sweep with one batch lookup and bulk writes per page.
+    """
+    results: dict[str, Any] = {"keys": keys, "stuck": stuck, "page_size": page_size}
+    for mode in ("original", "paged"):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        db = Database(f"sqlite:{path}")
+        db.migrate()
+        stripe = StripeMock()
+        service = PaymentService(db, stripe, WebhookQueue())
+        _seed_keys(db, stripe, keys, stuck)
+        try:
+            started = time.perf_counter()
+            if mode == "original":
+                healed = 0
+                for row in db.list_stuck_processing(0):
+                    intent = stripe.get_intent(row.stripe_payment_intent_id or "")
+                    if intent:
+                        db.complete_idempotency(
+                            row.tenant_id, row.idempotency_key, 201, {}, intent.id
+                        )
+                        healed += 1
+                results[mode] = {
+                    "healed": healed,
+                    "sweep_sec": round(time.perf_counter() - started, 3),
+                }
+                continue
+            sweeper = Sweeper(
+                service, older_than_seconds=60, page_size=page_size, ttl_seconds=None
+            )
+            cycle = sweeper.run_once()
+            sweep_sec = time.perf_counter() - started
+            with db.connection() as conn:
+                plan = conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT tenant_id FROM idempotency_keys "
+                    "WHERE status = 'processing' AND updated_at < ? "
+                    "AND (updated_at, tenant_id, idempotency_key) > (?, ?, ?) "
+                    "ORDER BY updated_at, tenant_id, idempotency_key LIMIT ?",
+                    ("9999", "0", "", "", page_size),
+                ).fetchall()
+            started = time.perf_counter()
+            purged = 0
+            slowest_batch = 0.0
+            while True:
+                batch_started = time.perf_counter()
+                deleted = db.purge_expired_batch(86400, 1000)
+                slowest_batch = max(slowest_batch, time.perf_counter() - batch_started)
+                purged += deleted
+                if deleted < 1000:
+                    break
+            results[mode] = {
+                **cycle,
+                "sweep_sec": round(sweep_sec, 3),
+                "page_query_plan": " | ".join(row["detail"] for row in plan),
+                "purged": purged,
+                "purge_sec": round(time.perf_counter() - started, 3),
+                "slowest_purge_batch_ms": round(slowest_batch * 1000, 2),
+            }
+        finally:
+            db.close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+    return results
@@ -8,7 +8,7 @@ import threading
 import uuid
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Generator
 
@@ -19,6 +19,8 @@ except ImportError:  # pragma: no cover
     psycopg = None  # type: ignore[assignment]
     dict_row = None  # type: ignore[assignment]
 
+from .pool import PostgresPool, SQLitePool
+
 SCHEMA_PATH = Path(__file__).resolve().parent.parent / "scripts" / "schema.sql"
 
 
@@ -26,6 +28,16 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def new_order_id() -> str:
+    return f"ord_{uuid.uuid4().hex[:12]}"
+
+
+_IDEMPOTENCY_COLUMNS = (
+    "tenant_id, idempotency_key, request_hash, status, "
+    "response_status, response_body, stripe_payment_intent_id"
+)
+
+
 @dataclass
 class IdempotencyRow:
     tenant_id: str
@@ -38,16 +50,30 @@ class IdempotencyRow:
 
 
 class Database:
-    """Supports sqlite:// paths and postgresql:// URLs."""
+    """Supports sqlite:// paths and postgresql:// URLs.
 
-    def __init__(self, dsn: str) -> None:
+    Connections come from a pool (``src/pool.py``) with no global lock: per-thread WAL
+    connections for SQLite, ``psycopg_pool`` for PostgreSQL. ``pooled=False`` keeps the
+    original connect-per-call behind one lock, as the benchmark baseline.
+    """
+
+    def __init__(self, dsn: str, *, pooled: bool = True, pool_size: int = 10) -> None:
         self.dsn = dsn
         self._is_sqlite = dsn.startswith("sqlite:")
+        self.pooled = pooled
         self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.transactions = 0
+        self._pool: SQLitePool | PostgresPool | None = None
+        if pooled:
+            if self._is_sqlite:
+                self._pool = SQLitePool(self.dsn.replace("sqlite:", "", 1))
+            else:
+                self._pool = PostgresPool(dsn, max_size=pool_size)
 
     def migrate(self) -> None:
-        if self._is_sqlite:
-            with self._sqlite_conn() as conn:
+        with self.connection() as conn:
+            if self._is_sqlite:
                 conn.executescript(
                     """
                     CREATE TABLE IF NOT EXISTS idempotency_keys (
@@ -76,12 +102,16 @@ class Database:
                         payload TEXT NOT NULL,
                         processed_at TEXT
                     );
+                    CREATE INDEX IF NOT EXISTS idx_idempotency_finished
+                        ON idempotency_keys (updated_at)
+                        WHERE status IN ('completed', 'failed');
+                    CREATE INDEX IF NOT EXISTS idx_idempotency_processing
+                        ON idempotency_keys (updated_at, tenant_id, idempotency_key)
+                        WHERE status = 'processing';
                     """
                 )
-        else:
-            with self._pg_conn() as conn:
+            else:
                 conn.execute(SCHEMA_PATH.read_text(encoding="utf-8"))
-                conn.commit()
 
     @contextmanager
     def _sqlite_conn(self) -> Generator[sqlite3.Connection, None, None]:
@@ -107,6 +137,13 @@ class Database:
 
     @contextmanager
     def connection(self) -> Generator[Any, None, None]:
+        """One transaction: commits on success, rolls back on error."""
+        with self._stats_lock:
+            self.transactions += 1
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
         with self._lock:
             if self._is_sqlite:
                 with self._sqlite_conn() as conn:
@@ -115,6 +152,33 @@ class Database:
                 with self._pg_conn() as conn:
                     yield conn
 
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+
+    def stats(self) -> dict[str, Any]:
+        if self._pool is None:
+            return {
+                "backend": "sqlite" if self._is_sqlite else "postgresql",
+                "pooled": False,
+                "transactions": self.transactions,
+            }
+        return {"pooled": True, "transactions": self.transactions, **self._pool.stats()}
+
+    def _to_row(self, row: Any) -> IdempotencyRow:
+        body = row["response_body"]
+        if self._is_sqlite and body:
+            body = json.loads(body)
+        return IdempotencyRow(
+            row["tenant_id"],
+            row["idempotency_key"],
+            row["request_hash"],
+            row["status"],
+            row["response_status"],
+            body or None,
+            row["stripe_payment_intent_id"],
+        )
+
     def get_idempotency(self, tenant_id: str, key: str) -> IdempotencyRow | None:
         with self.connection() as conn:
             if self._is_sqlite:
@@ -247,7 +311,7 @@ class Database:
         stripe_payment_intent_id: str,
         status: str = "completed",
     ) -> str:
-        order_id = f"ord_{uuid.uuid4().hex[:12]}"
+        order_id = new_order_id()
         now = _utcnow().isoformat()
         with self.connection() as conn:
             if self._is_sqlite:
@@ -287,6 +351,110 @@ class Database:
                 )
         return order_id
 
+    def claim_idempotency(
+        self, tenant_id: str, key: str, request_hash: str
+    ) -> tuple[bool, IdempotencyRow]:
+        """Insert the key as ``processing`` or fetch the existing row, in one statement.
+
+        Returns (claimed, row). PostgreSQL upserts with a no-op ``DO UPDATE`` so the
+        conflicting row comes back from ``RETURNING`` too (``xmax = 0`` only on a fresh
+        insert) — one round trip, and it waits on a concurrent uncommitted claim instead
+        of missing it. SQLite returns nothing on conflict; the follow-up read runs in the
+        same write transaction, so no other writer can slip in between.
+        """
+        now = _utcnow().isoformat()
+        with self.connection() as conn:
+            if self._is_sqlite:
+                rows = conn.execute(
+                    f"""
+                    INSERT INTO idempotency_keys
+                    (tenant_id, idempotency_key, request_hash, status, created_at, updated_at)
+                    VALUES (?, ?, ?, 'processing', ?, ?)
+                    ON CONFLICT (tenant_id, idempotency_key) DO NOTHING
+                    RETURNING {_IDEMPOTENCY_COLUMNS}
+                    """,
+                    (tenant_id, key, request_hash, now, now),
+                ).fetchall()
+                if rows:
+                    return True, self._to_row(rows[0])
+                row = conn.execute(
+                    f"SELECT {_IDEMPOTENCY_COLUMNS} FROM idempotency_keys "
+                    "WHERE tenant_id = ? AND idempotency_key = ?",
+                    (tenant_id, key),
+                ).fetchone()
+                return False, self._to_row(row)
+            row = conn.execute(
+                f"""
+                INSERT INTO idempotency_keys
+                (tenant_id, idempotency_key, request_hash, status)
+                VALUES (%s, %s, %s, 'processing')
+                ON CONFLICT (tenant_id, idempotency_key)
+                DO UPDATE SET tenant_id = EXCLUDED.tenant_id
+                RETURNING {_IDEMPOTENCY_COLUMNS}, (xmax = 0) AS inserted
+                """,
+                (tenant_id, key, request_hash),
+            ).fetchone()
+            return bool(row["inserted"]), self._to_row(row)
+
+    def complete_charge(
+        self,
+        tenant_id: str,
+        key: str,
+        order_id: str,
+        amount_cents: int,
+        currency: str,
+        stripe_payment_intent_id: str,
+        response_status: int,
+        response_body: dict[str, Any],
+    ) -> None:
+        """Insert the order and mark the key completed in one transaction.
+
+        On PostgreSQL both statements and the commit go out in a single pipeline.
+        """
+        body_json = json.dumps(response_body)
+        now = _utcnow().isoformat()
+        with self.connection() as conn:
+            if self._is_sqlite:
+                conn.execute(
+                    """
+                    INSERT INTO orders
+                    (order_id, tenant_id, amount_cents, currency,
+                     stripe_payment_intent_id, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, 'completed', ?)
+                    """,
+                    (order_id, tenant_id, amount_cents, currency, stripe_payment_intent_id, now),
+                )
+                conn.execute(
+                    """
+                    UPDATE idempotency_keys
+                    SET status = 'completed', response_status = ?, response_body = ?,
+                        stripe_payment_intent_id = ?, updated_at = ?
+                    WHERE tenant_id = ? AND idempotency_key = ?
+                    """,
+                    (response_status, body_json, stripe_payment_intent_id, now, tenant_id, key),
+                )
+                return
+            with conn.pipeline():
+                conn.execute(
+                    """
+                    INSERT INTO orders
+                    (order_id, tenant_id, amount_cents, currency,
+                     stripe_payment_intent_id, status)
+                    VALUES (%s, %s, %s, %s, %s, 'completed')
+                    """,
+                    (order_id, tenant_id, amount_cents, currency, stripe_payment_intent_id),
+                )
+                conn.execute(
+                    """
+                    UPDATE idempotency_keys
+                    SET status = 'completed', response_status = %s, response_body = %s,
+                        stripe_payment_intent_id = %s, updated_at = NOW()
+                    WHERE tenant_id = %s AND idempotency_key = %s
+                    """,
+                    (response_status, body_json, stripe_payment_intent_id, tenant_id, key),
+                )
+                conn.commit()
+
     def count_orders(self) -> int:
         with self.connection() as conn:
             if self._is_sqlite:
@@ -341,6 +509,162 @@ class Database:
                     )
         return rows
 
+    def _cutoff(self, older_than_seconds: float) -> Any:
+        cutoff = _utcnow() - timedelta(seconds=older_than_seconds)
+        return cutoff.isoformat() if self._is_sqlite else cutoff
+
+    def list_stuck_page(
+        self,
+        older_than_seconds: float,
+        after: tuple[Any, str, str] | None = None,
+        limit: int = 500,
+    ) -> tuple[list[IdempotencyRow], tuple[Any, str, str] | None]:
+        """One keyset page of ``processing`` rows idle for ``older_than_seconds``.
+
+        Ordered by (updated_at, tenant_id, idempotency_key) so the partial index
+        ``idx_idempotency_processing`` serves both the filter and the order, and each
+        page seeks past ``after`` instead of re-scanning earlier pages. Returns the rows
+        and the cursor for the next page (None once the last page is short).
+        """
+        mark = "?" if self._is_sqlite else "%s"
+        sql = (
+            f"SELECT {_IDEMPOTENCY_COLUMNS}, updated_at FROM idempotency_keys "
+            f"WHERE status = 'processing' AND updated_at < {mark}"
+        )
+        params: list[Any] = [self._cutoff(older_than_seconds)]
+        if after is not None:
+            sql += f" AND (updated_at, tenant_id, idempotency_key) > ({mark}, {mark}, {mark})"
+            params += list(after)
+        sql += f" ORDER BY updated_at, tenant_id, idempotency_key LIMIT {mark}"
+        params.append(limit)
+        with self.connection() as conn:
+            raw = conn.execute(sql, params).fetchall()
+        rows = [self._to_row(row) for row in raw]
+        if len(raw) < limit:
+            return rows, None
+        last = raw[-1]
+        return rows, (last["updated_at"], last["tenant_id"], last["idempotency_key"])
+
+    def upsert_orders(self, orders: list[tuple[str, str, int, str, str]]) -> dict[str, str]:
+        """Insert ``(order_id, tenant_id, amount_cents, currency, intent_id)`` rows.
+
+        One multi-row statement. Returns intent_id -> order_id; an intent that already
+        has an order keeps it (the no-op ``DO UPDATE`` makes ``RETURNING`` report the
+        existing row).
+        """
+        if not orders:
+            return {}
+        now = _utcnow().isoformat()
+        columns = "order_id, tenant_id, amount_cents, currency, stripe_payment_intent_id, status"
+        if self._is_sqlite:
+            columns += ", created_at"
+            values = ", ".join(["(?, ?, ?, ?, ?, 'completed', ?)"] * len(orders))
+            params = [value for order in orders for value in (*order, now)]
+        else:
+            values = ", ".join(["(%s, %s, %s, %s, %s, 'completed')"] * len(orders))
+            params = [value for order in orders for value in order]
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"""
+                INSERT INTO orders ({columns}) VALUES {values}
+                ON CONFLICT (stripe_payment_intent_id)
+                DO UPDATE SET order_id = orders.order_id
+                RETURNING stripe_payment_intent_id, order_id
+                """,
+                params,
+            ).fetchall()
+        return {row["stripe_payment_intent_id"]: row["order_id"] for row in rows}
+
+    def complete_many(
+        self, completions: list[tuple[str, str, int, dict[str, Any], str]]
+    ) -> int:
+        """Bulk-complete ``(tenant_id, key, status, body, intent_id)`` rows still processing.
+
+        One ``executemany`` in one transaction; rows a late request already completed
+        are left alone.
+        """
+        if not completions:
+            return 0
+        now = _utcnow().isoformat()
+        with self.connection() as conn:
+            if self._is_sqlite:
+                cur = conn.executemany(
+                    """
+                    UPDATE idempotency_keys
+                    SET status = 'completed', response_status = ?, response_body = ?,
+                        stripe_payment_intent_id = ?, updated_at = ?
+                    WHERE tenant_id = ? AND idempotency_key = ? AND status = 'processing'
+                    """,
+                    [
+                        (status, json.dumps(body), intent_id, now, tenant_id, key)
+                        for tenant_id, key, status, body, intent_id in completions
+                    ],
+                )
+            else:
+                cur = conn.cursor()
+                cur.executemany(
+                    """
+                    UPDATE idempotency_keys
+                    SET status = 'completed', response_status = %s, response_body = %s,
+                        stripe_payment_intent_id = %s, updated_at = NOW()
+                    WHERE tenant_id = %s AND idempotency_key = %s AND status = 'processing'
+                    """,
+                    [
+                        (status, json.dumps(body), intent_id, tenant_id, key)
+                        for tenant_id, key, status, body, intent_id in completions
+                    ],
+                )
+            return cur.rowcount
+
+    def release_processing(self, keys: list[tuple[str, str]], older_than_seconds: float) -> int:
+        """Delete ``processing`` rows (still idle past the cutoff) so a retry re-executes."""
+        if not keys:
+            return 0
+        mark = "?" if self._is_sqlite else "%s"
+        cutoff = self._cutoff(older_than_seconds)
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.executemany(
+                f"DELETE FROM idempotency_keys WHERE tenant_id = {mark} "
+                f"AND idempotency_key = {mark} AND status = 'processing' "
+                f"AND updated_at < {mark}",
+                [(tenant_id, key, cutoff) for tenant_id, key in keys],
+            )
+            return cur.rowcount
+
+    def purge_expired_batch(self, ttl_seconds: float, limit: int = 1000) -> int:
+        """Delete up to ``limit`` finished keys older than ``ttl_seconds``.
+
+        Small batches keep each delete transaction (and its locks) short; the partial
+        index on finished rows' ``updated_at`` (PostgreSQL: ``(status, updated_at)``)
+        finds the victims without a table scan.
+        """
+        cutoff = self._cutoff(ttl_seconds)
+        with self.connection() as conn:
+            if self._is_sqlite:
+                cur = conn.execute(
+                    """
+                    DELETE FROM idempotency_keys WHERE rowid IN (
+                        SELECT rowid FROM idempotency_keys
+                        WHERE status IN ('completed', 'failed') AND updated_at < ?
+                        LIMIT ?
+                    )
+                    """,
+                    (cutoff, limit),
+                )
+            else:
+                cur = conn.execute(
+                    """
+                    DELETE FROM idempotency_keys WHERE ctid IN (
+                        SELECT ctid FROM idempotency_keys
+                        WHERE status IN ('completed', 'failed') AND updated_at < %s
+                        LIMIT %s
+                    )
+                    """,
+                    (cutoff, limit),
+                )
+            return cur.rowcount
+
     def mark_webhook_processed(self, event_id: str, payload: dict[str, Any]) -> bool:
         """Returns False if event_id already processed."""
         now = _utcnow().isoformat()
@@ -367,3 +691,46 @@ class Database:
                 if "unique" in str(exc).lower() or "duplicate" in str(exc).lower():
                     return False
                 raise
+
+    def mark_webhooks_processed(self, events: list[dict[str, Any]]) -> set[str]:
+        """Dedupe a batch with one multi-row insert; returns the event_ids that were new.
+
+        ``ON CONFLICT DO NOTHING RETURNING`` reports only the rows actually inserted, so
+        one statement both records the batch and tells which events were already seen.
+        Repeats of an event_id within ``events`` are inserted once.
+        """
+        unique: dict[str, dict[str, Any]] = {}
+        for event in events:
+            unique.setdefault(event["event_id"], event)
+        if not unique:
+            return set()
+        now = _utcnow().isoformat()
+        with self.connection() as conn:
+            if self._is_sqlite:
+                placeholders = ", ".join(["(?, ?, ?)"] * len(unique))
+                params: list[Any] = []
+                for event_id, event in unique.items():
+                    params += [event_id, json.dumps(event), now]
+            else:
+                placeholders = ", ".join(["(%s, %s, NOW())"] * len(unique))
+                params = []
+                for event_id, event in unique.items():
+                    params += [event_id, json.dumps(event)]
+            rows = conn.execute(
+                f"""
+                INSERT INTO webhook_events (event_id, payload, processed_at)
+                VALUES {placeholders}
+                ON CONFLICT (event_id) DO NOTHING
+                RETURNING event_id
+                """,
+                params,
+            ).fetchall()
+        return {row["event_id"] for row in rows}
+
+    def unmark_webhooks(self, event_ids: list[str]) -> None:
+        """Forget dedupe rows for events whose handler failed, so a redelivery runs."""
+        if not event_ids:
+            return
+        marks = ", ".join(["?" if self._is_sqlite else "%s"] * len(event_ids))
+        with self.connection() as conn:
+            conn.execute(f"DELETE FROM webhook_events WHERE event_id IN ({marks})", event_ids)
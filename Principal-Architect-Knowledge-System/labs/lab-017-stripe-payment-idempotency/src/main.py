@@ -4,15 +4,18 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
 import sys
+import time
 
 from .api import create_app
+from .bench import benchmark_checkout, benchmark_sweeper, benchmark_webhooks
 from .db import Database
 from .queue import WebhookQueue
 from .service import PaymentService
 from .stripe_mock import StripeMock
-from .sweeper import run_sweeper
+from .sweeper import Sweeper
 from .webhook_worker import run_worker
 
 
@@ -20,6 +23,8 @@ def _build_stack(
     database_url: str | None,
     redis_url: str | None,
     stripe_delay: float,
+    wait_for_in_flight: bool = False,
+    wait_timeout: float = 5.0,
 ) -> tuple[PaymentService, WebhookQueue, StripeMock]:
     dsn = database_url or os.getenv(
         "DATABASE_URL", "sqlite:./data/stripe_lab.db"
@@ -33,7 +38,13 @@ def _build_stack(
         queue.publish(event)
 
     stripe = StripeMock(delay_seconds=stripe_delay, on_success=on_success)
-    service = PaymentService(db, stripe, queue)
+    service = PaymentService(
+        db,
+        stripe,
+        queue,
+        wait_for_in_flight=wait_for_in_flight,
+        wait_timeout=wait_timeout,
+    )
     return service, queue, stripe
 
 
@@ -46,32 +57,107 @@ def main() -> int:
     parser.add_argument("--worker", action="store_true", help="Run webhook worker")
     parser.add_argument("--sweeper", action="store_true", help="Run idempotency sweeper")
     parser.add_argument("--demo", action="store_true", help="Run timeout-retry demo")
+    parser.add_argument(
+        "--bench", action="store_true", help="Checkout req/s, pooled vs connect-per-call"
+    )
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients for --bench")
+    parser.add_argument(
+        "--bench-webhooks", action="store_true", help="Webhook events/s, one-at-a-time vs batched"
+    )
+    parser.add_argument(
+        "--bench-sweeper", action="store_true", help="Stuck-row sweep + TTL purge cost"
+    )
+    parser.add_argument("--older-than", type=float, default=300, help="Sweeper: idle seconds")
+    parser.add_argument(
+        "--release-after",
+        type=float,
+        default=None,
+        help="Sweeper: delete stuck rows with no Stripe intent after this many seconds",
+    )
+    parser.add_argument("--ttl", type=float, default=86400, help="Sweeper: purge keys older")
+    parser.add_argument(
+        "--sweep-interval",
+        type=float,
+        default=None,
+        help="Run the sweeper every N seconds (in the background with --serve)",
+    )
+    parser.add_argument("--batch-size", type=int, default=100, help="Webhook worker batch size")
+    parser.add_argument(
+        "--worker-threads", type=int, default=4, help="Webhook handler pool size"
+    )
     parser.add_argument("--database-url", default=None)
     parser.add_argument("--redis-url", default=None)
     parser.add_argument("--stripe-delay", type=float, default=0.0)
+    parser.add_argument(
+        "--wait-for-in-flight",
+        action="store_true",
+        help="Duplicates wait for the in-flight charge's result instead of getting 409",
+    )
+    parser.add_argument("--wait-timeout", type=float, default=5.0)
     args = parser.parse_args()
 
+    if args.bench:
+        for row in benchmark_checkout(clients=args.clients, dsn=args.database_url):
+            print(json.dumps(row))
+        return 0
+
+    if args.bench_sweeper:
+        print(json.dumps(benchmark_sweeper()))
+        return 0
+
+    if args.bench_webhooks:
+        for row in benchmark_webhooks(batch_size=args.batch_size, workers=args.worker_threads):
+            print(json.dumps(row))
+        return 0
+
     service, queue, stripe = _build_stack(
-        args.database_url, args.redis_url, args.stripe_delay
+        args.database_url,
+        args.redis_url,
+        args.stripe_delay,
+        args.wait_for_in_flight,
+        args.wait_timeout,
     )
 
     if args.migrate:
         print("Schema migrated.")
         return 0
 
+    sweeper = Sweeper(
+        service,
+        older_than_seconds=args.older_than,
+        release_after_seconds=args.release_after,
+        ttl_seconds=args.ttl,
+    )
+
     if args.serve:
         import uvicorn
 
-        app = create_app(service)
-        uvicorn.run(app, host="0.0.0.0", port=8080)
+        if args.sweep_interval:
+            sweeper.start(args.sweep_interval)
+        app = create_app(service, sweeper)
+        try:
+            uvicorn.run(app, host="0.0.0.0", port=8080)
+        finally:
+            sweeper.stop()
         return 0
 
     if args.worker:
-        run_worker(service, queue)
+        run_worker(
+            service, queue, batch_size=args.batch_size, workers=args.worker_threads
+        )
         return 0
 
     if args.sweeper:
-        run_sweeper(service)
+        if args.sweep_interval:
+            sweeper.start(args.sweep_interval)
+            try:
+                while True:
+                    time.sleep(args.sweep_interval)
+                    print(json.dumps(sweeper.stats()))
+            except KeyboardInterrupt:
+                sweeper.stop()
+            return 0
+        print(json.dumps({**sweeper.run_once(), **sweeper.stats()}))
         return 0
 
     if args.demo:
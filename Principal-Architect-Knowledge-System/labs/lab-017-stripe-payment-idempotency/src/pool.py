@@ -0,0 +1,151 @@
+"""Connection pools — per-thread WAL SQLite connections, psycopg_pool for PostgreSQL."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Generator
+
+try:
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+except ImportError:  # pragma: no cover
+    dict_row = None  # type: ignore[assignment]
+    ConnectionPool = None  # type: ignore[assignment,misc]
+
+
+class SQLitePool:
+    """One long-lived SQLite connection per thread, opened in WAL mode.
+
+    WAL lets readers run alongside the single writer, ``synchronous=NORMAL`` fsyncs at
+    checkpoints instead of every commit, and ``busy_timeout`` makes a writer wait for
+    the lock rather than fail with ``database is locked``. Keeping the connection open
+    also keeps sqlite3's per-connection statement cache (``cached_statements``) warm,
+    so repeated queries skip re-parsing. Sized by the caller's thread pool: a thread
+    that exits leaves its connection open until ``close``.
+    """
+
+    def __init__(
+        self, path: str, busy_timeout_ms: int = 5000, cached_statements: int = 256
+    ) -> None:
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self.opened = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._lock:
+            self._connections.append(conn)
+            self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self) -> Generator[sqlite3.Connection, None, None]:
+        """This thread's connection; commits on success, rolls back on error."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        with conn:
+            yield conn
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "open_connections": len(self._connections),
+                "connections_opened": self.opened,
+            }
+
+
+class PostgresPool:
+    """Thin wrapper over ``psycopg_pool.ConnectionPool`` (opened on first use).
+
+    Connections are reused across requests, so psycopg's automatic server-side
+    prepared statements pay off: with ``prepare_threshold=0`` every query is prepared
+    on first execution per connection and later calls send only parameters. Use
+    ``prepare_threshold=None`` behind PgBouncer in transaction mode.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        prepare_threshold: int | None = 0,
+        timeout: float = 5.0,
+    ) -> None:
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.prepare_threshold = prepare_threshold
+        self.timeout = timeout
+        self._pool: Any = None
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _configure(self, conn: Any) -> None:
+        conn.prepare_threshold = self.prepare_threshold
+        self.opened += 1
+
+    def _get_pool(self) -> Any:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if ConnectionPool is None:
+                        raise RuntimeError("psycopg_pool not installed")
+                    self._pool = ConnectionPool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        kwargs={"row_factory": dict_row},
+                        configure=self._configure,
+                        timeout=self.timeout,
+                        open=True,
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self) -> Generator[Any, None, None]:
+        """A pooled connection; the pool commits on success and rolls back on error."""
+        with self._get_pool().connection() as conn:
+            yield conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+    def stats(self) -> dict[str, Any]:
+        if self._pool is None:
+            return {"backend": "postgresql", "open_connections": 0, "connections_opened": 0}
+        pool_stats = self._pool.get_stats()
+        return {
+            "backend": "postgresql",
+            "open_connections": pool_stats.get("pool_size", 0),
+            "idle_connections": pool_stats.get("pool_available", 0),
+            "waiting_clients": pool_stats.get("requests_waiting", 0),
+            "connections_opened": self.opened,
+            "max_size": self.max_size,
+        }
@@ -4,14 +4,21 @@ from __future__ import annotations
 
 import json
 import threading
+import time
 from collections import deque
 from typing import Any
 
 
 class WebhookQueue:
+    """FIFO of webhook events; each entry carries its enqueue time for lag metrics.
+
+    Redis entries are ``{"enqueued_at": ..., "message": ...}`` envelopes (bare
+    messages from older publishers are still accepted, with unknown enqueue time).
+    """
+
     def __init__(self, redis_url: str | None = None, queue_name: str = "stripe-webhooks") -> None:
         self.queue_name = queue_name
-        self._memory: deque[dict[str, Any]] = deque()
+        self._memory: deque[tuple[float, dict[str, Any]]] = deque()
         self._lock = threading.Lock()
         self._redis = None
         if redis_url:
@@ -23,24 +30,54 @@ class WebhookQueue:
                 self._redis = None
 
     def publish(self, message: dict[str, Any]) -> None:
-        payload = json.dumps(message)
+        enqueued_at = time.time()
         if self._redis:
-            self._redis.lpush(self.queue_name, payload)
+            envelope = {"enqueued_at": enqueued_at, "message": message}
+            self._redis.lpush(self.queue_name, json.dumps(envelope))
             return
         with self._lock:
-            self._memory.append(message)
+            self._memory.append((enqueued_at, message))
+
+    @staticmethod
+    def _unwrap(payload: str) -> tuple[float | None, dict[str, Any]]:
+        data = json.loads(payload)
+        if isinstance(data, dict) and set(data) == {"enqueued_at", "message"}:
+            return data["enqueued_at"], data["message"]
+        return None, data
 
     def consume(self, timeout_seconds: int = 1) -> dict[str, Any] | None:
         if self._redis:
             item = self._redis.brpop(self.queue_name, timeout=timeout_seconds)
             if not item:
                 return None
-            return json.loads(item[1])
+            return self._unwrap(item[1])[1]
         with self._lock:
             if self._memory:
-                return self._memory.popleft()
+                return self._memory.popleft()[1]
         return None
 
+    def consume_batch(
+        self, max_items: int = 100, timeout_seconds: float = 1.0
+    ) -> list[tuple[float | None, dict[str, Any]]]:
+        """Pop up to ``max_items`` ``(enqueued_at, message)`` pairs in one call.
+
+        Redis uses ``RPOP key count`` (6.2+); when the list is empty it blocks on
+        ``BRPOP`` for the first item and then takes the rest of the batch. In memory the
+        batch is popped under one lock acquisition; an empty queue returns at once.
+        """
+        if self._redis:
+            payloads = self._redis.rpop(self.queue_name, max_items) or []
+            if not payloads and timeout_seconds > 0:
+                item = self._redis.brpop(self.queue_name, timeout=max(1, int(timeout_seconds)))
+                if item:
+                    payloads = [item[1]]
+                    if max_items > 1:
+                        payloads += self._redis.rpop(self.queue_name, max_items - 1) or []
+            return [self._unwrap(p) for p in payloads]
+        with self._lock:
+            count = min(max_items, len(self._memory))
+            return [self._memory.popleft() for _ in range(count)]
+
     def depth(self) -> int:
         if self._redis:
             return int(self._redis.llen(self.queue_name))
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import copy
 import hashlib
 import json
+from collections.abc import Iterator
 from typing import Any
 
-from .db import Database
+from .coalesce import RequestCoalescer
+from .db import Database, IdempotencyRow, new_order_id
 from .queue import WebhookQueue
 from .stripe_mock import StripeMock
 
@@ -25,6 +28,18 @@ def request_hash(body: dict[str, Any]) -> str:
 
 
 class PaymentService:
+    """Checkout over the idempotency table.
+
+    A duplicate that arrives while the first request holds the key in ``processing``
+    gets ``409 request in flight``. With ``wait_for_in_flight`` a duplicate in the same
+    process instead waits up to ``wait_timeout`` seconds on the first request's result
+    and returns it — no second DB claim, Stripe call or order row.
+
+    ``fast_path`` (default) costs two DB transactions per new charge: an upsert-returning
+    claim, then the order insert and completion together. ``fast_path=False`` keeps the
+    original read → insert → (re-read) → order → complete sequence of separate calls.
+    """
+
     def __init__(
         self,
         db: Database,
@@ -32,11 +47,18 @@ class PaymentService:
         webhook_queue: WebhookQueue,
         *,
         store_available: bool = True,
+        wait_for_in_flight: bool = False,
+        wait_timeout: float = 5.0,
+        fast_path: bool = True,
     ) -> None:
         self.db = db
         self.stripe = stripe
         self.webhook_queue = webhook_queue
         self.store_available = store_available
+        self.wait_timeout = wait_timeout
+        self.fast_path = fast_path
+        self.coalescer: RequestCoalescer[tuple[str, str], tuple[str, int, dict[str, Any]]] | None
+        self.coalescer = RequestCoalescer() if wait_for_in_flight else None
 
     def create_charge(
         self,
@@ -68,6 +90,39 @@ class PaymentService:
             return 400, {"error": "currency must be a 3-letter ISO code (e.g. usd)"}
 
         body_digest = request_hash(body)
+        if self.coalescer is None:
+            return self._charge(tenant_id, idempotency_key, body_digest, amount_cents, currency)
+        try:
+            (leader_digest, status, payload), shared = self.coalescer.do(
+                (tenant_id, idempotency_key),
+                lambda: (
+                    body_digest,
+                    *self._charge(
+                        tenant_id, idempotency_key, body_digest, amount_cents, currency
+                    ),
+                ),
+                self.wait_timeout,
+            )
+        except TimeoutError:
+            return 409, {"error": "request in flight", "waited_seconds": self.wait_timeout}
+        if not shared:
+            return status, payload
+        if leader_digest != body_digest:
+            return 409, {"error": "idempotency key reused with different body"}
+        return status, copy.deepcopy(payload)
+
+    def _charge(
+        self,
+        tenant_id: str,
+        idempotency_key: str,
+        body_digest: str,
+        amount_cents: int,
+        currency: str,
+    ) -> tuple[int, dict[str, Any]]:
+        if self.fast_path:
+            return self._charge_fast(
+                tenant_id, idempotency_key, body_digest, amount_cents, currency
+            )
         existing = self.db.get_idempotency(tenant_id, idempotency_key)
         if existing:
             if existing.request_hash != body_digest:
@@ -105,28 +160,133 @@ class PaymentService:
         )
         return 201, response
 
+    def _charge_fast(
+        self,
+        tenant_id: str,
+        idempotency_key: str,
+        body_digest: str,
+        amount_cents: int,
+        currency: str,
+    ) -> tuple[int, dict[str, Any]]:
+        claimed, row = self.db.claim_idempotency(tenant_id, idempotency_key, body_digest)
+        if not claimed:
+            if row.request_hash != body_digest:
+                return 409, {"error": "idempotency key reused with different body"}
+            if row.status == "completed" and row.response_body:
+                return row.response_status or 200, row.response_body
+            return 409, {"error": "request in flight"}
+
+        intent = self.stripe.create_payment_intent(
+            amount_cents=amount_cents,
+            currency=currency,
+            idempotency_key=idempotency_key,
+            tenant_id=tenant_id,
+        )
+        response = {
+            "order_id": new_order_id(),
+            "payment_intent_id": intent.id,
+            "status": intent.status,
+            "amount_cents": amount_cents,
+            "currency": currency,
+        }
+        self.db.complete_charge(
+            tenant_id,
+            idempotency_key,
+            response["order_id"],
+            amount_cents,
+            currency,
+            intent.id,
+            201,
+            response,
+        )
+        return 201, response
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "db": self.db.stats(),
+            "in_flight_wait": self.coalescer.stats() if self.coalescer is not None else None,
+        }
+
     def process_webhook(self, event: dict[str, Any]) -> bool:
         event_id = event["event_id"]
         return self.db.mark_webhook_processed(event_id, event)
 
-    def run_sweeper(self, older_than_seconds: float = 0) -> int:
-        """Heal stuck processing rows when Stripe intent exists."""
-        healed = 0
-        for row in self.db.list_stuck_processing(older_than_seconds):
-            if row.stripe_payment_intent_id:
-                intent = self.stripe.get_intent(row.stripe_payment_intent_id)
-                if intent:
-                    response = {
-                        "payment_intent_id": intent.id,
-                        "status": intent.status,
-                        "recovered_by": "sweeper",
-                    }
-                    self.db.complete_idempotency(
-                        row.tenant_id,
-                        row.idempotency_key,
-                        201,
-                        response,
-                        intent.id,
-                    )
-                    healed += 1
-        return healed
+    def process_webhooks(self, events: list[dict[str, Any]]) -> list[bool]:
+        """Batch form of ``process_webhook``: one dedupe write, one flag per event.
+
+        A repeated event_id within the batch counts as a duplicate after its first copy.
+        """
+        new_ids = self.db.mark_webhooks_processed(events)
+        results = []
+        for event in events:
+            event_id = event["event_id"]
+            results.append(event_id in new_ids)
+            new_ids.discard(event_id)
+        return results
+
+    def heal_stuck(
+        self, rows: list[IdempotencyRow], release_after_seconds: float | None = None
+    ) -> tuple[int, int]:
+        """Heal one page of stuck ``processing`` rows; returns (healed, released).
+
+        Intents are fetched from Stripe in one batch lookup by idempotency key. A row
+        whose charge went through gets its order (kept if it already exists) and cached
+        response written in bulk. A row with no intent is released (deleted, so the
+        client's retry re-executes) only when ``release_after_seconds`` is set and it
+        has been idle that long; otherwise it is left for a later pass.
+        """
+        keys = [(row.tenant_id, row.idempotency_key) for row in rows]
+        intents = self.stripe.find_intents(keys)
+        found = [(key, intents[key]) for key in keys if key in intents]
+        order_ids = self.db.upsert_orders(
+            [
+                (new_order_id(), tenant_id, intent.amount_cents, intent.currency, intent.id)
+                for (tenant_id, _), intent in found
+            ]
+        )
+        completions = []
+        for (tenant_id, key), intent in found:
+            response = {
+                "order_id": order_ids[intent.id],
+                "payment_intent_id": intent.id,
+                "status": intent.status,
+                "amount_cents": intent.amount_cents,
+                "currency": intent.currency,
+                "recovered_by": "sweeper",
+            }
+            completions.append((tenant_id, key, 201, response, intent.id))
+        healed = self.db.complete_many(completions)
+        released = 0
+        if release_after_seconds is not None:
+            missing = [key for key in keys if key not in intents]
+            released = self.db.release_processing(missing, release_after_seconds)
+        return healed, released
+
+    def sweep_stuck(
+        self,
+        older_than_seconds: float = 0,
+        page_size: int = 500,
+        release_after_seconds: float | None = None,
+    ) -> Iterator[tuple[int, int, int]]:
+        """Walk stuck rows page by page; yields (scanned, healed, released) per page."""
+        cursor = None
+        while True:
+            rows, cursor = self.db.list_stuck_page(older_than_seconds, cursor, page_size)
+            if rows:
+                healed, released = self.heal_stuck(rows, release_after_seconds)
+                yield len(rows), healed, released
+            if cursor is None:
+                return
+
+    def purge_expired(self, ttl_seconds: float, batch_size: int = 1000) -> int:
+        """Delete finished keys past their TTL, ``batch_size`` rows per transaction."""
+        purged = 0
+        while True:
+            deleted = self.db.purge_expired_batch(ttl_seconds, batch_size)
+            purged += deleted
+            if deleted < batch_size:
+                return purged
+
+    def run_sweeper(self, older_than_seconds: float = 0, page_size: int = 500) -> int:
+        """Heal stuck processing rows whose Stripe intent exists; returns rows healed."""
+        return sum(healed for _, healed, _ in self.sweep_stuck(older_than_seconds, page_size))
@@ -87,6 +87,13 @@ class StripeMock:
                     return intent
         return None
 
+    def find_intents(
+        self, keys: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], PaymentIntent]:
+        """Batch lookup by (tenant_id, idempotency_key) — one call per sweeper page."""
+        with self._lock:
+            return {key: self._intents[key] for key in keys if key in self._intents}
+
     def intent_count(self) -> int:
         with self._lock:
             return len(self._intents)
@@ -1,10 +1,130 @@
-"""Sweeper — heals stuck idempotency rows (EventBridge + Lambda locally)."""
+"""Sweeper — heals stuck idempotency rows and purges expired keys (EventBridge + Lambda locally)."""
 
 from __future__ import annotations
 
+import threading
+import time
+from typing import Any
+
 from .service import PaymentService
 
 
+class Sweeper:
+    """Paginated stuck-row sweep plus TTL purge, run once or on a background thread.
+
+    Each cycle walks ``processing`` rows idle for ``older_than_seconds`` in keyset
+    pages of ``page_size`` (see ``PaymentService.sweep_stuck``), then deletes finished
+    keys older than ``ttl_seconds`` in batches of ``purge_batch``. Progress counters
+    are updated after every page/batch so ``stats()`` is live during a long sweep.
+    """
+
+    def __init__(
+        self,
+        service: PaymentService,
+        older_than_seconds: float = 300,
+        page_size: int = 500,
+        release_after_seconds: float | None = None,
+        ttl_seconds: float | None = 86400,
+        purge_batch: int = 1000,
+    ) -> None:
+        self.service = service
+        self.older_than_seconds = older_than_seconds
+        self.page_size = page_size
+        self.release_after_seconds = release_after_seconds
+        self.ttl_seconds = ttl_seconds
+        self.purge_batch = purge_batch
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.cycles = 0
+        self.pages = 0
+        self.scanned = 0
+        self.healed = 0
+        self.released = 0
+        self.purged = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.last_cycle_seconds = 0.0
+        self.in_progress = False
+
+    def run_once(self) -> dict[str, int]:
+        """One full cycle; returns what this cycle did."""
+        with self._lock:
+            self.in_progress = True
+        started = time.perf_counter()
+        done = {"pages": 0, "scanned": 0, "healed": 0, "released": 0, "purged": 0}
+        try:
+            for scanned, healed, released in self.service.sweep_stuck(
+                self.older_than_seconds, self.page_size, self.release_after_seconds
+            ):
+                done["pages"] += 1
+                done["scanned"] += scanned
+                done["healed"] += healed
+                done["released"] += released
+                with self._lock:
+                    self.pages += 1
+                    self.scanned += scanned
+                    self.healed += healed
+                    self.released += released
+                if self._stop.is_set():
+                    return done
+            if self.ttl_seconds is not None:
+                while not self._stop.is_set():
+                    purged = self.service.db.purge_expired_batch(self.ttl_seconds, self.purge_batch)
+                    done["purged"] += purged
+                    with self._lock:
+                        self.purged += purged
+                    if purged < self.purge_batch:
+                        break
+            return done
+        finally:
+            with self._lock:
+                self.cycles += 1
+                self.in_progress = False
+                self.last_cycle_seconds = round(time.perf_counter() - started, 3)
+
+    def _loop(self, interval_seconds: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:  # keep the background task alive; surface via stats
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = f"{type(exc).__name__}: {exc}"
+            self._stop.wait(interval_seconds)
+
+    def start(self, interval_seconds: float = 60) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval_seconds,), name="sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "in_progress": self.in_progress,
+                "cycles": self.cycles,
+                "pages": self.pages,
+                "scanned": self.scanned,
+                "healed": self.healed,
+                "released": self.released,
+                "purged": self.purged,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "last_cycle_seconds": self.last_cycle_seconds,
+            }
+
+
 def run_sweeper(service: PaymentService, older_than_seconds: float = 0) -> int:
     count = service.run_sweeper(older_than_seconds)
     print(f"Sweeper healed {count} stuck processing row(s)")
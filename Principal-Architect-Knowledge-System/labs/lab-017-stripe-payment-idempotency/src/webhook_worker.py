@@ -1,20 +1,186 @@
-"""Webhook worker — consumes queue like SQS → Lambda."""
+"""Webhook worker — consumes queue like SQS → Lambda, in batches."""
 
 from __future__ import annotations
 
 import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
 
 from .queue import WebhookQueue
 from .service import PaymentService
 
+WebhookHandler = Callable[[dict[str, Any]], None]
 
-def run_worker(service: PaymentService, queue: WebhookQueue, poll_seconds: int = 30) -> None:
-    print("Webhook worker started — polling queue")
-    end = time.time() + poll_seconds
-    while time.time() < end:
-        event = queue.consume(timeout_seconds=1)
-        if event:
-            ok = service.process_webhook(event)
-            print(f"Processed webhook {event.get('event_id')}: duplicate={not ok}")
-        time.sleep(0.1)
-    print("Webhook worker stopped")
+
+@dataclass
+class BatchResult:
+    events: int
+    processed: int
+    duplicates: int
+    failed: int
+    max_lag_ms: float
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class WebhookWorker:
+    """Drains the queue ``batch_size`` events at a time.
+
+    Per batch: one ``consume_batch`` pop, one multi-row dedupe insert, then the new
+    events go to ``handler`` on a pool of ``workers`` threads (the Lambda body — e.g.
+    fulfilment calls). An event whose handler raises has its dedupe row removed and is
+    republished, up to ``max_attempts``; after that it lands in ``dead_letters``.
+    Queue lag is enqueue → batch done, per event.
+    """
+
+    def __init__(
+        self,
+        service: PaymentService,
+        queue: WebhookQueue,
+        handler: WebhookHandler | None = None,
+        batch_size: int = 100,
+        workers: int = 4,
+        max_attempts: int = 5,
+    ) -> None:
+        if batch_size < 1 or workers < 1 or max_attempts < 1:
+            raise ValueError("batch_size, workers and max_attempts must be >= 1")
+        self.service = service
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+        self._attempts: dict[str, int] = {}
+        self.dead_letters: list[dict[str, Any]] = []
+        self._lag_ms: deque[float] = deque(maxlen=10_000)
+        self.batches = 0
+        self.events_total = 0
+        self.processed_total = 0
+        self.duplicates_total = 0
+        self.failed_total = 0
+        self.busy_seconds = 0.0
+
+    def _handle(self, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Run the handler over ``events`` on the pool; return the ones that raised."""
+        if self.handler is None or not events:
+            return []
+        futures = [(self._executor.submit(self.handler, event), event) for event in events]
+        return [event for future, event in futures if future.exception() is not None]
+
+    def _retry(self, failed: list[dict[str, Any]]) -> None:
+        self.service.db.unmark_webhooks([event["event_id"] for event in failed])
+        for event in failed:
+            attempts = self._attempts.get(event["event_id"], 0) + 1
+            if attempts >= self.max_attempts:
+                self._attempts.pop(event["event_id"], None)
+                self.dead_letters.append(event)
+            else:
+                self._attempts[event["event_id"]] = attempts
+                self.queue.publish(event)
+
+    def process_batch(self, batch: list[tuple[float | None, dict[str, Any]]]) -> BatchResult:
+        started = time.perf_counter()
+        events = [message for _, message in batch]
+        flags = self.service.process_webhooks(events)
+        fresh = [event for event, new in zip(events, flags) if new]
+        failed = self._handle(fresh)
+        if failed:
+            self._retry(failed)
+        if self._attempts:
+            failed_ids = {event["event_id"] for event in failed}
+            for event in fresh:
+                if event["event_id"] not in failed_ids:
+                    self._attempts.pop(event["event_id"], None)
+
+        done = time.time()
+        lags = [(done - enqueued_at) * 1000 for enqueued_at, _ in batch if enqueued_at]
+        self._lag_ms.extend(lags)
+        self.batches += 1
+        self.events_total += len(events)
+        self.processed_total += len(fresh) - len(failed)
+        self.duplicates_total += len(events) - len(fresh)
+        self.failed_total += len(failed)
+        self.busy_seconds += time.perf_counter() - started
+        return BatchResult(
+            events=len(events),
+            processed=len(fresh) - len(failed),
+            duplicates=len(events) - len(fresh),
+            failed=len(failed),
+            max_lag_ms=round(max(lags, default=0.0), 2),
+        )
+
+    def poll(self, timeout_seconds: float = 1.0) -> BatchResult | None:
+        batch = self.queue.consume_batch(self.batch_size, timeout_seconds)
+        return self.process_batch(batch) if batch else None
+
+    def drain(self) -> int:
+        """Process until the queue is empty; returns events consumed."""
+        consumed = 0
+        while (result := self.poll(timeout_seconds=0)) is not None:
+            consumed += result.events
+        return consumed
+
+    def run(self, duration_seconds: float = 30, log: Callable[[str], None] | None = None) -> None:
+        end = time.time() + duration_seconds
+        while time.time() < end:
+            result = self.poll(timeout_seconds=1)
+            if result is None:
+                time.sleep(0.1)  # in-memory queue returns at once when empty
+            elif log:
+                log(
+                    f"Batch of {result.events}: processed={result.processed} "
+                    f"duplicates={result.duplicates} failed={result.failed} "
+                    f"max_lag_ms={result.max_lag_ms}"
+                )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict[str, Any]:
+        lags = sorted(self._lag_ms)
+        return {
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "batches": self.batches,
+            "events_total": self.events_total,
+            "processed_total": self.processed_total,
+            "duplicates_total": self.duplicates_total,
+            "failed_total": self.failed_total,
+            "dead_letters": len(self.dead_letters),
+            "events_per_sec": round(self.events_total / self.busy_seconds)
+            if self.busy_seconds
+            else 0,
+            "lag_ms_p50": round(_percentile(lags, 0.50), 2),
+            "lag_ms_p99": round(_percentile(lags, 0.99), 2),
+            "lag_ms_max": round(lags[-1], 2) if lags else 0.0,
+            "queue_depth": self.queue.depth(),
+        }
+
+
+def run_worker(
+    service: PaymentService,
+    queue: WebhookQueue,
+    poll_seconds: int = 30,
+    batch_size: int = 100,
+    workers: int = 4,
+) -> dict[str, Any]:
+    print(f"Webhook worker started — batches of {batch_size}, {workers} handler threads")
+    worker = WebhookWorker(service, queue, batch_size=batch_size, workers=workers)
+    try:
+        worker.run(poll_seconds, log=print)
+    finally:
+        worker.close()
+    stats = worker.stats()
+    print(
+        f"Webhook worker stopped — {stats['events_total']} events, "
+        f"{stats['events_per_sec']} events/s, lag p99 {stats['lag_ms_p99']} ms"
+    )
+    return stats
@@ -6,6 +6,7 @@ import os
 import sys
 import tempfile
 import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -15,10 +16,13 @@ LAB_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(LAB_ROOT))
 
 from src.api import create_app  # noqa: E402
+from src.bench import benchmark_checkout, benchmark_webhooks  # noqa: E402
 from src.db import Database  # noqa: E402
 from src.queue import WebhookQueue  # noqa: E402
 from src.service import PaymentService, StoreUnavailableError  # noqa: E402
 from src.stripe_mock import StripeMock  # noqa: E402
+from src.sweeper import Sweeper  # noqa: E402
+from src.webhook_worker import WebhookWorker  # noqa: E402
 
 
 @pytest.fixture()
@@ -30,7 +34,10 @@ def service() -> PaymentService:
     queue = WebhookQueue()
     stripe = StripeMock(on_success=queue.publish)
     yield PaymentService(db, stripe, queue)
-    os.unlink(path)
+    db.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
 
 
 def test_duplicate_retry_same_response(service: PaymentService) -> None:
@@ -111,3 +118,217 @@ def test_api_invalid_body_returns_422(service: PaymentService) -> None:
         headers={"Idempotency-Key": "bad-body", "X-Tenant-Id": "demo"},
     )
     assert resp.status_code == 422
+
+
+def _coalescing_service(service: PaymentService, **kwargs) -> PaymentService:
+    """Same DB and queue, but a Stripe that keeps the leader in flight for 200 ms."""
+    stripe = StripeMock(delay_seconds=0.2, on_success=service.webhook_queue.publish)
+    return PaymentService(
+        service.db, stripe, service.webhook_queue, wait_for_in_flight=True, **kwargs
+    )
+
+
+def _race(service: PaymentService, key: str, bodies: list[dict]) -> list[tuple[int, dict]]:
+    results: list[tuple[int, dict]] = []
+    threads = [
+        threading.Thread(target=lambda b=b: results.append(service.create_charge("t1", key, b)))
+        for b in bodies
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_wait_for_in_flight_serves_leader_result(service: PaymentService) -> None:
+    coalescing = _coalescing_service(service)
+    results = _race(coalescing, "burst", [{"amount_cents": 999, "currency": "usd"}] * 8)
+    assert [status for status, _ in results] == [201] * 8
+    assert len({body["order_id"] for _, body in results}) == 1
+    assert coalescing.db.count_orders() == 1
+    assert coalescing.stripe.intent_count() == 1
+    wait = TestClient(create_app(coalescing)).get("/health").json()["in_flight_wait"]
+    assert wait["leaders"] == 1 and wait["coalesced"] == 7
+
+
+def test_wait_for_in_flight_timeout_returns_409(service: PaymentService) -> None:
+    coalescing = _coalescing_service(service, wait_timeout=0.05)
+    results = _race(coalescing, "slow", [{"amount_cents": 5, "currency": "usd"}] * 3)
+    assert sorted(status for status, _ in results) == [201, 409, 409]
+    assert coalescing.stats()["in_flight_wait"]["wait_timeouts"] == 2
+    assert service.stats()["in_flight_wait"] is None
+
+
+def test_sqlite_pool_reuses_one_wal_connection_per_thread(service: PaymentService) -> None:
+    body = {"amount_cents": 100, "currency": "usd"}
+    for i in range(5):
+        service.create_charge("t1", f"pool-{i}", body)
+    with service.db.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert service.db.stats()["connections_opened"] == 1
+
+    errors: list[BaseException] = []
+
+    def client(n: int) -> None:
+        try:
+            for i in range(10):
+                assert service.create_charge("t1", f"pool-{n}-{i}", body)[0] == 201
+        except BaseException as exc:  # surfaced below; threads swallow failures
+            errors.append(exc)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert service.db.count_orders() == 5 + 80
+    assert service.stats()["db"]["connections_opened"] == 1 + 8
+
+
+def test_checkout_benchmark_pooled_vs_connect_per_call() -> None:
+    rows = benchmark_checkout(clients=4, requests=80, replay_every=5)
+    assert [row["mode"] for row in rows] == [
+        "connect-per-call",
+        "pooled",
+        "pooled+fast-path",
+    ]
+    # 20 requests per client, every 5th after the first replays the previous key.
+    assert [row["charges"] for row in rows] == [4 * (20 - 3)] * 3
+    assert rows[1]["connections_opened"] == 4 + 1
+
+
+def test_fast_path_charge_takes_two_db_transactions(service: PaymentService) -> None:
+    body = {"amount_cents": 700, "currency": "usd"}
+    legacy = PaymentService(service.db, service.stripe, service.webhook_queue, fast_path=False)
+    for svc, new_charge_cost in ((service, 2), (legacy, 4)):
+        key = f"rt-{new_charge_cost}"
+        before = svc.db.transactions
+        status, first = svc.create_charge("t1", key, body)
+        assert status == 201 and svc.db.transactions - before == new_charge_cost
+        before = svc.db.transactions
+        assert svc.create_charge("t1", key, body) == (201, first)
+        assert svc.db.transactions - before == 1
+    claimed, row = service.db.claim_idempotency("t1", "rt-2", "other-hash")
+    assert not claimed and row.status == "completed"
+    assert row.response_body == service.create_charge("t1", "rt-2", body)[1]
+    assert service.create_charge("t1", "rt-2", {"amount_cents": 1, "currency": "usd"})[0] == 409
+    assert service.db.count_orders() == 2
+
+
+def test_batched_worker_dedupes_each_batch_in_one_write(service: PaymentService) -> None:
+    queue = service.webhook_queue
+    service.process_webhook({"event_id": "evt_seen", "type": "x"})
+    for event_id in ["evt_a", "evt_b", "evt_a", "evt_seen", "evt_c"]:
+        queue.publish({"event_id": event_id, "type": "payment_intent.succeeded"})
+    handled: list[str] = []
+    worker = WebhookWorker(
+        service, queue, handler=lambda e: handled.append(e["event_id"]), batch_size=10
+    )
+    before = service.db.transactions
+    assert worker.drain() == 5
+    worker.close()
+    assert service.db.transactions - before == 1
+    assert sorted(handled) == ["evt_a", "evt_b", "evt_c"]
+    stats = worker.stats()
+    assert stats["processed_total"] == 3 and stats["duplicates_total"] == 2
+    assert stats["queue_depth"] == 0 and stats["lag_ms_max"] >= 0
+
+
+def test_batched_worker_retries_failed_handler_then_dead_letters(
+    service: PaymentService,
+) -> None:
+    queue = service.webhook_queue
+    calls: dict[str, int] = {}
+
+    def handler(event: dict) -> None:
+        calls[event["event_id"]] = calls.get(event["event_id"], 0) + 1
+        if event["event_id"] == "evt_bad" or calls[event["event_id"]] == 1:
+            raise RuntimeError("fulfilment down")
+
+    queue.publish({"event_id": "evt_flaky", "type": "x"})
+    queue.publish({"event_id": "evt_bad", "type": "x"})
+    worker = WebhookWorker(service, queue, handler=handler, batch_size=1, max_attempts=3)
+    worker.drain()
+    worker.close()
+    assert calls == {"evt_flaky": 2, "evt_bad": 3}
+    assert [e["event_id"] for e in worker.dead_letters] == ["evt_bad"]
+    # The flaky event is recorded once it succeeds; the dead-lettered one is not.
+    assert service.process_webhook({"event_id": "evt_flaky", "type": "x"}) is False
+    assert service.process_webhook({"event_id": "evt_bad", "type": "x"}) is True
+
+
+def test_webhook_benchmark_batched_beats_one_at_a_time() -> None:
+    rows = benchmark_webhooks(events=200, handler_ms=1.0, batch_size=50, legacy_events=3)
+    by_mode = {row["mode"]: row for row in rows}
+    assert by_mode["batched"]["duplicates"] == by_mode["one-at-a-time"]["duplicates"] == 19
+    assert by_mode["batched"]["events_per_sec"] > by_mode["one-at-a-time"]["events_per_sec"]
+    assert by_mode["legacy"]["events_per_sec"] <= 10
+
+
+def _crash_after_stripe(service: PaymentService, key: str, charge: bool) -> None:
+    """Claim ``key`` and (optionally) charge Stripe, then "die" before completing."""
+    service.db.claim_idempotency("t1", key, "h")
+    if charge:
+        service.stripe.create_payment_intent(400, "USD", key, "t1")
+
+
+def test_sweeper_pages_heals_charged_and_releases_uncharged(service: PaymentService) -> None:
+    for i in range(5):
+        _crash_after_stripe(service, f"stuck-{i}", charge=i != 4)
+    with service.db.connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT tenant_id FROM idempotency_keys "
+            "WHERE status = 'processing' AND updated_at < ? "
+            "ORDER BY updated_at, tenant_id, idempotency_key LIMIT 2",
+            ("9999",),
+        ).fetchall()
+    assert "idx_idempotency_processing" in plan[0]["detail"]
+
+    sweeper = Sweeper(service, older_than_seconds=0, page_size=2, release_after_seconds=0)
+    assert sweeper.run_once() == {
+        "pages": 3,
+        "scanned": 5,
+        "healed": 4,
+        "released": 1,
+        "purged": 0,
+    }
+    assert service.db.count_orders() == 4
+    row = service.db.get_idempotency("t1", "stuck-0")
+    assert row.status == "completed" and row.response_body["recovered_by"] == "sweeper"
+    assert service.db.get_idempotency("t1", "stuck-4") is None
+    assert sweeper.run_once()["scanned"] == 0
+    assert sweeper.stats()["cycles"] == 2 and sweeper.stats()["healed"] == 4
+
+
+def test_ttl_purge_deletes_only_expired_finished_keys(service: PaymentService) -> None:
+    body = {"amount_cents": 100, "currency": "usd"}
+    for i in range(7):
+        service.create_charge("t1", f"old-{i}", body)
+    service.create_charge("t1", "fresh", body)
+    _crash_after_stripe(service, "in-flight", charge=False)
+    with service.db.connection() as conn:
+        conn.execute(
+            "UPDATE idempotency_keys SET updated_at = '2000-01-01T00:00:00+00:00' "
+            "WHERE idempotency_key LIKE 'old-%' OR idempotency_key = 'in-flight'"
+        )
+    sweeper = Sweeper(service, older_than_seconds=10**9, ttl_seconds=3600, purge_batch=3)
+    assert sweeper.run_once()["purged"] == 7
+    assert service.db.get_idempotency("t1", "fresh") is not None
+    assert service.db.get_idempotency("t1", "in-flight").status == "processing"
+
+
+def test_sweeper_background_task_reports_progress(service: PaymentService) -> None:
+    _crash_after_stripe(service, "bg", charge=True)
+    sweeper = Sweeper(service, older_than_seconds=0)
+    sweeper.start(interval_seconds=0.01)
+    deadline = time.time() + 2
+    while sweeper.stats()["healed"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    sweeper.stop()
+    stats = sweeper.stats()
+    assert stats["healed"] == 1 and stats["cycles"] >= 1 and not stats["running"]
+    health = TestClient(create_app(service, sweeper)).get("/health").json()
+    assert health["sweeper"]["healed"] == 1
+    assert service.run_sweeper() == 0